@@ -0,0 +1,101 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from example.common.connection_pool import PoolConfig, PooledTransport, pool_size_for_workers
+
+log = logging.getLogger(__name__)
+
+# The body size similar to a "WriteXXX" request with some items
+_BODY = b"x" * 4096
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, _Handler)
+        self.accepted = 0
+        self._count_lock = threading.Lock()
+
+    def get_request(self):
+        # Every accepted socket means the client did a new (tls) handshake
+        conn = super().get_request()
+        with self._count_lock:
+            self.accepted += 1
+        return conn
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive is only supported by HTTP/1.1
+    protocol_version = "HTTP/1.1"
+    # The headers and body are written separately, without TCP_NODELAY the
+    # body waits for the delayed ack of client on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply()
+
+    def do_GET(self):
+        self._reply()
+
+    def _reply(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        return
+
+
+def _run(post, url: str, workers: int, requests_count: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for rsp in executor.map(lambda _: post(url, data=_BODY, timeout=5), range(requests_count)):
+            rsp.raise_for_status()
+    return time.perf_counter() - start
+
+
+# Compare the handshake count of sending requests like the sdk
+# does (module level "requests.post") and through the pooled transport.
+def bench(workers: int, requests_count: int) -> dict:
+    server = _CountingServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d/predict/api/retail/demo/write_users" % server.server_address[1]
+    result = {"workers": workers, "requests": requests_count}
+    try:
+        elapsed = _run(requests.post, url, workers, requests_count)
+        result["unpooled"] = {"handshakes": server.accepted, "seconds": round(elapsed, 3)}
+
+        server.accepted = 0
+        transport = PooledTransport(PoolConfig(pool_size=pool_size_for_workers(workers)))
+        try:
+            elapsed = _run(transport.post, url, workers, requests_count)
+        finally:
+            transport.close()
+        result["pooled"] = {"handshakes": server.accepted, "seconds": round(elapsed, 3)}
+    finally:
+        server.shutdown()
+        server.server_close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="count handshakes with and without pooled transport")
+    parser.add_argument("--workers", type=int, default=5, help="count of concurrent senders")
+    parser.add_argument("--requests", type=int, default=1000, help="total count of requests")
+    args = parser.parse_args()
+    print(json.dumps(bench(args.workers, args.requests), indent=2))
+
+
+if __name__ == '__main__':
+    main()
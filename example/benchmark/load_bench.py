@@ -0,0 +1,372 @@
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import multiprocessing
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from byteplus.core import Option, Region
+
+from example.benchmark.mock_server import MockServer, FaultConfig, fault_args, fault_config_from_args
+from example.common.request_helper import RequestHelper
+from example.common.status_helper import is_success, is_success_code, is_upload_success
+
+log = logging.getLogger(__name__)
+
+INDUSTRIES = ("retail", "retailv2", "media", "rutenad", "byteair", "general")
+
+MODE_REQUEST = "request"
+
+MODE_CONCURRENT = "concurrent"
+
+_RETRY_TIMES = 2
+
+_BENCH_TIMEOUT = datetime.timedelta(milliseconds=800)
+
+# industry -> the entities can be written, (field name of request, api name)
+_WRITE_ENTITIES = {
+    "retail": (("users", "Users"), ("products", "Products"), ("user_events", "UserEvents")),
+    "retailv2": (("users", "Users"), ("products", "Products"), ("user_events", "UserEvents")),
+    "media": (("users", "Users"), ("contents", "Contents"), ("user_events", "UserEvents")),
+    "rutenad": (("users", "Users"), ("products", "Products"), ("user_events", "UserEvents"),
+                ("advertisements", "Advertisements")),
+}
+
+# Only retail supports "ImportXXX" of entities
+_IMPORT_ENTITIES = {
+    "retail": (("users", "Users"), ("products", "Products"), ("user_events", "UserEvents")),
+}
+
+_PREDICT_INDUSTRIES = ("retail", "retailv2", "media", "general", "byteair")
+
+_MOCK_MODULES = {
+    "general": "example.general.mock_hlper",
+    "byteair": "example.byteair.mock_hlper",
+}
+
+
+class _Scenario(object):
+    # @param name   the name of scenario, such as "write_users"
+    # @param build  build the payload of one request
+    # @param call   send the payload by RequestHelper, return whether succeed
+    # @param submit submit the payload to ConcurrentHelper, return the future,
+    #               None if the scenario is not supported by ConcurrentHelper
+    def __init__(self, name: str, build, call, submit=None):
+        self.name = name
+        self.build = build
+        self.call = call
+        self.submit = submit
+
+
+def build_client(industry: str, host: str):
+    module = importlib.import_module("byteplus.%s" % industry)
+    builder = module.ClientBuilder()
+    if industry == "byteair":
+        builder = builder.tenant_id("bench").project_id("bench").ak("bench").sk("bench").region(Region.AIR)
+    else:
+        builder = builder.tenant("bench").tenant_id("bench").token("bench").region(Region.SG)
+    return builder.hosts([host]).schema("http").build()
+
+
+def build_scenarios(industry: str, client, batch_size: int) -> list:
+    if industry in ("general", "byteair"):
+        return _data_scenarios(industry, client, batch_size)
+    return _proto_scenarios(industry, client, batch_size)
+
+
+def _proto_scenarios(industry: str, client, batch_size: int) -> list:
+    protocol = importlib.import_module("byteplus.%s.protocol" % industry)
+    mock = importlib.import_module("example.%s.mock_helper" % industry)
+    scenarios = []
+    for field, api in _WRITE_ENTITIES[industry]:
+        scenarios.append(_write_scenario(client, protocol, mock, field, api, batch_size))
+    for field, api in _IMPORT_ENTITIES.get(industry, ()):
+        scenarios.append(_import_scenario(client, protocol, mock, field, api, batch_size))
+    if industry in _PREDICT_INDUSTRIES:
+        def build_predict():
+            request = protocol.PredictRequest()
+            request.user_id = "bench_user"
+            request.size = 20
+            request.scene.scene_name = "home"
+            return request
+
+        def call_predict(_, request, opts):
+            return is_success(client.predict(request, "home", *opts).status)
+
+        scenarios.append(_Scenario("predict", build_predict, call_predict))
+    return scenarios
+
+
+def _write_scenario(client, protocol, mock, field: str, api: str, batch_size: int) -> _Scenario:
+    request_class = getattr(protocol, "Write%sRequest" % api)
+    mock_items = getattr(mock, "mock_%s" % field)
+    method = getattr(client, "write_%s" % field)
+
+    def build():
+        request = request_class()
+        getattr(request, field).extend(mock_items(batch_size))
+        return request
+
+    def call(request_helper, request, opts):
+        return is_upload_success(request_helper.do_write(method, request, opts, _RETRY_TIMES).status)
+
+    def submit(concurrent_helper, request, opts):
+        return concurrent_helper.submit_request(request, *opts)
+
+    return _Scenario("write_%s" % field, build, call, submit)
+
+
+def _import_scenario(client, protocol, mock, field: str, api: str, batch_size: int) -> _Scenario:
+    request_class = getattr(protocol, "Import%sRequest" % api)
+    response_class = getattr(protocol, "Import%sResponse" % api)
+    mock_items = getattr(mock, "mock_%s" % field)
+    method = getattr(client, "import_%s" % field)
+
+    def build():
+        request = request_class()
+        inline_source = getattr(request.input_config, "%s_inline_source" % field)
+        getattr(inline_source, field).extend(mock_items(batch_size))
+        request.date_config.date = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        return request
+
+    def call(request_helper, request, opts):
+        response = response_class()
+        request_helper.do_import(method, request, response, opts, _RETRY_TIMES)
+        return is_success(response.status)
+
+    def submit(concurrent_helper, request, opts):
+        return concurrent_helper.submit_request(request, *opts)
+
+    return _Scenario("import_%s" % field, build, call, submit)
+
+
+def _data_scenarios(industry: str, client, batch_size: int) -> list:
+    protocol = importlib.import_module("byteplus.%s.protocol" % industry)
+    mock = importlib.import_module(_MOCK_MODULES[industry])
+    topic = "user"
+
+    def build_data():
+        return mock.mock_data_list(batch_size)
+
+    def call_write(request_helper, data_list, opts):
+        def write(call_data_list, *call_opts):
+            return client.write_data(call_data_list, topic, *call_opts)
+
+        return is_upload_success(request_helper.do_write(write, data_list, opts, _RETRY_TIMES).status)
+
+    def submit_write(concurrent_helper, data_list, opts):
+        return concurrent_helper.submit_write_request(data_list, topic, *opts)
+
+    def build_dates():
+        return [datetime.datetime(year=2021, month=11, day=1)]
+
+    def call_done(request_helper, date_list, opts):
+        def done(call_date_list, *call_opts):
+            return client.done(call_date_list, topic, *call_opts)
+
+        return is_success(request_helper.do_with_retry(done, date_list, opts, _RETRY_TIMES).status)
+
+    def submit_done(concurrent_helper, date_list, opts):
+        return concurrent_helper.submit_done_request(date_list, topic, *opts)
+
+    def build_predict():
+        request = protocol.PredictRequest()
+        request.size = 20
+        request.user.uid = "bench_user"
+        return request
+
+    def call_predict(_, request, opts):
+        if industry == "byteair":
+            return is_success_code(client.predict(request, *opts).code)
+        return is_success_code(client.predict(request, "home", *opts).code)
+
+    return [
+        _Scenario("write_data", build_data, call_write, submit_write),
+        _Scenario("done", build_dates, call_done, submit_done),
+        _Scenario("predict", build_predict, call_predict),
+    ]
+
+
+def run_scenario(scenario: _Scenario, request_helper, concurrent_helper, mode: str,
+                 qps: float, concurrency: int, duration: float) -> dict:
+    if mode == MODE_CONCURRENT and scenario.submit is None:
+        return {"skipped": "not supported by ConcurrentHelper"}
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    # Every worker sends at "qps / concurrency", so that the total is "qps"
+    interval = concurrency / qps if qps > 0 else 0
+    end_time = time.monotonic() + duration
+
+    def worker():
+        next_time = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now >= end_time:
+                return
+            if next_time > now:
+                time.sleep(next_time - now)
+            next_time += interval
+            payload = scenario.build()
+            opts = (Option.with_timeout(_BENCH_TIMEOUT),)
+            start = time.perf_counter()
+            try:
+                if mode == MODE_CONCURRENT:
+                    scenario.submit(concurrent_helper, payload, opts).result()
+                    ok = True
+                else:
+                    ok = scenario.call(request_helper, payload, opts)
+            except BaseException as e:
+                log.debug("[LoadBench] request occur error, scenario:%s msg:%s", scenario.name, e)
+                ok = False
+            cost = time.perf_counter() - start
+            with lock:
+                latencies.append(cost)
+                if not ok:
+                    errors[0] += 1
+
+    start_time = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.monotonic() - start_time
+    return _summarize(latencies, errors[0], elapsed)
+
+
+def _summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    latencies.sort()
+    count = len(latencies)
+
+    def percentile(p: float) -> float:
+        if count == 0:
+            return 0.0
+        return round(latencies[min(count - 1, int(p * count))] * 1000, 3)
+
+    return {
+        "count": count,
+        "errors": errors,
+        "throughput": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": percentile(0.5),
+        "p99_ms": percentile(0.99),
+        "p999_ms": percentile(0.999),
+    }
+
+
+def _serve(industry: str, faults: FaultConfig, conn) -> None:
+    with MockServer(industry, faults) as server:
+        conn.send(server.host)
+        # Serve until the parent asks to stop
+        conn.recv()
+        conn.send({"requests": server.request_counts, "faults": server.fault_counts})
+
+
+# Run the server in another process, so that its cpu cost
+# is not counted into the measured process.
+def _start_server_process(industry: str, faults: FaultConfig) -> tuple:
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(industry, faults, child_conn), daemon=True)
+    process.start()
+    return process, parent_conn, parent_conn.recv()
+
+
+def bench_industry(industry: str, mode: str, qps: float, concurrency: int,
+                   duration: float, batch_size: int, faults: FaultConfig) -> dict:
+    process, conn, host = _start_server_process(industry, faults)
+    client = build_client(industry, host)
+    request_helper = RequestHelper(client)
+    concurrent_module = importlib.import_module("example.%s.concurrent_helper" % industry)
+    concurrent_helper = concurrent_module.ConcurrentHelper(client, max_workers=concurrency)
+    # ConcurrentHelper handles the failures in worker, so the futures always succeed,
+    # count them by the counters of its log, which are not rate limited as the logs
+    helper_log = concurrent_module.helper_log
+    results = {}
+    server_counts = {}
+    try:
+        for scenario in build_scenarios(industry, client, batch_size):
+            failures_start = helper_log.total("failure")
+            cpu_start, wall_start = time.process_time(), time.monotonic()
+            result = run_scenario(scenario, request_helper, concurrent_helper, mode, qps, concurrency, duration)
+            wall = time.monotonic() - wall_start
+            if "count" in result:
+                if mode == MODE_CONCURRENT:
+                    result["errors"] = helper_log.total("failure") - failures_start
+                result["cpu_percent"] = round((time.process_time() - cpu_start) / wall * 100, 1)
+                result["rss_mb"] = _current_rss_mb()
+            results[scenario.name] = result
+            log.info("[LoadBench] %s %s: %s", industry, scenario.name, result)
+    finally:
+        client.release()
+        conn.send("stop")
+        # The requests and faults counted by server, which shows how much the retries amplify
+        server_counts = conn.recv()
+        process.join(timeout=5)
+    return {"scenarios": results, "server": server_counts}
+
+
+def _current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        import resource
+        return round(pages * resource.getpagesize() / 1024 / 1024, 1)
+    except (OSError, ImportError):
+        return _max_rss_mb()
+
+
+def _max_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    # "ru_maxrss" is in kilobytes on linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if platform.system() == "Darwin":
+        return round(max_rss / 1024 / 1024, 1)
+    return round(max_rss / 1024, 1)
+
+
+def _sdk_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("byteplus")
+    except BaseException:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="drive load through the example helpers against a mock server")
+    parser.add_argument("--industry", default="all", choices=("all",) + INDUSTRIES)
+    parser.add_argument("--mode", default=MODE_REQUEST, choices=(MODE_REQUEST, MODE_CONCURRENT),
+                        help="send by RequestHelper directly, or submit to ConcurrentHelper")
+    parser.add_argument("--qps", type=float, default=200, help="target requests per second, 0 means unlimited")
+    parser.add_argument("--concurrency", type=int, default=8, help="count of concurrent senders")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run every scenario")
+    parser.add_argument("--batch-size", type=int, default=100, help="count of items in one write/import request")
+    fault_args(parser)
+    parser.add_argument("--output", default="load_bench_result.json", help="the json file to save result")
+    args = parser.parse_args()
+
+    industries = INDUSTRIES if args.industry == "all" else (args.industry,)
+    report = {
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sdk_version": _sdk_version(),
+        "config": vars(args),
+        "industries": {},
+    }
+    for industry in industries:
+        report["industries"][industry] = bench_industry(
+            industry, args.mode, args.qps, args.concurrency, args.duration, args.batch_size,
+            fault_config_from_args(args))
+    report["max_rss_mb"] = _max_rss_mb()
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import importlib
+import json
+import time
+
+from example.common.message_template import MessageTemplate
+
+# industry -> [(item name, mock function of one item, varying id field)]
+_ITEMS = {
+    "retail": [("user", "mock_user", "user_id"), ("product", "mock_product", "product_id"),
+               ("user_event", "mock_user_event", "user_id")],
+    "retailv2": [("user", "mock_user", "user_id"), ("product", "mock_product", "product_id"),
+                 ("user_event", "mock_user_event", "user_id")],
+    "media": [("user", "mock_user", "user_id"), ("content", "mock_content", "content_id"),
+              ("user_event", "mock_user_event", "user_id")],
+    "rutenad": [("user", "mock_user", "user_id"), ("product", "mock_product", "product_id"),
+                ("user_event", "mock_user_event", "user_id"),
+                ("advertisement", "mock_advertisement", "advertisement_id")],
+}
+
+
+# Build messages field by field, as converters without a template do
+def _build_field_by_field(mock, id_field: str, ids: list) -> list:
+    messages = []
+    for item_id in ids:
+        message = mock()
+        setattr(message, id_field, item_id)
+        messages.append(message)
+    return messages
+
+
+def _build_from_template(mock, id_field: str, ids: list) -> list:
+    return MessageTemplate(mock()).build_column(id_field, ids)
+
+
+def _rate(build, mock, id_field: str, ids: list, rounds: int) -> float:
+    cost = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        build(mock, id_field, ids)
+        cost = min(cost, time.perf_counter() - start)
+    return len(ids) / cost
+
+
+def bench(industry: str, count: int, rounds: int) -> dict:
+    mock_helper = importlib.import_module("example.%s.mock_helper" % industry)
+    result = {}
+    for item, mock_name, id_field in _ITEMS[industry]:
+        mock = getattr(mock_helper, mock_name)
+        ids = ["%s_%d" % (item, i) for i in range(count)]
+        field_by_field = _rate(_build_field_by_field, mock, id_field, ids, rounds)
+        template = _rate(_build_from_template, mock, id_field, ids, rounds)
+        result[item] = {
+            "field_by_field_per_second": round(field_by_field),
+            "template_per_second": round(template),
+            "speedup": round(template / field_by_field, 2),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare building messages field by field and from template")
+    parser.add_argument("--industry", default="all", choices=["all"] + list(_ITEMS))
+    parser.add_argument("--count", type=int, default=20000, help="count of messages built per round")
+    parser.add_argument("--rounds", type=int, default=3, help="the fastest round is reported")
+    args = parser.parse_args()
+    industries = list(_ITEMS) if args.industry == "all" else [args.industry]
+    print(json.dumps({industry: bench(industry, args.count, args.rounds) for industry in industries}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
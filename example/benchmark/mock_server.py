@@ -0,0 +1,430 @@
+import argparse
+import datetime
+import gzip
+import logging
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from byteplus.common.protocol import Status, OperationResponse, GetOperationRequest, \
+    ListOperationsRequest, ListOperationsResponse, DoneResponse
+from byteplus.core import STATUS_CODE_SUCCESS, STATUS_CODE_TOO_MANY_REQUEST, STATUS_CODE_OPERATION_LOSS
+
+log = logging.getLogger(__name__)
+
+_KIND_WRITE = "write"
+
+_KIND_IMPORT = "import"
+
+_KIND_DONE = "done"
+
+_KIND_PREDICT = "predict"
+
+_KIND_ACK = "ack"
+
+_KIND_CALLBACK = "callback"
+
+_KIND_GET_OPERATION = "get_operation"
+
+_KIND_LIST_OPERATIONS = "list_operations"
+
+_KIND_PING = "ping"
+
+# The "method" query of url -> endpoint, the data apis carry topic
+# rather than api name in path, such as ".../retail/<tenant>/user?method=write"
+_QUERY_METHODS = {
+    "get": _KIND_GET_OPERATION,
+    "list": _KIND_LIST_OPERATIONS,
+    "write": _KIND_WRITE,
+    "import": _KIND_IMPORT,
+}
+
+# The last path segment of url -> endpoint, matched exactly, so that
+# the tenant or topic in path never decides the endpoint
+_PATH_SEGMENTS = {
+    "ping": _KIND_PING,
+    "done": _KIND_DONE,
+    "callback": _KIND_CALLBACK,
+    "ack_server_impressions": _KIND_ACK,
+    "operation": _KIND_GET_OPERATION,
+}
+
+# The paths of predict apis end with the scene
+_PREDICT_PATH_PREFIX = "/predict/api/"
+
+# The endpoints may be refused by server overload
+_OVERLOAD_KINDS = (_KIND_WRITE, _KIND_IMPORT, _KIND_DONE, _KIND_PREDICT, _KIND_ACK, _KIND_CALLBACK)
+
+_OPERATION_TYPE_URL_PREFIX = "type.googleapis.com/bytedance.byteplus."
+
+LATENCY_FIXED = "fixed"
+
+LATENCY_UNIFORM = "uniform"
+
+LATENCY_EXPONENTIAL = "exponential"
+
+LATENCY_LOGNORMAL = "lognormal"
+
+LATENCY_DISTRIBUTIONS = (LATENCY_FIXED, LATENCY_UNIFORM, LATENCY_EXPONENTIAL, LATENCY_LOGNORMAL)
+
+
+def endpoint_kind(url: str) -> str:
+    parts = urllib.parse.urlsplit(url)
+    # The operation apis share the path ".../operation", and are told apart by "method=get/list"
+    method = urllib.parse.parse_qs(parts.query).get("method", [""])[0].lower()
+    if method in _QUERY_METHODS:
+        return _QUERY_METHODS[method]
+    last_segment = parts.path.rstrip("/").rsplit("/", 1)[-1].lower()
+    if last_segment in _PATH_SEGMENTS:
+        return _PATH_SEGMENTS[last_segment]
+    if parts.path.startswith(_PREDICT_PATH_PREFIX):
+        return _KIND_PREDICT
+    return _KIND_WRITE
+
+
+_CONDITION_PATTERN = re.compile(r"(\w+)\s*(>=|<=|!=|=|>|<)\s*(\S+)")
+
+_COMPARATORS = {
+    ">=": lambda actual, expected: actual >= expected,
+    "<=": lambda actual, expected: actual <= expected,
+    "!=": lambda actual, expected: actual != expected,
+    "=": lambda actual, expected: actual == expected,
+    ">": lambda actual, expected: actual > expected,
+    "<": lambda actual, expected: actual < expected,
+}
+
+
+# Whether the attributes of operation match the filter of "ListOperations",
+# such as "date>=2021-06-15 and worksOn=ImportUsers and done=true".
+# The conditions of unknown keys are ignored.
+def match_filter(filter_query: str, attributes: dict) -> bool:
+    for condition in re.split(r"\s+and\s+", filter_query.strip(), flags=re.IGNORECASE):
+        if len(condition) == 0:
+            continue
+        matched = _CONDITION_PATTERN.fullmatch(condition.strip())
+        if matched is None:
+            raise ValueError("malformed filter condition:" + condition)
+        key, op, expected = matched.groups()
+        actual = attributes.get(key)
+        if actual is None:
+            continue
+        if not _COMPARATORS[op](actual.lower(), expected.lower()):
+            return False
+    return True
+
+
+class Latency(object):
+    # @param distribution one of LATENCY_DISTRIBUTIONS
+    # @param mean         the mean processing time, in seconds
+    # @param spread       the max distance from mean of "uniform", or the sigma of "lognormal"
+    # @param max_latency  the sampled latency is capped by it, 0 means no cap
+    def __init__(self, distribution: str = LATENCY_FIXED, mean: float = 0.0,
+                 spread: float = 0.0, max_latency: float = 0.0):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError("unknown latency distribution:" + distribution)
+        self.distribution = distribution
+        self.mean = mean
+        self.spread = spread
+        self.max_latency = max_latency
+
+    def sample(self, rand: random.Random) -> float:
+        if self.mean <= 0:
+            return 0.0
+        if self.distribution == LATENCY_UNIFORM:
+            value = rand.uniform(self.mean - self.spread, self.mean + self.spread)
+        elif self.distribution == LATENCY_EXPONENTIAL:
+            value = rand.expovariate(1 / self.mean)
+        elif self.distribution == LATENCY_LOGNORMAL:
+            # Keep the mean of distribution equal to "mean", which has a long tail like real servers
+            sigma = self.spread
+            value = rand.lognormvariate(math.log(self.mean) - sigma * sigma / 2, sigma)
+        else:
+            value = self.mean
+        if self.max_latency > 0:
+            value = min(value, self.max_latency)
+        return max(value, 0.0)
+
+
+# The faults injected by mock server, every rate is in [0, 1]
+#
+# @param latency             the processing time of requests
+# @param overload_rate       rate of write/import/done/predict/ack/callback refused as TOO_MANY_REQUEST
+# @param drop_rate           rate of connections closed without response, the sdk raises them as
+#                            BizException("Connection aborted"), which is not retried by helpers
+# @param operation_loss_rate rate of GetOperation answered as operation loss
+# @param operation_duration  seconds of an import operation running before done
+# @param seed                the random seed, set it to reproduce the same fault sequence
+# @param stall_rate          rate of requests answered after "stall_seconds", set it longer than
+#                            the timeout of client, so that the sdk raises timeout NetException
+#                            and the network retries of helpers are exercised
+# @param stall_seconds       the delay of stalled requests
+class FaultConfig(object):
+
+    def __init__(self, latency: Optional[Latency] = None, overload_rate: float = 0.0, drop_rate: float = 0.0,
+                 operation_loss_rate: float = 0.0, operation_duration: float = 0.0, seed: Optional[int] = None,
+                 stall_rate: float = 0.0, stall_seconds: float = 2.0):
+        self.latency = latency if latency is not None else Latency()
+        self.overload_rate = overload_rate
+        self.drop_rate = drop_rate
+        self.operation_loss_rate = operation_loss_rate
+        self.operation_duration = operation_duration
+        self.seed = seed
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+
+
+# A local stand-in of BytePlus server, which answers the apis called
+# by examples with injected faults, so that the retry, overload backoff
+# and polling of helpers can be exercised and measured offline.
+# Point the client to it by
+#   ClientBuilder().hosts(["127.0.0.1:<port>"]).schema("http")
+#
+# @param industry the industry of client, the predict/callback responses of
+#                 "general" and "byteair" carry "code" instead of "status"
+# @param faults   the faults injected, no fault by default
+class MockServer(object):
+
+    def __init__(self, industry: str = "retail", faults: Optional[FaultConfig] = None, port: int = 0):
+        self.industry = industry
+        self.faults = faults if faults is not None else FaultConfig()
+        self._random = random.Random(self.faults.seed)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+        self._lock = threading.Lock()
+        # operation name -> (done time, serialized Operation, attributes matched by filter)
+        self._operations = {}
+        self.request_counts = {}
+        self.fault_counts = {}
+
+    @property
+    def host(self) -> str:
+        return "127.0.0.1:%d" % self._httpd.server_address[1]
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # @return the response body, None means dropping the connection
+    def handle(self, path: str, body: bytes) -> Optional[bytes]:
+        kind = endpoint_kind(path)
+        with self._lock:
+            self.request_counts[kind] = self.request_counts.get(kind, 0) + 1
+            latency = self.faults.latency.sample(self._random)
+            dropped = self._random.random() < self.faults.drop_rate
+            stalled = self._random.random() < self.faults.stall_rate
+            overloaded = kind in _OVERLOAD_KINDS and self._random.random() < self.faults.overload_rate
+            operation_lost = kind == _KIND_GET_OPERATION and \
+                self._random.random() < self.faults.operation_loss_rate
+        if latency > 0:
+            time.sleep(latency)
+        if stalled:
+            # The client has given up when the response is written
+            self._count_fault("stall")
+            time.sleep(self.faults.stall_seconds)
+        if dropped:
+            self._count_fault("drop")
+            return None
+        if overloaded:
+            self._count_fault("overload")
+            return self._status_response(kind, STATUS_CODE_TOO_MANY_REQUEST, "too many request")
+        if kind == _KIND_IMPORT:
+            return self._submit_operation(path)
+        if kind == _KIND_GET_OPERATION:
+            request = GetOperationRequest.FromString(body)
+            if operation_lost:
+                self._count_fault("operation_loss")
+                return self._status_response(kind, STATUS_CODE_OPERATION_LOSS, "operation loss")
+            return self._get_operation(request.name)
+        if kind == _KIND_LIST_OPERATIONS:
+            return self._list_operations(ListOperationsRequest.FromString(body))
+        return self._status_response(kind, STATUS_CODE_SUCCESS, "")
+
+    def _count_fault(self, fault: str) -> None:
+        with self._lock:
+            self.fault_counts[fault] = self.fault_counts.get(fault, 0) + 1
+
+    def _status_response(self, kind: str, code: int, message: str) -> bytes:
+        if kind in (_KIND_PREDICT, _KIND_CALLBACK) and self.industry in ("general", "byteair"):
+            # The response of general/byteair predict and callback
+            # has "code"(1) and "message"(2) as the first fields
+            from byteplus.general.protocol import CallbackResponse
+            return CallbackResponse(code=code, message=message).SerializeToString()
+        # All other responses have "status" as the first field
+        response = DoneResponse()
+        response.status.code = code
+        response.status.message = message
+        return response.SerializeToString()
+
+    def _submit_operation(self, path: str) -> bytes:
+        name = str(uuid.uuid4())
+        api_name = _import_api_name(path)
+        response = OperationResponse()
+        response.status.code = STATUS_CODE_SUCCESS
+        operation = response.operation
+        operation.name = name
+        operation.done = True
+        # The import response only need "status" to be parsed by helpers
+        done_response = DoneResponse()
+        done_response.status.code = STATUS_CODE_SUCCESS
+        operation.response.type_url = _OPERATION_TYPE_URL_PREFIX + api_name + "Response"
+        operation.response.value = done_response.SerializeToString()
+        done_time = time.monotonic() + self.faults.operation_duration
+        # "ListOperations" is not real-time, the running operations are listed as done
+        attributes = {
+            "date": datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d"),
+            "worksOn": api_name,
+            "done": "true",
+        }
+        with self._lock:
+            self._operations[name] = (done_time, operation.SerializeToString(), attributes)
+        submit_response = OperationResponse()
+        submit_response.status.code = STATUS_CODE_SUCCESS
+        submit_response.operation.name = name
+        return submit_response.SerializeToString()
+
+    def _get_operation(self, name: str) -> bytes:
+        response = OperationResponse()
+        with self._lock:
+            entry = self._operations.get(name)
+        if entry is None:
+            response.status.CopyFrom(Status(code=404, message="operation not found"))
+            return response.SerializeToString()
+        response.status.code = STATUS_CODE_SUCCESS
+        done_time, operation_bytes, _ = entry
+        if time.monotonic() < done_time:
+            # The long-running operation is still executing
+            response.operation.name = name
+            response.operation.done = False
+            return response.SerializeToString()
+        response.operation.ParseFromString(operation_bytes)
+        return response.SerializeToString()
+
+    def _list_operations(self, request: ListOperationsRequest) -> bytes:
+        with self._lock:
+            entries = [self._operations[name] for name in sorted(self._operations)]
+        try:
+            operations = [operation_bytes for _, operation_bytes, attributes in entries
+                          if match_filter(request.filter, attributes)]
+        except ValueError as e:
+            response = ListOperationsResponse()
+            response.status.CopyFrom(Status(code=400, message=str(e)))
+            return response.SerializeToString()
+        start = int(request.page_token) if request.page_token else 0
+        page_size = request.page_size if request.page_size > 0 else 100
+        response = ListOperationsResponse()
+        response.status.code = STATUS_CODE_SUCCESS
+        for operation_bytes in operations[start:start + page_size]:
+            response.operations.add().ParseFromString(operation_bytes)
+        if start + page_size < len(operations):
+            response.next_page_token = str(start + page_size)
+        return response.SerializeToString()
+
+
+# ".../retail/<tenant>/user_event?method=import" -> "ImportUserEvents",
+# and the legacy ".../import_users" -> "ImportUsers"
+def _import_api_name(path: str) -> str:
+    parts = urllib.parse.urlsplit(path)
+    last_segment = parts.path.rstrip("/").rsplit("/", 1)[-1]
+    method = urllib.parse.parse_qs(parts.query).get("method", [""])[0]
+    if len(method) > 0:
+        last_segment = method + "_" + last_segment + "s"
+    return "".join(part[:1].upper() + part[1:] for part in last_segment.split("_"))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # The headers and body are written separately, without TCP_NODELAY the
+    # body waits for the delayed ack of client on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        self._reply(self.server.mock.handle(self.path, body))
+
+    def do_GET(self):
+        self._reply(self.server.mock.handle(self.path, b""))
+
+    def _reply(self, body: Optional[bytes]):
+        if body is None:
+            # Close the connection without response, like a broken network
+            self.close_connection = True
+            return
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-protobuf")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client has timed out and closed the connection, such as a stalled request
+            self.close_connection = True
+
+    def log_message(self, fmt, *args):
+        return
+
+
+def fault_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-distribution", default=LATENCY_FIXED, choices=LATENCY_DISTRIBUTIONS)
+    parser.add_argument("--latency", type=float, default=0.005, help="mean processing seconds of mock server")
+    parser.add_argument("--latency-spread", type=float, default=0.0,
+                        help="max distance from mean of uniform, or sigma of lognormal")
+    parser.add_argument("--max-latency", type=float, default=0.0, help="cap of latency seconds, 0 means no cap")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="rate of TOO_MANY_REQUEST responses")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="rate of connections closed without response, which are not retried by helpers")
+    parser.add_argument("--stall-rate", type=float, default=0.0,
+                        help="rate of requests answered after --stall-seconds, which time out and are retried")
+    parser.add_argument("--stall-seconds", type=float, default=2.0,
+                        help="delay of stalled requests, longer than the timeout of client")
+    parser.add_argument("--operation-loss-rate", type=float, default=0.0, help="rate of operation loss")
+    parser.add_argument("--operation-duration", type=float, default=0.0,
+                        help="seconds of import operation running before done")
+    parser.add_argument("--seed", type=int, default=None, help="random seed of faults")
+
+
+def fault_config_from_args(args: argparse.Namespace) -> FaultConfig:
+    latency = Latency(args.latency_distribution, args.latency, args.latency_spread, args.max_latency)
+    return FaultConfig(latency, args.overload_rate, args.drop_rate, args.operation_loss_rate,
+                       args.operation_duration, args.seed, args.stall_rate, args.stall_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="run a local mock BytePlus server with fault injection")
+    parser.add_argument("--industry", default="retail", help="the industry of clients sending requests")
+    parser.add_argument("--port", type=int, default=8080)
+    fault_args(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = MockServer(args.industry, fault_config_from_args(args), args.port).start()
+    log.info("mock server is serving at %s", server.host)
+    try:
+        while True:
+            time.sleep(10)
+            log.info("requests:%s faults:%s", server.request_counts, server.fault_counts)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import datetime
+import json
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("synthetic_data requires numpy, install it by 'pip3 install numpy'")
+
+from example.common.columnar_converter import to_dict_batches, to_message_batches
+
+_EVENT_TYPES = np.array(["impression", "click", "add-cart", "purchase"])
+
+# The funnel of user behaviors, most events are impressions
+_EVENT_TYPE_WEIGHTS = np.array([0.62, 0.25, 0.09, 0.04])
+
+_PLATFORMS = np.array(["android", "ios", "web"])
+
+_PLATFORM_WEIGHTS = np.array([0.5, 0.35, 0.15])
+
+_GENDERS = np.array(["male", "female", "unknown"])
+
+_AGES = np.array(["0-17", "18-25", "26-35", "36-45", "46-55", "55+"])
+
+_CITIES = np.array(["beijing", "shanghai", "singapore", "jakarta", "bangkok", "tokyo", "seoul", "sydney"])
+
+_SCENES = np.array(["home", "product detail page", "search", "cart"])
+
+# The synthetic tables are columnar: column name -> numpy array of the same length.
+# Column names follow the flat keys of general/byteair data, such as "scene_page_number",
+# so the tables can be emitted as data dicts directly, or mapped to protobuf fields.
+
+
+class SyntheticConfig(object):
+    # @param users            count of users
+    # @param products         count of products
+    # @param start            the earliest event time
+    # @param end              the latest event time
+    # @param zipf_exponent    the skew of product popularity, larger means hotter top products
+    # @param session_length   the mean count of events in one session
+    # @param session_gap      the mean seconds between two events in one session
+    # @param category_depth   the depth of category tree
+    # @param category_fanout  the count of children of every category node
+    # @param seed             the random seed, the same seed generates the same data
+    def __init__(self, users: int = 100000, products: int = 50000,
+                 start: datetime.datetime = datetime.datetime(2021, 11, 1, tzinfo=datetime.timezone.utc),
+                 end: datetime.datetime = datetime.datetime(2021, 11, 8, tzinfo=datetime.timezone.utc),
+                 zipf_exponent: float = 1.1, session_length: float = 8, session_gap: float = 20,
+                 category_depth: int = 3, category_fanout: int = 8, seed: int = 0):
+        self.users = users
+        self.products = products
+        self.start = start
+        self.end = end
+        self.zipf_exponent = zipf_exponent
+        self.session_length = session_length
+        self.session_gap = session_gap
+        self.category_depth = category_depth
+        self.category_fanout = category_fanout
+        self.seed = seed
+
+
+class SyntheticDataGenerator(object):
+
+    def __init__(self, config: SyntheticConfig):
+        self._config = config
+        self._rng = np.random.default_rng(config.seed)
+        self._popularity = None
+
+    def users(self, count: int = None) -> dict:
+        rng = self._rng
+        count = self._config.users if count is None else count
+        registration_start = int(self._config.start.timestamp()) - 365 * 86400
+        return {
+            "user_id": _ids("user_", count),
+            "gender": rng.choice(_GENDERS, count),
+            "age": rng.choice(_AGES, count),
+            "city": rng.choice(_CITIES, count),
+            "registration_timestamp": rng.integers(registration_start, int(self._config.start.timestamp()), count),
+        }
+
+    def products(self, count: int = None) -> dict:
+        rng = self._rng
+        count = self._config.products if count is None else count
+        depth, fanout = self._config.category_depth, self._config.category_fanout
+        # Every product hangs on a random leaf of the category tree,
+        # the path of leaf is "cate_3", "cate_3_5", "cate_3_5_1"
+        leaves = rng.integers(0, fanout ** depth, count)
+        table = {"product_id": _ids("product_", count)}
+        path = np.full(count, "cate")
+        for level in range(depth):
+            node = (leaves // fanout ** (depth - level - 1)) % fanout
+            path = np.char.add(np.char.add(path, "_"), node.astype(str))
+            table["category_%d" % (level + 1)] = path
+        origin_price = np.round(rng.lognormal(3, 1, count), 2)
+        table["origin_price"] = origin_price
+        # A quarter of products are on sale
+        discount = np.where(rng.random(count) < 0.25, rng.uniform(0.5, 0.95, count), 1.0)
+        table["current_price"] = np.round(origin_price * discount, 2)
+        table["title"] = np.char.add("title of ", table["product_id"])
+        table["publish_timestamp"] = rng.integers(
+            int(self._config.start.timestamp()) - 180 * 86400, int(self._config.start.timestamp()), count)
+        return table
+
+    # Generate the user events grouped by sessions, every session belongs
+    # to one user, and its events are ordered by time with random gaps.
+    def user_events(self, count: int) -> dict:
+        rng = self._rng
+        config = self._config
+        # Draw a few more sessions than needed, and cut at "count"
+        session_count = max(1, int(count / config.session_length * 1.2) + 1)
+        lengths = rng.geometric(1 / config.session_length, session_count)
+        while lengths.sum() < count:
+            lengths = np.concatenate([lengths, rng.geometric(1 / config.session_length, session_count)])
+        session_of_event = np.repeat(np.arange(len(lengths)), lengths)[:count]
+        session_count = int(session_of_event[-1]) + 1 if count > 0 else 0
+
+        start, end = int(config.start.timestamp()), int(config.end.timestamp())
+        session_start = rng.integers(start, end, session_count)
+        session_user = rng.integers(0, config.users, session_count)
+
+        # The offset of event in session is the sum of gaps since the first event of session
+        gaps = rng.exponential(config.session_gap, count)
+        is_first = np.ones(count, dtype=bool)
+        is_first[1:] = session_of_event[1:] != session_of_event[:-1]
+        gaps[is_first] = 0
+        elapsed = np.cumsum(gaps)
+        first_index = np.flatnonzero(is_first)
+        offsets = elapsed - elapsed[first_index][session_of_event]
+        timestamps = np.minimum(session_start[session_of_event] + offsets.astype(np.int64), end - 1)
+
+        user_index = session_user[session_of_event]
+        product_index = self._popular_products(count)
+        return {
+            "user_id": np.char.add("user_", user_index.astype(str)),
+            "event_type": rng.choice(_EVENT_TYPES, count, p=_EVENT_TYPE_WEIGHTS),
+            "event_timestamp": timestamps,
+            "product_id": np.char.add("product_", product_index.astype(str)),
+            "session_id": np.char.add("sess_", session_of_event.astype(str)),
+            "scene_scene_name": rng.choice(_SCENES, count),
+            "scene_page_number": rng.integers(1, 6, count),
+            "scene_offset": rng.integers(0, 20, count),
+            "device_platform": rng.choice(_PLATFORMS, count, p=_PLATFORM_WEIGHTS),
+        }
+
+    def _popular_products(self, count: int) -> np.ndarray:
+        if self._popularity is None:
+            # Zipfian popularity: the k-th hottest product is chosen with weight 1/k^s,
+            # and the rank is shuffled so that hot products are not the smallest ids.
+            ranks = np.arange(1, self._config.products + 1)
+            weights = 1 / np.power(ranks, self._config.zipf_exponent)
+            self._popularity = (weights / weights.sum(), self._rng.permutation(self._config.products))
+        probabilities, rank_to_product = self._popularity
+        return rank_to_product[self._rng.choice(len(probabilities), count, p=probabilities)]
+
+
+def _ids(prefix: str, count: int) -> np.ndarray:
+    return np.char.add(prefix, np.arange(count).astype(str))
+
+
+def table_size(table: dict) -> int:
+    for column in table.values():
+        return len(column)
+    return 0
+
+
+# Emit the table as data dicts of general/byteair in batches.
+#
+# @param table      the columnar table
+# @param batch_size count of dicts in one batch
+# @param rename     optional, column name -> key of data dict
+def to_dicts(table: dict, batch_size: int = 10000, rename: dict = None):
+    rename = rename or {}
+    return to_dict_batches(table, {rename.get(name, name): name for name in table}, batch_size)
+
+
+# Emit the table as protobuf messages in batches.
+#
+# @param table         the columnar table
+# @param message_class the message class, such as UserEvent of retail
+# @param field_map     field path of message -> column name, the path can
+#                      be nested, such as "scene.page_number"
+# @param batch_size    count of messages in one batch
+def to_messages(table: dict, message_class, field_map: dict, batch_size: int = 2000):
+    return to_message_batches(table, message_class, field_map, batch_size)
+
+
+# The field map of retail/retailv2 UserEvent from synthetic events
+RETAIL_USER_EVENT_FIELDS = {
+    "user_id": "user_id",
+    "event_type": "event_type",
+    "event_timestamp": "event_timestamp",
+    "product_id": "product_id",
+    "scene.scene_name": "scene_scene_name",
+    "scene.page_number": "scene_page_number",
+    "scene.offset": "scene_offset",
+    "device.platform": "device_platform",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate synthetic data as json lines of general/byteair")
+    parser.add_argument("--kind", default="user_events", choices=("users", "products", "user_events"))
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True, help="the json lines file to write")
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(SyntheticConfig(users=args.users, products=args.products, seed=args.seed))
+    start = time.perf_counter()
+    table = getattr(generator, args.kind)(args.count)
+    generated = time.perf_counter()
+    with open(args.output, "w", encoding="utf-8") as f:
+        for batch in to_dicts(table):
+            f.writelines(json.dumps(data, separators=(",", ":")) + "\n" for data in batch)
+    print("generate %d %s cost %.2fs, write cost %.2fs" %
+          (table_size(table), args.kind, generated - start, time.perf_counter() - generated))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,8 +10,17 @@ from byteplus.core import Region, BizException, Option, NetException
 from byteplus.byteair import Client, ClientBuilder
 from byteplus.byteair.protocol import *
 from byteplus.common.protocol import DoneResponse
+from example.common.connection_pool import PoolConfig, PooledTransport, install_pooled_transport, \
+    pool_size_for_workers
+from example.common.daily_sync import DailySync
+from example.common.data_validator import DataValidator
+from example.common.date_partitioner import PartitionedUpload, partition_by_date
+from example.common.deadline import Deadline
+from example.common.json_lines import encode_lines, write_json_lines
 from example.common.request_helper import RequestHelper
 from example.common.status_helper import is_upload_success, is_success, is_success_code
+from example.common.upload_session import UploadSession
+from example.common.warm_up import client_hosts, warm_up as do_warm_up
 from example.byteair.concurrent_helper import ConcurrentHelper
 from example.byteair.mock_hlper import mock_data_list
 
@@ -72,6 +81,18 @@ request_helper: RequestHelper = RequestHelper(client)
 
 concurrent_helper: ConcurrentHelper = ConcurrentHelper(client)
 
+# Keep the connections alive and reuse them among the workers of concurrent_helper,
+# rather than re-handshaking for every request.
+pooled_transport: PooledTransport = install_pooled_transport(
+    PoolConfig(pool_size=pool_size_for_workers(concurrent_helper.max_workers),
+               prewarm_connections=concurrent_helper.max_workers))
+
+# 按topic在本地校验数据，可通过"DataValidator(schemas)"修改schema
+data_validator: DataValidator = DataValidator()
+
+# 校验不通过的数据保存在此文件中
+REJECTED_ROWS_PATH = "rejected_rows.jsonl"
+
 DEFAULT_RETRY_TIMES = 2
 
 DEFAULT_WRITE_TIMEOUT = timedelta(milliseconds=800)
@@ -84,15 +105,34 @@ DEFAULT_PREDICT_TIMEOUT = timedelta(milliseconds=800)
 
 DEFAULT_ACK_IMPRESSIONS_TIMEOUT = timedelta(milliseconds=800)
 
+# 历史数据文件，每行一条json数据
+HISTORY_DATA_PATH = "history_data.jsonl"
+
+# The hosts connected by client, which are resolved, pinged and pre-connected when warming up.
+# It's the default host of Region.AIR, which has no default hosts in sdk context.
+# The hosts set by "ClientBuilder.hosts" are used instead if any.
+WARM_UP_HOSTS = ["byteair-api-cn1.snssdk.com"]
+
 # default logLevel is Warning
 logging.basicConfig(level=logging.NOTSET)
 
 
 def main():
+    # Pay the cold-start cost before the real requests
+    warm_up()
+
     # 数据上传
     write_data_example()
+    # 上传已编码的json行数据，如天级文件中的数据
+    write_json_lines_example()
     # 标识天级离线数据上传完成
     done_example()
+    # 按topic和日期范围分块并发上传天级数据，全部上传成功后自动调用done，中断后可断点续传
+    daily_sync_example()
+    # 历史数据断点续传，重启后从上次确认的文件偏移继续上传
+    history_sync_example()
+    # 包含多天数据的行为按日期分组并发上传，每天的数据上传完成后立即调用done
+    partitioned_write_example()
     # 请求推荐服务获取推荐结果
     predict_example()
 
@@ -101,6 +141,17 @@ def main():
     os.kill(os.getpid(), SIGKILL)
 
 
+def warm_up():
+    # Resolve and ping the hosts, open pooled connections and send a canary request.
+    # The returned hosts are sorted by latency, which can be set by "ClientBuilder.hosts".
+    hosts, scheme = client_hosts(client, WARM_UP_HOSTS)
+    do_warm_up(hosts, pooled_transport, scheme, canary=_predict_canary)
+
+
+def _predict_canary():
+    client.predict(build_predict_request(), *default_opts(DEFAULT_PREDICT_TIMEOUT))
+
+
 # 数据上传example
 def write_data_example():
     # 此处为测试数据，实际调用时需注意字段类型和格式
@@ -114,12 +165,19 @@ def write_data_example():
     # 传输实时数据
     # opts: tuple = streaming_write_options()
 
+    # 发送前剔除错误数据，避免整个请求失败
+    data_list, report = data_validator.validate(topic, data_list)
+    if report.rejected_count > 0:
+        report.save(REJECTED_ROWS_PATH)
+    if len(data_list) == 0:
+        return
+
     def call(call_data_list, *call_opts: Option) -> WriteResponse:
         return client.write_data(call_data_list, topic, *call_opts)
 
     try:
         # 带重试的请求，自行实现重试时请参考此处重试逻辑
-        response = request_helper.do_with_retry(call, data_list, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(call, data_list, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write occur err, msg:%s", e)
         return
@@ -131,6 +189,27 @@ def write_data_example():
     return
 
 
+def write_json_lines_example():
+    # 也可以通过"read_lines"从json lines文件中读取，数据不会被重复解析和编码
+    lines: list = encode_lines(mock_data_list(2))
+    topic: str = TOPIC_USER
+    opts: tuple = daily_write_options(datetime(year=2021, month=11, day=1))
+
+    def call(call_lines: list, *call_opts: Option) -> WriteResponse:
+        return write_json_lines(client, call_lines, topic, *call_opts)
+
+    try:
+        response = request_helper.do_write(call, lines, opts, DEFAULT_RETRY_TIMES)
+    except BizException as e:
+        log.error("write json lines occur err, msg:%s", e)
+        return
+    if is_upload_success(response.status):
+        log.info("write json lines success")
+        return
+    log.error("write json lines find failure info, msg:%s errItems:%s", response.status, response.errors)
+    return
+
+
 # 实时数据同步请求参数说明，请根据说明修改
 def streaming_write_options() -> tuple:
     # customer_headers = {}
@@ -207,11 +286,80 @@ def done_options() -> tuple:
     )
 
 
+def daily_sync_example():
+    # 已确认的数据块记录在checkpoint文件中，重新运行时跳过已成功的数据块
+    daily_sync = DailySync(request_helper, client.write_data, client.done, daily_write_options, done_options,
+                           checkpoint_path="daily_sync_checkpoint.json")
+
+    # 按(topic, 日期)返回数据块，每次运行需按相同顺序返回
+    def source(topic: str, date: datetime):
+        for _ in range(2):
+            yield mock_data_list(2)
+
+    done_keys, failed_keys = daily_sync.run([TOPIC_USER], datetime(year=2021, month=11, day=1),
+                                            datetime(year=2021, month=11, day=3), source)
+    log.info("[DailySync] finish, done:%s failed:%s", done_keys, failed_keys)
+
+
+def history_sync_example():
+    if not os.path.exists(HISTORY_DATA_PATH):
+        log.info("[HistorySync] skip, file not exist, path:%s", HISTORY_DATA_PATH)
+        return
+    topic: str = TOPIC_BEHAVIOR
+
+    def write(lines: list, *opts: Option) -> WriteResponse:
+        return write_json_lines(client, lines, topic, *opts)
+
+    # 同一份数据的session_id需保持不变，请求的Request-Id由session_id和文件偏移生成，重启后重发的数据会被服务端去重
+    session = UploadSession(request_helper, write, history_write_options,
+                            checkpoint_path=HISTORY_DATA_PATH + ".checkpoint", session_id="history_" + topic)
+    try:
+        session.upload_file(HISTORY_DATA_PATH, batch_size=5000)
+    except BizException as e:
+        log.error("[HistorySync] stop at offset:%d, rerun to continue, msg:%s", session.offset, e)
+
+
+def partitioned_write_example():
+    topic: str = TOPIC_BEHAVIOR
+    # 按event_timestamp所在日期分组，每组使用各自日期的daily_write_options
+    partitions = partition_by_date(mock_data_list(10), lambda data: data["event_timestamp"])
+
+    def upload(date: datetime, data_list: list, is_end: bool) -> bool:
+        def call(call_data_list, *call_opts: Option) -> WriteResponse:
+            return client.write_data(call_data_list, topic, *call_opts)
+
+        response = request_helper.do_write(call, data_list, daily_write_options(date), DEFAULT_RETRY_TIMES)
+        return is_upload_success(response.status)
+
+    def done(date: datetime) -> bool:
+        def call(call_date_list: list, *call_opts: Option) -> DoneResponse:
+            return client.done(call_date_list, topic, *call_opts)
+
+        response = request_helper.do_with_retry(call, [date], done_options(), DEFAULT_RETRY_TIMES)
+        return is_success(response.status)
+
+    upload_task = PartitionedUpload(upload, done, max_workers=concurrent_helper.max_workers)
+    finished_dates, failed_dates = upload_task.run(partitions)
+    log.info("[PartitionedWrite] finish, finished:%s failed:%s", finished_dates, failed_dates)
+
+
+# 历史数据同步请求参数说明，请根据说明修改
+def history_write_options() -> tuple:
+    return (
+        # 必传，历史数据同步阶段
+        Option.with_stage(STAGE_HISTORY_SYNC),
+        # 可选，请求超时时间，根据实际情况调整，建议设置大些
+        Option.with_timeout(DEFAULT_IMPORT_TIMEOUT),
+    )
+
+
 # 推荐服务请求example
 def predict_example():
+    # 包括构建请求在内的整个预测在DEFAULT_PREDICT_TIMEOUT内完成
+    deadline = Deadline.after(DEFAULT_PREDICT_TIMEOUT)
     predict_request: PredictRequest = build_predict_request()
-    predict_opts = default_opts(DEFAULT_PREDICT_TIMEOUT)
     try:
+        predict_opts = deadline.bound_opts(default_opts(DEFAULT_PREDICT_TIMEOUT))
         predict_response = client.predict(predict_request, *predict_opts)
     except (NetException, BizException) as e:
         log.error("predict occur error, msg:%s", e)
@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+
+# A json file holding the progress of long running uploads, which is
+# replaced atomically, so a crash during saving keeps the last progress.
+# The small changes between savings, such as an acknowledged chunk, can be
+# appended to a journal file next to it, rather than rewriting the whole state.
+class Checkpoint(object):
+
+    def __init__(self, path: str):
+        self._path = path
+        self._journal_path = path + ".journal"
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    # @return the saved state, or None if nothing is saved
+    def load(self) -> Optional[dict]:
+        if not os.path.exists(self._path):
+            return None
+        with open(self._path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, state: dict) -> None:
+        tmp_path = self._path + ".tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, separators=(",", ":"))
+                f.flush()
+                # The progress must be on disk before it's treated as committed
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._path)
+            # The saved state contains the records of journal
+            if os.path.exists(self._journal_path):
+                os.remove(self._journal_path)
+
+    # Append a record to the journal, which is cleared by "save"
+    def append(self, record: dict) -> None:
+        with self._lock:
+            with open(self._journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    # @return the records appended after last saving, the torn last line of a crash is skipped
+    def journal(self) -> list:
+        if not os.path.exists(self._journal_path):
+            return []
+        records = []
+        with open(self._journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    log.warning("[Checkpoint] skip broken journal line, path:%s", self._journal_path)
+        return records
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in (self._path, self._journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,126 @@
+import math
+from typing import Optional
+
+from google.protobuf.message import Message
+
+from example.common.message_template import MessageTemplate
+from example.common.write_error_helper import rebatch
+
+# Convert columnar tables into the items of "WriteXXX" requests column at a time.
+# The table can be a pandas DataFrame, a pyarrow Table, or a dict of
+# column name -> numpy array or list, pandas and pyarrow are not imported
+# here, so they are only needed by callers who have such tables.
+
+
+# Build protobuf messages in batches, such as "User"/"Product"/"UserEvent".
+# Every column of a batch is read into a list once and set to all messages,
+# no per-row dict is created. Null values leave the field unset.
+#
+# @param table         the columnar table
+# @param message_class the message class of items
+# @param field_map     field path -> column name, the path can be nested, such as
+#                      "location.city" and "price.current_price". A repeated field,
+#                      such as "tags", reads a column holding lists
+# @param batch_size    count of messages in one batch, "WriteXXX" accepts 2000 at most
+# @param prototype     optional, holding the fields shared by all rows
+def to_message_batches(table, message_class, field_map: dict, batch_size: int = 2000,
+                       prototype: Optional[Message] = None):
+    template = MessageTemplate(prototype if prototype is not None else message_class())
+    # Resolve every path before converting, so a wrong path fails fast
+    setters = [(template.setter(path), column) for path, column in field_map.items()]
+    size = len(table) if not isinstance(table, dict) else _dict_table_size(table)
+    for begin in range(0, size, batch_size):
+        end = min(begin + batch_size, size)
+        messages = [template.build() for _ in range(end - begin)]
+        for setter, column in setters:
+            for message, value in zip(messages, column_values(table, column, begin, end)):
+                if value is not None:
+                    setter(message, value)
+        yield messages
+
+
+# Build "WriteXXXRequest" in batches, the items are put into
+# the repeated item field of request, such as "users" of "WriteUsersRequest".
+#
+# @param request the request holding other fields such as "extra", it's copied for every batch
+def to_request_batches(table, request: Message, message_class, field_map: dict,
+                       batch_size: int = 2000, prototype: Optional[Message] = None):
+    for messages in to_message_batches(table, message_class, field_map, batch_size, prototype):
+        yield rebatch(request, messages)
+
+
+# Build the data dicts of general/byteair in batches.
+#
+# @param field_map optional, key of data dict -> column name,
+#                  all columns are used with their names by default
+def to_dict_batches(table, field_map: Optional[dict] = None, batch_size: int = 10000):
+    if field_map is None:
+        field_map = {name: name for name in column_names(table)}
+    keys = list(field_map.keys())
+    columns = list(field_map.values())
+    size = len(table) if not isinstance(table, dict) else _dict_table_size(table)
+    for begin in range(0, size, batch_size):
+        end = min(begin + batch_size, size)
+        values = [column_values(table, column, begin, end) for column in columns]
+        rows = zip(*values)
+        if any(None in column for column in values):
+            # Null values are omitted rather than sent as null
+            yield [{key: value for key, value in zip(keys, row) if value is not None} for row in rows]
+            continue
+        yield [dict(zip(keys, row)) for row in rows]
+
+
+def column_names(table) -> list:
+    if isinstance(table, dict):
+        return list(table.keys())
+    if hasattr(table, "column_names"):
+        # pyarrow.Table
+        return list(table.column_names)
+    # pandas.DataFrame
+    return list(table.columns)
+
+
+# Read the rows in [begin, end) of a column as a python list,
+# and the nulls (None, NaN of float columns, null of arrow) are None.
+def column_values(table, name: str, begin: int, end: int) -> list:
+    if isinstance(table, dict):
+        column = table[name][begin:end]
+        return _dict_values(column.tolist() if hasattr(column, "tolist") else list(column))
+    if hasattr(table, "column_names"):
+        return _arrow_values(table.column(name).slice(begin, end - begin))
+    return _pandas_values(table[name].iloc[begin:end])
+
+
+def _dict_values(values: list) -> list:
+    # The NaN of float columns, such as "numpy.nan" and "float('nan')", is null as in pandas
+    if not any(_is_nan(value) for value in values):
+        return values
+    return [None if _is_nan(value) else value for value in values]
+
+
+def _is_nan(value) -> bool:
+    return isinstance(value, float) and math.isnan(value)
+
+
+def _arrow_values(column) -> list:
+    # The numeric columns without nulls are viewed as numpy arrays without copy,
+    # the others, such as strings and lists, are converted by arrow in C++.
+    if column.null_count == 0 and column.num_chunks == 1:
+        try:
+            return column.chunk(0).to_numpy(zero_copy_only=True).tolist()
+        except ValueError:
+            pass
+    return column.to_pylist()
+
+
+def _pandas_values(column) -> list:
+    values = column.tolist()
+    if not column.hasnans:
+        return values
+    return [None if is_null else value for value, is_null in zip(values, column.isna().tolist())]
+
+
+def _dict_table_size(table: dict) -> int:
+    for column in table.values():
+        return len(column)
+    return 0
@@ -0,0 +1,204 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from byteplus.core import BizException, Option
+from example.common.dead_letter import DeadLetterStore, write_failure_recorder
+from example.common.log_helper import HelperLog
+from example.common.request_helper import RequestHelper
+from example.common.status_helper import is_success, is_success_code
+from example.common.tracing import get_tracer, request_attributes, submit_traced
+
+log = logging.getLogger(__name__)
+
+helper_log = HelperLog(log)
+
+# "WriteXXX", resend the failed items
+MODE_WRITE = "write"
+
+# "ImportXXX", poll the result of operation
+MODE_IMPORT = "import"
+
+MODE_ACK = "ack"
+
+MODE_DONE = "done"
+
+# "callback" of general/byteair, whose response has code rather than status
+MODE_CALLBACK = "callback"
+
+_TAGS = {
+    MODE_WRITE: "AsyncWrite",
+    MODE_IMPORT: "AsyncImport",
+    MODE_ACK: "AsyncAckImpression",
+    MODE_DONE: "AsyncDone",
+    MODE_CALLBACK: "AsyncCallback",
+}
+
+_RETRY_TIMES = 2
+
+
+class _Route(object):
+
+    def __init__(self, call_name: str, method, mode: str, handler, response_class):
+        self.call_name = call_name
+        # The client method, resolved when it's registered
+        self.method = method
+        self.mode = mode
+        self.tag = _TAGS[mode]
+        self.handler = handler
+        self.response_class = response_class
+
+
+# Send the requests in a thread pool. The request types are registered with
+# the client method, the mode and the response type of import, and every
+# submitted request is dispatched by its type through a dict. The industries
+# register their routes in "_register_routes".
+class ConcurrentHelper(object):
+
+    # @param dead_letter_store optional, keep the permanently failed requests for replaying
+    # @param max_workers       count of requests sent at the same time
+    # @param max_pending       optional, max count of requests submitted and unfinished,
+    #                          the submitting blocks when it's reached
+    def __init__(self, client, dead_letter_store: Optional[DeadLetterStore] = None, max_workers: int = 5,
+                 max_pending: Optional[int] = None):
+        self._client = client
+        self._request_helper = RequestHelper(client)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._dead_letter_store = dead_letter_store
+        self._max_workers = max_workers
+        self._pending = None if max_pending is None else threading.BoundedSemaphore(max_pending)
+        self._handlers = {
+            MODE_WRITE: self._do_write,
+            MODE_IMPORT: self._do_import,
+            MODE_ACK: self._do_with_retry,
+            MODE_DONE: self._do_with_retry,
+            MODE_CALLBACK: self._do_with_retry,
+        }
+        # request type, or call name of general/byteair -> _Route
+        self._routes = {}
+        self._register_routes()
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def _register_routes(self) -> None:
+        return
+
+    # @param key            the request type, or the call name for the data list of general/byteair
+    # @param call_name      the method name of client, such as "write_users"
+    # @param mode           one of MODE_WRITE, MODE_IMPORT, MODE_ACK, MODE_DONE and MODE_CALLBACK
+    # @param response_class the response type of MODE_IMPORT
+    # @throws ValueError if the client has no such method, so a renamed method
+    #                    fails when the helper is built rather than when dispatching
+    def register(self, key, call_name: str, mode: str, response_class=None) -> None:
+        if mode == MODE_IMPORT and response_class is None:
+            raise ValueError("response class is required by import, call:%s" % call_name)
+        method = getattr(self._client, call_name, None)
+        if not callable(method):
+            raise ValueError("client has no method:%s" % call_name)
+        self._routes[key] = _Route(call_name, method, mode, self._handlers[mode], response_class)
+
+    def submit_request(self, request, *opts: Option) -> Future:
+        route = self._routes.get(type(request))
+        if route is None:
+            raise BizException("can't support this request type:" + str(type(request)))
+        return self._submit(route, request, opts, ())
+
+    def wait_and_shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    # @param args the arguments of client method after the payload, such as topic
+    def _submit_call(self, call_name: str, payload, opts: tuple, args: tuple = ()) -> Future:
+        return self._submit(self._routes[call_name], payload, opts, args)
+
+    def _submit(self, route: _Route, payload, opts: tuple, args: tuple) -> Future:
+        attributes = None
+        if get_tracer().enabled:
+            # The request id is decided here rather than in RequestHelper, so that
+            # the queue spans and the attempt spans carry the same one
+            opts = (Option.with_request_id(str(uuid.uuid1())),) + opts
+            attributes = request_attributes(payload, opts)
+            attributes["call"] = route.call_name
+        if self._pending is not None:
+            self._pending.acquire()
+        try:
+            future = submit_traced(self._executor, "concurrent_helper", route.handler, route, payload, opts, args,
+                                   attributes=attributes)
+        except BaseException:
+            if self._pending is not None:
+                self._pending.release()
+            raise
+        if self._pending is not None:
+            future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def _call_of(self, route: _Route, args: tuple):
+        method = route.method
+        if len(args) == 0:
+            return method
+
+        def call(payload, *opts: Option):
+            return method(payload, *args, *opts)
+
+        # Named as the client method for the logs and retry budget of RequestHelper
+        call.__name__ = route.call_name
+        return call
+
+    def _do_write(self, route: _Route, payload, opts: tuple, args: tuple) -> None:
+        call_name = route.call_name
+        on_permanent_failure = write_failure_recorder(self._dead_letter_store, call_name, payload, args)
+        try:
+            rsp = self._request_helper.do_write(self._call_of(route, args), payload, opts, _RETRY_TIMES,
+                                                on_permanent_failure)
+            if is_success(rsp.status):
+                helper_log.success(route.tag)
+                return
+            helper_log.failure(route.tag, call_name, rsp)
+            if len(rsp.errors) == 0:
+                # The failed items with errors have been recorded by "on_permanent_failure"
+                self._dead_letter(call_name, payload, rsp.status.message, args)
+        except BaseException as e:
+            helper_log.failure(route.tag, call_name, e)
+            self._dead_letter(call_name, payload, str(e), args)
+
+    def _do_import(self, route: _Route, payload, opts: tuple, args: tuple) -> None:
+        call_name = route.call_name
+        response = route.response_class()
+        try:
+            self._request_helper.do_import(self._call_of(route, args), payload, response, opts, _RETRY_TIMES)
+            if is_success(response.status):
+                helper_log.success(route.tag)
+                return
+            helper_log.failure(route.tag, call_name, response)
+            self._dead_letter(call_name, payload, response.status.message, args, route.response_class)
+        except BaseException as e:
+            helper_log.failure(route.tag, call_name, e)
+            self._dead_letter(call_name, payload, str(e), args, route.response_class)
+
+    def _do_with_retry(self, route: _Route, payload, opts: tuple, args: tuple) -> None:
+        call_name = route.call_name
+        try:
+            rsp = self._request_helper.do_with_retry(self._call_of(route, args), payload, opts, _RETRY_TIMES)
+            if route.mode == MODE_CALLBACK:
+                success, message = is_success_code(rsp.code), rsp.message
+            else:
+                success, message = is_success(rsp.status), rsp.status.message
+            if success:
+                helper_log.success(route.tag)
+                return
+            helper_log.failure(route.tag, call_name, rsp)
+            self._dead_letter(call_name, payload, message, args)
+        except BaseException as e:
+            helper_log.failure(route.tag, call_name, e)
+            self._dead_letter(call_name, payload, str(e), args)
+
+    def _dead_letter(self, call_name: str, payload, reason: str, args: tuple = (), response_type=None):
+        if self._dead_letter_store is None:
+            return
+        try:
+            self._dead_letter_store.record(call_name, payload, reason, args, response_type)
+        except BaseException as e:
+            log.error("[DeadLetter] record occur error, call:%s msg:%s", call_name, str(e))
@@ -0,0 +1,193 @@
+import datetime
+import importlib
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+log = logging.getLogger(__name__)
+
+# The module of sdk which sends http requests by the module level
+# functions of "requests", a new connection is created for every request.
+_SDK_HTTP_MODULE = "byteplus.core.http_caller"
+
+# The connections used by sdk itself besides the concurrent workers,
+# such as the main thread, host availabler and metrics reporter.
+_EXTRA_CONNECTIONS = 3
+
+# The path pinged by host availabler, which is also
+# requested to open connections when pre-warming.
+PING_PATH = "/predict/api/ping"
+
+_PREWARM_TIMEOUT = datetime.timedelta(milliseconds=800)
+
+_installed_transport = None
+
+_install_lock = threading.Lock()
+
+
+def pool_size_for_workers(workers: int) -> int:
+    # Every worker may hold one connection to the same host at the same time,
+    # fewer connections make the workers re-handshake when pool is full.
+    return workers + _EXTRA_CONNECTIONS
+
+
+class PoolConfig(object):
+    # @param pool_size           max count of kept connections per host
+    # @param keep_alive          enable tcp keep-alive, so that idle connections are not dropped silently
+    # @param keep_alive_interval the idle time before sending tcp keep-alive probes
+    # @param max_idle_time       the pooled connections idle longer than it are closed before next request,
+    #                            which should be less than the idle timeout of server or LB
+    # @param prewarm_connections count of connections opened per host when pre-warming
+    def __init__(self,
+                 pool_size: int = pool_size_for_workers(5),
+                 keep_alive: bool = True,
+                 keep_alive_interval: datetime.timedelta = datetime.timedelta(seconds=30),
+                 max_idle_time: datetime.timedelta = datetime.timedelta(seconds=50),
+                 prewarm_connections: int = 0):
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.keep_alive_interval = keep_alive_interval
+        self.max_idle_time = max_idle_time
+        self.prewarm_connections = prewarm_connections
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+
+    def __init__(self, socket_options: list, **kwargs):
+        self._socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self._socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+# A drop-in replacement of the "requests" module functions used by sdk,
+# which sends all requests through one pooled session.
+class PooledTransport(object):
+
+    def __init__(self, config: PoolConfig):
+        self._config = config
+        self._lock = threading.Lock()
+        self._last_used = time.monotonic()
+        self._session = self._new_session()
+
+    # Other attributes such as "exceptions" are the same as "requests" module
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+    @property
+    def config(self) -> PoolConfig:
+        return self._config
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        return self._idle_checked_session().request(method, url, **kwargs)
+
+    # Open connections to every host before serving, so that
+    # the first requests do not pay for dns and tls handshake.
+    #
+    # @return count of the connections opened successfully
+    def prewarm(self, hosts: list, scheme: str = "https", connections: Optional[int] = None) -> int:
+        if connections is None:
+            connections = self._config.prewarm_connections
+        connections = min(connections, self._config.pool_size)
+        if connections <= 0 or len(hosts) == 0:
+            return 0
+        urls = ["%s://%s%s" % (scheme, host, PING_PATH) for host in hosts for _ in range(connections)]
+        # Requests in parallel, otherwise the same connection will be reused
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            opened = sum(executor.map(self._open_connection, urls))
+        log.info("[ConnectionPool] prewarm finish, hosts:%s opened:%d", hosts, opened)
+        return opened
+
+    def close(self):
+        with self._lock:
+            self._session.close()
+
+    def _open_connection(self, url: str) -> int:
+        try:
+            self.get(url, timeout=_PREWARM_TIMEOUT.total_seconds())
+            return 1
+        except requests.RequestException as e:
+            log.warning("[ConnectionPool] prewarm fail, url:%s msg:%s", url, e)
+            return 0
+
+    def _idle_checked_session(self) -> requests.Session:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_used > self._config.max_idle_time.total_seconds():
+                # The server may have closed the idle connections, reusing
+                # them leads to connection reset errors.
+                self._session.close()
+                self._session = self._new_session()
+            self._last_used = now
+            return self._session
+
+    def _new_session(self) -> requests.Session:
+        adapter = _KeepAliveAdapter(
+            self._socket_options(),
+            pool_connections=self._config.pool_size,
+            pool_maxsize=self._config.pool_size,
+            # The retry is controlled by RequestHelper
+            max_retries=0,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _socket_options(self) -> list:
+        options = list(HTTPConnection.default_socket_options)
+        if not self._config.keep_alive:
+            return options
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        interval = int(self._config.keep_alive_interval.total_seconds())
+        # These options are not supported by every platform
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, interval))
+        if hasattr(socket, "TCP_KEEPINTVL"):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval))
+        return options
+
+
+# Make the sdk send requests through a pooled transport.
+# It takes effect on all clients in current process, and
+# the transport installed before will be closed.
+def install_pooled_transport(config: PoolConfig) -> PooledTransport:
+    global _installed_transport
+    sdk_http_module = importlib.import_module(_SDK_HTTP_MODULE)
+    if not hasattr(sdk_http_module, "requests"):
+        log.warning("[ConnectionPool] sdk doesn't send requests by 'requests' module, skip install")
+        return PooledTransport(config)
+    with _install_lock:
+        transport = PooledTransport(config)
+        if _installed_transport is not None:
+            _installed_transport.close()
+        sdk_http_module.requests = transport
+        _installed_transport = transport
+    log.info("[ConnectionPool] install pooled transport, pool_size:%d", config.pool_size)
+    return transport
+
+
+def uninstall_pooled_transport() -> None:
+    global _installed_transport
+    sdk_http_module = importlib.import_module(_SDK_HTTP_MODULE)
+    with _install_lock:
+        if _installed_transport is None:
+            return
+        sdk_http_module.requests = requests
+        _installed_transport.close()
+        _installed_transport = None
@@ -0,0 +1,185 @@
+import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from byteplus.core import BizException
+
+from example.common.checkpoint import Checkpoint
+from example.common.request_helper import RequestHelper
+from example.common.status_helper import is_success, is_upload_success
+from example.common.write_error_helper import is_write_finished
+
+log = logging.getLogger(__name__)
+
+_DATE_FORMAT = "%Y%m%d"
+
+
+def _key(topic: str, date: datetime.datetime) -> str:
+    return "%s|%s" % (topic, date.strftime(_DATE_FORMAT))
+
+
+def _dates(start: datetime.datetime, end: datetime.datetime) -> list:
+    dates = []
+    date = start
+    while date <= end:
+        dates.append(date)
+        date += datetime.timedelta(days=1)
+    return dates
+
+
+# Upload the daily data of topics in parallel chunks, and mark a date
+# of topic "done" only after all of its chunks are acknowledged.
+# The acknowledged chunks are appended to the journal of checkpoint file,
+# so a crashed sync resumes without resending them. A chunk is acknowledged
+# when only its permanently failed items are left, which are given to
+# "on_permanent_failure", since resending them fails again.
+#
+# It fits general/byteair directly. For the industries whose write api
+# has no topic, adapt it like:
+#   write = lambda request, topic, *opts: client.write_users(request, *opts)
+class DailySync(object):
+
+    # @param request_helper  retries the write and done requests
+    # @param write           write(chunk, topic, *opts) -> WriteResponse, such as "client.write_data"
+    # @param done            done(date_list, topic, *opts) -> DoneResponse, such as "client.done"
+    # @param write_options   write_options(date) -> opts, which should contain "Option.with_data_date(date)"
+    # @param done_options    done_options() -> opts
+    # @param checkpoint_path the file recording the progress
+    # @param max_workers     count of chunks uploaded at the same time
+    # @param done_batch_size max count of dates in one "done" request
+    # @param on_permanent_failure optional, see "RequestHelper.do_write", such as "write_failure_recorder"
+    def __init__(self, request_helper: RequestHelper, write, done, write_options, done_options,
+                 checkpoint_path: str, max_workers: int = 5, retry_times: int = 2, done_batch_size: int = 10,
+                 on_permanent_failure=None):
+        self._request_helper = request_helper
+        self._write = write
+        self._done = done
+        self._write_options = write_options
+        self._done_options = done_options
+        self._max_workers = max_workers
+        self._retry_times = retry_times
+        self._done_batch_size = done_batch_size
+        self._on_permanent_failure = on_permanent_failure
+        self._lock = threading.Lock()
+        self._checkpoint = Checkpoint(checkpoint_path)
+        state = self._checkpoint.load() or {}
+        # "topic|date" -> indexes of acknowledged chunks
+        self._acked = {key: set(indexes) for key, indexes in state.get("acked", {}).items()}
+        # "topic|date" -> count of chunks, recorded after all chunks are submitted
+        self._chunk_counts = state.get("chunk_counts", {})
+        self._finished = set(state.get("done", []))
+        for record in self._checkpoint.journal():
+            self._acked.setdefault(record["key"], set()).add(record["index"])
+
+    # Sync every date in [start, end] of every topic.
+    #
+    # @param source source(topic, date) -> iterable of chunks. The chunks must be
+    #               produced in the same order every time, since they're recorded by index
+    # @return the "topic|date" marked done, and the ones still having failed chunks
+    def run(self, topics: list, start: datetime.datetime, end: datetime.datetime, source) -> tuple:
+        failed_keys = set()
+        # Bound the chunks in memory, otherwise the source is read much faster than uploading
+        in_flight = threading.BoundedSemaphore(self._max_workers * 2)
+
+        def release(_):
+            in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = []
+            for topic in topics:
+                for date in _dates(start, end):
+                    key = _key(topic, date)
+                    if key in self._finished or self._is_complete(key):
+                        continue
+                    acked = self._acked.get(key, set())
+                    count = 0
+                    for index, chunk in enumerate(source(topic, date)):
+                        count += 1
+                        if index in acked:
+                            continue
+                        in_flight.acquire()
+                        future = executor.submit(self._upload, key, topic, date, index, chunk)
+                        future.add_done_callback(release)
+                        futures.append((key, future))
+                    with self._lock:
+                        self._chunk_counts[key] = count
+                        self._save()
+            for key, future in futures:
+                if not future.result():
+                    failed_keys.add(key)
+        done_keys = self._mark_done(topics, _dates(start, end))
+        if len(failed_keys) > 0:
+            log.error("[DailySync] some chunks fail, rerun to resend them, keys:%s", sorted(failed_keys))
+        return done_keys, sorted(failed_keys)
+
+    def _upload(self, key: str, topic: str, date: datetime.datetime, index: int, chunk) -> bool:
+        def call(call_chunk, *call_opts):
+            return self._write(call_chunk, topic, *call_opts)
+
+        try:
+            rsp = self._request_helper.do_write(call, chunk, self._write_options(date), self._retry_times,
+                                                self._on_permanent_failure)
+        except Exception as e:
+            # Any exception fails the chunk only, rather than escaping from "future.result()"
+            log.error("[DailySync] upload chunk occur err, key:%s index:%d msg:%s", key, index, e)
+            return False
+        if not is_write_finished(rsp):
+            log.error("[DailySync] upload chunk fail, key:%s index:%d rsp:%s", key, index, rsp.status)
+            return False
+        if not is_upload_success(rsp.status):
+            log.warning("[DailySync] upload chunk with items dropped, key:%s index:%d dropped:%d",
+                        key, index, len(rsp.errors))
+        with self._lock:
+            self._acked.setdefault(key, set()).add(index)
+            # Only a line is appended, the whole state is saved when a date is submitted or done
+            self._checkpoint.append({"key": key, "index": index})
+        return True
+
+    def _mark_done(self, topics: list, dates: list) -> list:
+        done_keys = []
+        for topic in topics:
+            complete_dates = [date for date in dates
+                              if _key(topic, date) not in self._finished and self._is_complete(_key(topic, date))]
+            for i in range(0, len(complete_dates), self._done_batch_size):
+                batch = complete_dates[i:i + self._done_batch_size]
+                if not self._do_done(topic, batch):
+                    continue
+                keys = [_key(topic, date) for date in batch]
+                with self._lock:
+                    self._finished.update(keys)
+                    for key in keys:
+                        # The finished dates no longer need the chunk progress
+                        self._acked.pop(key, None)
+                        self._chunk_counts.pop(key, None)
+                    self._save()
+                done_keys.extend(keys)
+        return done_keys
+
+    def _do_done(self, topic: str, date_list: list) -> bool:
+        def call(call_date_list, *call_opts):
+            return self._done(call_date_list, topic, *call_opts)
+
+        try:
+            rsp = self._request_helper.do_with_retry(call, date_list, self._done_options(), self._retry_times)
+        except BizException as e:
+            log.error("[DailySync] done occur err, topic:%s msg:%s", topic, e)
+            return False
+        if not is_success(rsp.status):
+            log.error("[DailySync] done fail, topic:%s rsp:%s", topic, rsp)
+            return False
+        log.info("[DailySync] done success, topic:%s dates:%s", topic,
+                 [date.strftime(_DATE_FORMAT) for date in date_list])
+        return True
+
+    def _is_complete(self, key: str) -> bool:
+        count = self._chunk_counts.get(key)
+        return count is not None and len(self._acked.get(key, ())) >= count
+
+    def _save(self) -> None:
+        # Called with the lock held
+        self._checkpoint.save({
+            "acked": {key: sorted(indexes) for key, indexes in self._acked.items()},
+            "chunk_counts": self._chunk_counts,
+            "done": sorted(self._finished),
+        })
@@ -0,0 +1,196 @@
+import json
+import logging
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+STRING = "string"
+
+INT = "int"
+
+FLOAT = "float"
+
+BOOL = "bool"
+
+# A string holding a json object, such as "extra_info"
+JSON = "json"
+
+STRING_LIST = "string_list"
+
+# The timestamps are in seconds, a timestamp larger than it is
+# probably in milliseconds, which is rejected by server.
+_MAX_SECONDS_TIMESTAMP = 10 ** 10
+
+
+class FieldSpec(object):
+    # @param field_type one of STRING, INT, FLOAT, BOOL, JSON and STRING_LIST
+    # @param required   whether the field must be present and not None
+    # @param min_value  optional, the min value of INT/FLOAT
+    # @param max_value  optional, the max value of INT/FLOAT
+    def __init__(self, field_type: str, required: bool = False,
+                 min_value: Optional[float] = None, max_value: Optional[float] = None):
+        self.field_type = field_type
+        self.required = required
+        self.min_value = min_value
+        self.max_value = max_value
+
+
+def _timestamp(required: bool = False) -> FieldSpec:
+    return FieldSpec(INT, required, min_value=0, max_value=_MAX_SECONDS_TIMESTAMP)
+
+
+# The schemas of the standard topics, "TOPIC_USER", "TOPIC_ITEM" and "TOPIC_BEHAVIOR"
+# of byteair. They only check the common fields, please change them according to
+# the schema of your project. The fields not in schema are not checked.
+DEFAULT_SCHEMAS = {
+    "user": {
+        "user_id": FieldSpec(STRING, required=True),
+        "registration_timestamp": _timestamp(),
+        "extra_info": FieldSpec(JSON),
+        "extra": FieldSpec(JSON),
+    },
+    "item": {
+        "product_id": FieldSpec(STRING, required=True),
+        "current_price": FieldSpec(FLOAT, min_value=0),
+        "origin_price": FieldSpec(FLOAT, min_value=0),
+        "publish_timestamp": _timestamp(),
+        "extra_info": FieldSpec(JSON),
+        "extra": FieldSpec(JSON),
+    },
+    "behavior": {
+        "user_id": FieldSpec(STRING, required=True),
+        "event_type": FieldSpec(STRING, required=True),
+        "event_timestamp": _timestamp(required=True),
+        "product_id": FieldSpec(STRING),
+        "scene_scene_name": FieldSpec(STRING),
+        "scene_page_number": FieldSpec(INT, min_value=0),
+        "scene_offset": FieldSpec(INT, min_value=0),
+        "purchase_count": FieldSpec(INT, min_value=0),
+        "extra_info": FieldSpec(JSON),
+        "extra": FieldSpec(JSON),
+    },
+}
+
+
+def _is_json_object(value) -> bool:
+    try:
+        return isinstance(json.loads(value), dict)
+    except ValueError:
+        return False
+
+
+# value -> whether its type is right, bool is excluded from numbers on purpose
+_TYPE_CHECKS = {
+    STRING: lambda value: type(value) is str,
+    INT: lambda value: type(value) is int,
+    FLOAT: lambda value: type(value) is float or type(value) is int,
+    BOOL: lambda value: type(value) is bool,
+    JSON: lambda value: type(value) is str and _is_json_object(value),
+    STRING_LIST: lambda value: type(value) is list and all(type(item) is str for item in value),
+}
+
+
+# Compile a field spec into a checker of column, which returns
+# the (index, reason) of the bad values in column.
+def _compile(name: str, spec: FieldSpec):
+    if spec.field_type not in _TYPE_CHECKS:
+        raise ValueError("unknown type '%s' of field '%s'" % (spec.field_type, name))
+    type_check = _TYPE_CHECKS[spec.field_type]
+    bad_type = "not %s" % spec.field_type
+    min_value, max_value = spec.min_value, spec.max_value
+    has_range = min_value is not None or max_value is not None
+    if min_value is None:
+        min_value = float("-inf")
+    if max_value is None:
+        max_value = float("inf")
+    out_of_range = "out of range [%s, %s]" % (spec.min_value, spec.max_value)
+
+    def check(column: list) -> list:
+        bad = []
+        for i, value in enumerate(column):
+            if value is None:
+                if spec.required:
+                    bad.append((i, "missing"))
+                continue
+            if not type_check(value):
+                bad.append((i, bad_type))
+                continue
+            if has_range and not min_value <= value <= max_value:
+                bad.append((i, out_of_range))
+        return bad
+
+    return check
+
+
+class ValidationReport(object):
+
+    def __init__(self, topic: str, total: int):
+        self.topic = topic
+        self.total = total
+        # [(index in batch, data, [(field, reason)])]
+        self.rejected = []
+
+    @property
+    def rejected_count(self) -> int:
+        return len(self.rejected)
+
+    # "field: reason" -> count of rows
+    def summary(self) -> dict:
+        counts = {}
+        for _, _, problems in self.rejected:
+            for field, reason in problems:
+                key = "%s: %s" % (field, reason)
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    # Append the rejected rows to a json lines file, which can be
+    # fixed and uploaded again.
+    def save(self, path: str) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            for index, data, problems in self.rejected:
+                line = {
+                    "topic": self.topic,
+                    "index": index,
+                    "problems": ["%s: %s" % problem for problem in problems],
+                    "data": data,
+                }
+                f.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+
+
+# Check the data of general/byteair locally before sending, so that
+# a bad row doesn't fail the whole batch and the retries of it.
+class DataValidator(object):
+
+    # @param schemas topic -> {field name -> FieldSpec}
+    def __init__(self, schemas: Optional[dict] = None):
+        if schemas is None:
+            schemas = DEFAULT_SCHEMAS
+        self._checkers = {}
+        for topic, schema in schemas.items():
+            self._checkers[topic] = [(name, _compile(name, spec)) for name, spec in schema.items()]
+
+    # Split the data list into the accepted data and the report of rejected ones.
+    # Every field is checked over the whole batch at a time.
+    # The data of topic without schema are all accepted.
+    def validate(self, topic: str, data_list: list) -> tuple:
+        report = ValidationReport(topic, len(data_list))
+        checkers = self._checkers.get(topic)
+        if checkers is None:
+            log.debug("[DataValidator] no schema of topic:%s, skip validate", topic)
+            return data_list, report
+        problems = {}
+        for name, check in checkers:
+            column = [data.get(name) for data in data_list]
+            for index, reason in check(column):
+                problems.setdefault(index, []).append((name, reason))
+        if len(problems) == 0:
+            return data_list, report
+        accepted = []
+        for index, data in enumerate(data_list):
+            if index in problems:
+                report.rejected.append((index, data, problems[index]))
+                continue
+            accepted.append(data)
+        log.warning("[DataValidator] reject rows, topic:%s rejected:%d total:%d summary:%s",
+                    topic, report.rejected_count, report.total, report.summary())
+        return accepted, report
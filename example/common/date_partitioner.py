@@ -0,0 +1,128 @@
+import datetime
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+# The utc offsets of all timezones change at multiples of 15 minutes
+_OFFSET_STEP_SECONDS = 900
+
+
+# Group the events by the date of event time. Every timestamp is converted
+# in the timezone, so that the events on both sides of a daylight saving
+# change get their own local dates. The dates are cached per 15 minutes,
+# which is much cheaper than building a datetime for every event.
+#
+# @param events       the user events, protobuf messages or dicts of general/byteair
+# @param timestamp_of get the event timestamp in seconds, such as
+#                     "lambda event: event.event_timestamp"
+# @param tz           optional, the timezone of dates, default is the local timezone,
+#                     which is the same as the dates formatted by sdk
+# @return date -> events of the date, sorted by date
+def partition_by_date(events, timestamp_of, tz: Optional[datetime.tzinfo] = None) -> dict:
+    buckets = defaultdict(list)
+    # step -> date
+    dates = {}
+    for event in events:
+        step = int(timestamp_of(event)) // _OFFSET_STEP_SECONDS
+        date = dates.get(step)
+        if date is None:
+            date = datetime.datetime.fromtimestamp(step * _OFFSET_STEP_SECONDS, tz).date()
+            dates[step] = date
+        buckets[date].append(event)
+    return {_start_of(date, tz): buckets[date] for date in sorted(buckets)}
+
+
+# The midnight of date, with the utc offset of that day
+def _start_of(date: datetime.date, tz: Optional[datetime.tzinfo]) -> datetime.datetime:
+    if tz is None:
+        return datetime.datetime(date.year, date.month, date.day).astimezone()
+    return datetime.datetime(date.year, date.month, date.day, tzinfo=tz)
+
+
+class _Partition(object):
+
+    def __init__(self, date: datetime.datetime, chunks: list):
+        self.date = date
+        self.chunks = chunks
+        # The last chunk is held until the others succeed
+        self.pending = len(chunks) - 1
+        self.failed = False
+        self.lock = threading.Lock()
+
+
+# Upload the partitions of dates concurrently. The last chunk of a date is
+# uploaded with "is_end" after the other chunks of the date succeed, then
+# "done" of the date is called at once, rather than after all dates.
+class PartitionedUpload(object):
+
+    # @param upload      upload(date, chunk, is_end) -> bool, such as an import request
+    #                    with "date_config", or "write_data" with "Option.with_data_date(date)"
+    # @param done        optional, done(date) -> bool, such as calling "client.done([date], topic)".
+    #                    The industries marking the end by "date_config.is_end" don't need it
+    # @param chunk_size  max count of events in one request
+    # @param max_workers count of chunks uploaded at the same time
+    def __init__(self, upload, done=None, chunk_size: int = 10000, max_workers: int = 5):
+        self._upload = upload
+        self._done = done
+        self._chunk_size = chunk_size
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._finished = []
+        self._failed = []
+
+    # @param partitions date -> events, see "partition_by_date"
+    # @return the finished dates and the failed dates
+    def run(self, partitions: dict) -> tuple:
+        self._finished, self._failed = [], []
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            for date, events in partitions.items():
+                chunks = [events[i:i + self._chunk_size] for i in range(0, len(events), self._chunk_size)]
+                if len(chunks) == 0:
+                    continue
+                partition = _Partition(date, chunks)
+                if partition.pending == 0:
+                    executor.submit(self._finish, partition)
+                    continue
+                for chunk in chunks[:-1]:
+                    executor.submit(self._upload_chunk, partition, chunk)
+        return sorted(self._finished), sorted(self._failed)
+
+    def _upload_chunk(self, partition: _Partition, chunk: list) -> None:
+        success = self._safe_call(self._upload, partition.date, chunk, False)
+        with partition.lock:
+            partition.pending -= 1
+            partition.failed = partition.failed or not success
+            if partition.pending > 0:
+                return
+        if partition.failed:
+            self._record(partition.date, False)
+            return
+        # Finish in the worker of last chunk, so that the date is done without waiting other dates
+        self._finish(partition)
+
+    def _finish(self, partition: _Partition) -> None:
+        success = self._safe_call(self._upload, partition.date, partition.chunks[-1], True)
+        if success and self._done is not None:
+            success = self._safe_call(self._done, partition.date)
+        self._record(partition.date, success)
+
+    def _record(self, date: datetime.datetime, success: bool) -> None:
+        with self._lock:
+            (self._finished if success else self._failed).append(date)
+        if success:
+            log.info("[PartitionedUpload] date finish, date:%s", date.date())
+            return
+        log.error("[PartitionedUpload] date fail, date:%s", date.date())
+
+    @staticmethod
+    def _safe_call(call, *args) -> bool:
+        try:
+            return call(*args)
+        except Exception as e:
+            # An exception in executor is swallowed silently, record it as failure
+            log.error("[PartitionedUpload] occur err, msg:%s", e)
+            return False
@@ -0,0 +1,324 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Optional
+
+from google.protobuf import descriptor_pool, symbol_database
+from google.protobuf.message import Message
+
+from byteplus.core import Option, Region
+from example.common.replay_clients import REPLAY_CALLS, build_replay_client
+from example.common.request_helper import RequestHelper
+from example.common.status_helper import is_success, is_success_code, is_upload_success
+from example.common.write_error_helper import log_permanent_failures, rebatch
+
+log = logging.getLogger(__name__)
+
+# Every record in segment file is prefixed by the length of compressed payload
+_LENGTH = struct.Struct("<I")
+
+# The append-only log of records, which is scanned from the start by every query
+_LOG_FILE = "index.jsonl"
+
+# The ids of records which have been replayed successfully
+_REPLAYED_FILE = "replayed.jsonl"
+
+_KIND_PROTO = "proto"
+
+_KIND_JSON = "json"
+
+_KIND_DATES = "dates"
+
+_DEFAULT_REPLAY_RETRY_TIMES = 2
+
+_DEFAULT_REPLAY_TIMEOUT = datetime.timedelta(milliseconds=800)
+
+
+class DeadLetterRecord(object):
+
+    def __init__(self, record_id: str, meta: dict, payload):
+        self.record_id = record_id
+        self.meta = meta
+        self.payload = payload
+
+    @property
+    def call(self) -> str:
+        return self.meta["call"]
+
+    @property
+    def args(self) -> list:
+        return self.meta.get("args", [])
+
+
+# Keep the requests which are failed permanently in a local directory,
+# so that they can be replayed after the outage rather than be lost in logs.
+# The directory contains:
+#   <yyyymmdd>.seg   length-prefixed zlib-compressed payloads, one segment per day
+#   index.jsonl      the log of records, one line per record with time, tenant, call and
+#                    payload location. It has no index of time or call, every scan reads
+#                    it from the start, so move the replayed records away when it's large
+#   replayed.jsonl   ids of the records which have been replayed successfully
+class DeadLetterStore(object):
+
+    def __init__(self, directory: str, tenant: str = ""):
+        self._directory = directory
+        self._tenant = tenant
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    # @param call          the name of client method, such as "write_users", "import_data"
+    # @param payload       the request message, data list of general/byteair, or date list of "done"
+    # @param reason        why the request is failed
+    # @param args          the extra positional args of call, such as topic of general/byteair
+    # @param response_type the response class of "import" call, which is needed when replaying
+    def record(self, call: str, payload, reason: str, args: tuple = (), response_type=None) -> str:
+        kind, type_name, data = _encode_payload(payload)
+        compressed = zlib.compress(data)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        segment = now.strftime("%Y%m%d") + ".seg"
+        meta = {
+            "time": now.isoformat(),
+            "tenant": self._tenant,
+            "call": call,
+            "kind": kind,
+            "type": type_name,
+            "args": list(args),
+            "reason": reason,
+            "segment": segment,
+        }
+        if response_type is not None:
+            meta["response_type"] = response_type.DESCRIPTOR.full_name
+        with self._lock:
+            with open(os.path.join(self._directory, segment), "ab") as f:
+                meta["offset"] = f.tell()
+                f.write(_LENGTH.pack(len(compressed)))
+                f.write(compressed)
+            with open(os.path.join(self._directory, _LOG_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(meta) + "\n")
+        record_id = _record_id(meta)
+        log.warning("[DeadLetter] record failed request, id:%s call:%s reason:%s", record_id, call, reason)
+        return record_id
+
+    # Iterate the records matching all given conditions, the payloads
+    # are decoded lazily when iterating, so a big store will not be loaded at once.
+    #
+    # @param since optional, the naive time is taken as UTC like the recorded times
+    # @param until optional, the naive time is taken as UTC like the recorded times
+    def scan(self, since: Optional[datetime.datetime] = None, until: Optional[datetime.datetime] = None,
+             tenant: Optional[str] = None, call: Optional[str] = None, include_replayed: bool = False):
+        log_path = os.path.join(self._directory, _LOG_FILE)
+        if not os.path.exists(log_path):
+            return
+        since, until = _to_utc(since), _to_utc(until)
+        replayed = set() if include_replayed else self._replayed_ids()
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                meta = json.loads(line)
+                record_id = _record_id(meta)
+                if record_id in replayed:
+                    continue
+                if tenant is not None and meta["tenant"] != tenant:
+                    continue
+                if call is not None and meta["call"] != call:
+                    continue
+                record_time = _to_utc(datetime.datetime.fromisoformat(meta["time"]))
+                if since is not None and record_time < since:
+                    continue
+                if until is not None and record_time >= until:
+                    continue
+                yield DeadLetterRecord(record_id, meta, self._read_payload(meta))
+
+    def mark_replayed(self, record_id: str) -> None:
+        with self._lock:
+            with open(os.path.join(self._directory, _REPLAYED_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"id": record_id}) + "\n")
+
+    def _replayed_ids(self) -> set:
+        path = os.path.join(self._directory, _REPLAYED_FILE)
+        if not os.path.exists(path):
+            return set()
+        with open(path, "r", encoding="utf-8") as f:
+            return {json.loads(line)["id"] for line in f if line.strip()}
+
+    def _read_payload(self, meta: dict):
+        with open(os.path.join(self._directory, meta["segment"]), "rb") as f:
+            f.seek(meta["offset"])
+            length, = _LENGTH.unpack(f.read(_LENGTH.size))
+            data = zlib.decompress(f.read(length))
+        return _decode_payload(meta["kind"], meta["type"], data)
+
+
+# Build the "on_permanent_failure" callback of RequestHelper.do_write,
+# which records the permanently failed items as a rebatched request.
+def write_failure_recorder(store: Optional[DeadLetterStore], call_name: str, request, args: tuple = ()):
+    def on_permanent_failure(failed_call_name: str, failures: list):
+        log_permanent_failures(failed_call_name, failures)
+        if store is None:
+            return
+        items = [item for item, _ in failures if item is not None]
+        if len(items) == 0:
+            return
+        try:
+            store.record(call_name, rebatch(request, items), failures[0][1], args)
+        except BaseException as e:
+            log.error("[DeadLetter] record occur error, call:%s msg:%s", call_name, str(e))
+
+    return on_permanent_failure
+
+
+# Re-drive the dead letters through RequestHelper at a controlled rate.
+#
+# @param store          the dead letter store
+# @param client         the client which owns the calls recorded in store
+# @param request_helper the request helper built with the client
+# @param rate           the max count of replayed records per second
+# @param calls          optional, the calls allowed to replay, such as the ones of "REPLAY_CALLS"
+# @return (count of succeed records, count of failed records)
+def replay(store: DeadLetterStore, client, request_helper, rate: float = 10, calls: Optional[tuple] = None,
+           **scan_conditions) -> tuple:
+    interval = 1 / rate if rate > 0 else 0
+    succeed, failed = 0, 0
+    next_time = time.monotonic()
+    for record in store.scan(**scan_conditions):
+        if calls is not None and record.call not in calls:
+            log.error("[DeadLetter] skip unknown call, id:%s call:%s", record.record_id, record.call)
+            failed += 1
+            continue
+        wait = next_time - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        next_time = max(next_time, time.monotonic()) + interval
+        try:
+            ok = _replay_record(record, client, request_helper)
+        except BaseException as e:
+            log.error("[DeadLetter] replay occur error, id:%s msg:%s", record.record_id, e)
+            ok = False
+        if ok:
+            store.mark_replayed(record.record_id)
+            succeed += 1
+            continue
+        failed += 1
+    log.info("[DeadLetter] replay finish, succeed:%d failed:%d", succeed, failed)
+    return succeed, failed
+
+
+def _replay_record(record: DeadLetterRecord, client, request_helper) -> bool:
+    method = getattr(client, record.call)
+    args = record.args
+
+    def call(payload, *opts: Option):
+        return method(payload, *args, *opts)
+
+    opts = (Option.with_timeout(_DEFAULT_REPLAY_TIMEOUT),)
+    response_type = record.meta.get("response_type")
+    if response_type is not None:
+        response = _message_class(response_type)()
+        request_helper.do_import(call, record.payload, response, opts, _DEFAULT_REPLAY_RETRY_TIMES)
+    else:
+        response = request_helper.do_with_retry(call, record.payload, opts, _DEFAULT_REPLAY_RETRY_TIMES)
+    return _is_response_success(response)
+
+
+def _is_response_success(response) -> bool:
+    # The predict/callback responses of general/byteair carry "code" instead of "status"
+    if "status" in response.DESCRIPTOR.fields_by_name:
+        return is_upload_success(response.status) or is_success(response.status)
+    return is_success_code(response.code)
+
+
+def _record_id(meta: dict) -> str:
+    return "%s:%d" % (meta["segment"], meta["offset"])
+
+
+def _encode_payload(payload) -> tuple:
+    if isinstance(payload, Message):
+        return _KIND_PROTO, payload.DESCRIPTOR.full_name, payload.SerializeToString()
+    if isinstance(payload, list) and len(payload) > 0 and isinstance(payload[0], datetime.datetime):
+        return _KIND_DATES, "", json.dumps([d.isoformat() for d in payload]).encode("utf-8")
+    return _KIND_JSON, "", json.dumps(payload).encode("utf-8")
+
+
+def _decode_payload(kind: str, type_name: str, data: bytes):
+    if kind == _KIND_PROTO:
+        return _message_class(type_name).FromString(data)
+    if kind == _KIND_DATES:
+        return [datetime.datetime.fromisoformat(d) for d in json.loads(data)]
+    return json.loads(data)
+
+
+def _message_class(full_name: str):
+    # The protocol module of industry must have been imported,
+    # so that its messages are registered in the default pool.
+    descriptor = descriptor_pool.Default().FindMessageTypeByName(full_name)
+    try:
+        from google.protobuf.message_factory import GetMessageClass
+        return GetMessageClass(descriptor)
+    except ImportError:
+        return symbol_database.Default().GetPrototype(descriptor)
+
+
+# The records are logged in UTC time, and the naive times are taken as UTC,
+# so that the naive and aware times can be compared
+def _to_utc(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime.datetime]:
+    if not value:
+        return None
+    return _to_utc(datetime.datetime.fromisoformat(value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="replay the dead letters of example helpers")
+    parser.add_argument("--industry", required=True, choices=list(REPLAY_CALLS),
+                        help="the industry of client which sends the records")
+    parser.add_argument("--dir", required=True, help="the directory of dead letter store")
+    parser.add_argument("--tenant", help="only replay the records of the tenant, it's the tenant of client too")
+    parser.add_argument("--client-tenant", help="the tenant of client, default is --tenant")
+    parser.add_argument("--tenant-id", default="", help="the tenant id of client")
+    parser.add_argument("--token", default="", help="the token of client")
+    parser.add_argument("--region", default=Region.SG.name, choices=[region.name for region in Region],
+                        help="the region of client")
+    parser.add_argument("--hosts", help="optional, the hosts of client separated by comma")
+    parser.add_argument("--schema", default="https", help="the schema of client, https or http")
+    parser.add_argument("--project-id", default="", help="the project id of byteair")
+    parser.add_argument("--ak", default="", help="the access key of byteair")
+    parser.add_argument("--sk", default="", help="the secret key of byteair")
+    parser.add_argument("--call", help="only replay the records of the call, such as write_users")
+    parser.add_argument("--since", help="only replay the records recorded at or after the time, RFC3339")
+    parser.add_argument("--until", help="only replay the records recorded before the time, RFC3339")
+    parser.add_argument("--rate", type=float, default=10, help="the max count of replayed records per second")
+    args = parser.parse_args()
+
+    # The client is built here rather than importing the main module of example,
+    # which builds its own client, installs the pooled transport and warms up
+    client = build_replay_client(args.industry, args.client_tenant or args.tenant or "", args.tenant_id,
+                                 args.token, Region[args.region], args.hosts.split(",") if args.hosts else None,
+                                 args.schema, args.project_id, args.ak, args.sk)
+    store = DeadLetterStore(args.dir)
+    try:
+        replay(store, client, RequestHelper(client), args.rate, REPLAY_CALLS[args.industry][1],
+               since=_parse_time(args.since), until=_parse_time(args.until), tenant=args.tenant, call=args.call)
+    finally:
+        client.release()
+
+
+if __name__ == '__main__':
+    main()
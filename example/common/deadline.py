@@ -0,0 +1,68 @@
+import datetime
+import time
+from typing import Optional
+
+from byteplus.core import BizException, Option
+
+# A request given less time than it is doomed to timeout,
+# it is not sent and the deadline is taken as exceeded
+_MIN_REQUEST_TIMEOUT = datetime.timedelta(milliseconds=5)
+
+
+# The time by which a whole call, including all its retries, waits and
+# polling, must finish. It's passed down through the layers of RequestHelper,
+# every request gets the remaining time as its timeout, and every wait is
+# cut short at the deadline.
+class Deadline(object):
+
+    # @param expire_at the expiring time of "time.monotonic()"
+    def __init__(self, expire_at: float):
+        self._expire_at = expire_at
+
+    @staticmethod
+    def after(timeout: datetime.timedelta):
+        return Deadline(time.monotonic() + timeout.total_seconds())
+
+    def remaining(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=max(0.0, self._expire_at - time.monotonic()))
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self._expire_at
+
+    # @throws BizException if the deadline is exceeded
+    def check(self) -> None:
+        if self.expired():
+            raise BizException("deadline exceeded")
+
+    # @return the smaller one of the request timeout and the remaining time
+    # @throws BizException if the remaining time is too short for a request
+    def bound(self, timeout: Optional[datetime.timedelta]) -> datetime.timedelta:
+        remaining = self.remaining()
+        if remaining < _MIN_REQUEST_TIMEOUT:
+            raise BizException("deadline exceeded")
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    # @return the opts whose timeout and server timeout are no longer than the remaining
+    #         time, the options are appended, so they override the former ones
+    # @throws BizException if the remaining time is too short for a request
+    def bound_opts(self, opts: tuple) -> tuple:
+        opts = opts or ()
+        options = Option.conv_to_options(opts)
+        timeout = self.bound(options.timeout)
+        opts = opts + (Option.with_timeout(timeout),)
+        if options.server_timeout is not None:
+            opts += (Option.with_server_timeout(min(options.server_timeout, timeout)),)
+        return opts
+
+    # Sleep for the interval, or until the deadline if it comes first
+    def sleep(self, interval: datetime.timedelta) -> None:
+        time.sleep(min(interval, self.remaining()).total_seconds())
+
+
+def sleep_within(interval: datetime.timedelta, deadline: Optional[Deadline]) -> None:
+    if deadline is None:
+        time.sleep(interval.total_seconds())
+        return
+    deadline.sleep(interval)
@@ -0,0 +1,136 @@
+import datetime
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+from google.protobuf.message import Message
+
+log = logging.getLogger(__name__)
+
+# The file header of persisted index: magic, slot count
+_HEADER = struct.Struct("<8sQ")
+
+_MAGIC = b"BPDEDUP1"
+
+# One persisted slot: id fingerprint, content fingerprint, write time(seconds)
+_SLOT = struct.Struct("<QQQ")
+
+
+def fingerprint(data: bytes) -> int:
+    # 64-bit hash is enough to distinguish entities of one tenant,
+    # and keeps each index entry small
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def content_bytes(item) -> bytes:
+    if isinstance(item, Message):
+        # Deterministic serialization makes map fields(such as `extra`)
+        # produce the same bytes for the same content
+        return item.SerializeToString(deterministic=True)
+    return json.dumps(item, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+class DedupFilter(object):
+    # Drop the items whose content is unchanged since the last successful write,
+    # so that feeds re-sending the same records do not cost a write request.
+    #
+    # @param id_field     the id field of item, such as "product_id", "user_id"
+    # @param window       an unchanged item is dropped only if it was written within the window
+    # @param persist_path optional, the file to keep the index across restarts
+    def __init__(self, id_field: str, window: datetime.timedelta, persist_path: Optional[str] = None):
+        self._id_field = id_field
+        self._window_seconds = int(window.total_seconds())
+        self._persist_path = persist_path
+        # id fingerprint -> (content fingerprint, write time)
+        self._index = {}
+        self._lock = threading.Lock()
+        if persist_path is not None and os.path.exists(persist_path):
+            self._load(persist_path)
+
+    def __len__(self):
+        return len(self._index)
+
+    # Return the items need to write, the unchanged items are dropped.
+    # The index is not updated here, call "mark_written" after the write succeed,
+    # otherwise the failed items will be dropped by mistake when retried.
+    def filter(self, items: list) -> list:
+        now = int(time.time())
+        changed = []
+        batch_seen = {}
+        with self._lock:
+            for item in items:
+                id_fp, content_fp = self._fingerprints(item)
+                if batch_seen.get(id_fp) == content_fp:
+                    continue
+                batch_seen[id_fp] = content_fp
+                entry = self._index.get(id_fp)
+                if entry is not None and entry[0] == content_fp and now - entry[1] < self._window_seconds:
+                    continue
+                changed.append(item)
+        dropped = len(items) - len(changed)
+        if dropped > 0:
+            log.debug("[Dedup] drop unchanged items, total:%d dropped:%d", len(items), dropped)
+        return changed
+
+    def mark_written(self, items: list) -> None:
+        now = int(time.time())
+        with self._lock:
+            for item in items:
+                id_fp, content_fp = self._fingerprints(item)
+                self._index[id_fp] = (content_fp, now)
+
+    # Remove the entries out of window, which can not drop any item again
+    def expire(self) -> int:
+        deadline = int(time.time()) - self._window_seconds
+        with self._lock:
+            expired = [k for k, v in self._index.items() if v[1] <= deadline]
+            for k in expired:
+                del self._index[k]
+        return len(expired)
+
+    def save(self) -> None:
+        if self._persist_path is None:
+            return
+        with self._lock:
+            entries = list(self._index.items())
+        size = _HEADER.size + _SLOT.size * len(entries)
+        tmp_path = self._persist_path + ".tmp"
+        with open(tmp_path, "w+b") as f:
+            f.truncate(size)
+            with mmap.mmap(f.fileno(), size) as buf:
+                _HEADER.pack_into(buf, 0, _MAGIC, len(entries))
+                offset = _HEADER.size
+                for id_fp, (content_fp, written_at) in entries:
+                    _SLOT.pack_into(buf, offset, id_fp, content_fp, written_at)
+                    offset += _SLOT.size
+                buf.flush()
+        # Replace atomically, a crash during saving keeps the old index usable
+        os.replace(tmp_path, self._persist_path)
+
+    def _load(self, path: str) -> None:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                log.warning("[Dedup] ignore broken index file:%s", path)
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                magic, count = _HEADER.unpack_from(buf, 0)
+                end = _HEADER.size + _SLOT.size * count
+                if magic != _MAGIC or len(buf) < end:
+                    log.warning("[Dedup] ignore broken index file:%s", path)
+                    return
+                for id_fp, content_fp, written_at in _SLOT.iter_unpack(buf[_HEADER.size:end]):
+                    self._index[id_fp] = (content_fp, written_at)
+        log.info("[Dedup] load index, path:%s size:%d", path, len(self._index))
+
+    def _fingerprints(self, item) -> tuple:
+        if isinstance(item, Message):
+            item_id = getattr(item, self._id_field)
+        else:
+            item_id = item[self._id_field]
+        return fingerprint(str(item_id).encode("utf-8")), fingerprint(content_bytes(item))
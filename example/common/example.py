@@ -49,9 +49,9 @@ def list_operations_example(common_client: CommonClient, filter_query: str) -> O
         return None
     log.info("list operation success")
     # When you get the next Page, you need to put the "nextPageToken"
-    # returned by this Page into the request of next Page
-    # nextPageRequest = build_list_operation_request(response.next_page_token)
-    # request next page
+    # returned by this Page into the request of next Page.
+    # "iter_operations" of operation_helper iterates all pages
+    # and prefetches the next page in background.
     return response.operations
 
 
@@ -0,0 +1,140 @@
+import csv
+import json
+import logging
+import random
+import threading
+from typing import Optional
+
+from example.common.status_helper import is_success
+
+log = logging.getLogger(__name__)
+
+# The length of item text kept in a sample, the whole item may be large
+_MAX_SAMPLE_ITEM_LENGTH = 256
+
+_CSV_FIELDS = ("entity", "date", "operations", "succeeded", "failed", "error_samples")
+
+
+class _Counter(object):
+
+    def __init__(self):
+        self.operations = 0
+        self.succeeded = 0
+        self.failed = 0
+        # count of all error samples seen, the kept ones are in reservoir
+        self.error_samples = 0
+        self.reservoir = []
+
+
+# Aggregate the results of import operations, from "do_import" or
+# "list_operations", into counters per entity type and date.
+# The responses are not held, only a bounded reservoir of error
+# samples is kept for every (entity, date), so it streams through
+# any count of responses in constant memory.
+class ImportReport(object):
+
+    # @param max_samples max count of error samples kept per (entity, date)
+    # @param seed        optional, the random seed of reservoir sampling
+    def __init__(self, max_samples: int = 20, seed: Optional[int] = None):
+        self._max_samples = max_samples
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # (entity, date) -> _Counter
+        self._counters = {}
+
+    # @param response the "ImportXXXResponse", or the LazyResponse of operation registry
+    # @param entity   optional, such as "Users", it's taken from the response type by default
+    # @param date     optional, the data date of import
+    def add(self, response, entity: Optional[str] = None, date: str = "") -> None:
+        if entity is None:
+            entity = _entity_of(response)
+        samples = response.error_samples
+        with self._lock:
+            counter = self._counters.get((entity, date))
+            if counter is None:
+                counter = _Counter()
+                self._counters[(entity, date)] = counter
+            counter.operations += 1
+            if is_success(response.status):
+                counter.succeeded += 1
+            else:
+                counter.failed += 1
+            for sample in samples:
+                counter.error_samples += 1
+                self._sample(counter, sample)
+
+    # Add the response of a done operation, the unknown types are skipped.
+    #
+    # @param registry the ResponseRegistry of industry
+    def add_operation(self, operation, registry, date: str = "") -> bool:
+        if not operation.done:
+            return False
+        response = registry.decode(operation)
+        if response is None:
+            return False
+        self.add(response, date=date)
+        return True
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            rows = []
+            for (entity, date), counter in sorted(self._counters.items()):
+                rows.append({
+                    "entity": entity,
+                    "date": date,
+                    "operations": counter.operations,
+                    "succeeded": counter.succeeded,
+                    "failed": counter.failed,
+                    "error_samples": counter.error_samples,
+                    "samples": list(counter.reservoir),
+                })
+        return {"groups": rows, "totals": _totals(rows)}
+
+    def save_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    # The csv only holds the counters, the samples are in json report
+    def save_csv(self, path: str) -> None:
+        rows = self.to_dict()["groups"]
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=_CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def _sample(self, counter: _Counter, sample) -> None:
+        # Reservoir sampling, every sample seen is kept with the same probability
+        if len(counter.reservoir) < self._max_samples:
+            counter.reservoir.append(_sample_of(sample))
+            return
+        index = self._random.randrange(counter.error_samples)
+        if index < self._max_samples:
+            counter.reservoir[index] = _sample_of(sample)
+
+
+def _entity_of(response) -> str:
+    # "ImportUsersResponse" -> "Users", the LazyResponse has its type name without parsing
+    name = getattr(response, "type_name", None) or response.DESCRIPTOR.name
+    if name.startswith("Import"):
+        name = name[len("Import"):]
+    if name.endswith("Response"):
+        name = name[:-len("Response")]
+    return name
+
+
+def _sample_of(sample) -> dict:
+    # The error sample is like "UserError", holding the message and the item
+    item = ""
+    for field, value in sample.ListFields():
+        if field.name != "message":
+            item = str(value).replace("\n", " ")[:_MAX_SAMPLE_ITEM_LENGTH]
+            break
+    return {"message": sample.message, "item": item}
+
+
+def _totals(rows: list) -> dict:
+    totals = {"operations": 0, "succeeded": 0, "failed": 0, "error_samples": 0}
+    for row in rows:
+        for key in totals:
+            totals[key] += row[key]
+    return totals
@@ -0,0 +1,100 @@
+import importlib
+import json
+import logging
+from typing import Iterable
+
+from byteplus.core import BizException, MAX_IMPORT_ITEM_COUNT, Option
+
+log = logging.getLogger(__name__)
+
+# orjson encodes several times faster than json and returns bytes directly,
+# it's optional, the standard json is used if it's not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_JSON_CONTENT_TYPE = "application/json"
+
+
+def encode(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# Encode the "extra_info" map, whose value is required to be a json string
+def encode_str(data) -> str:
+    return encode(data).decode("utf-8")
+
+
+def encode_lines(data_list: Iterable) -> list:
+    return [encode(data) for data in data_list]
+
+
+# Read a json lines file as batches of encoded lines, the lines
+# are not decoded, so they are sent as they are in the file.
+#
+# @param offset       the byte offset to start reading from
+# @param with_offsets yield (lines, begin offset, end offset) rather than lines
+def read_lines(path: str, batch_size: int = MAX_IMPORT_ITEM_COUNT, offset: int = 0, with_offsets: bool = False):
+    batch = []
+    begin = position = offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            position += len(line)
+            line = line.strip()
+            if len(line) == 0:
+                continue
+            batch.append(line)
+            if len(batch) == batch_size:
+                yield (batch, begin, position) if with_offsets else batch
+                batch = []
+                begin = position
+    if len(batch) > 0:
+        yield (batch, begin, position) if with_offsets else batch
+
+
+# Build the body of "write_data", which is a json array of data.
+def build_body(lines: list) -> bytes:
+    return b"[" + b",".join(lines) + b"]"
+
+
+# The same as "client.write_data" of general/byteair, but the data are
+# encoded json lines. The body is built by joining the lines, rather than
+# building dicts and encoding them again in client.
+#
+# @param client the client of general or byteair
+# @param lines  the encoded json of every data, see "encode_lines" and "read_lines",
+#               the dicts are also accepted, such as the failed items resent by
+#               "RequestHelper.do_write", which are parsed from the errors of response
+# @param topic  the same as "client.write_data"
+def write_json_lines(client, lines: list, topic: str, *opts: Option):
+    lines = [line if isinstance(line, (bytes, bytearray)) else encode(line) for line in lines]
+    if len(lines) > MAX_IMPORT_ITEM_COUNT:
+        raise BizException("Only can receive max to {} items in one request".format(MAX_IMPORT_ITEM_COUNT))
+    url_format = _write_data_url_format(client)
+    if url_format is None:
+        log.warning("[JsonLines] write data url is not found, fallback to client.write_data")
+        return client.write_data([json.loads(line) for line in lines], topic, *opts)
+    response = _write_response_class(client)()
+    # The body is gzip compressed and signed by http caller the same as "write_data"
+    client._http_caller.do_request(url_format.replace("#", topic), build_body(lines), response,
+                                   _JSON_CONTENT_TYPE, Option.conv_to_options(opts))
+    return response
+
+
+def _write_data_url_format(client):
+    # The url holder of client, such as "_general_url" of general
+    for value in vars(client).values():
+        url_format = getattr(value, "write_data_url_format", None)
+        if url_format is not None:
+            return url_format
+    return None
+
+
+def _write_response_class(client):
+    # "byteplus.general.client" -> "byteplus.general.protocol"
+    package = type(client).__module__.rsplit(".", 1)[0]
+    return importlib.import_module(package + ".protocol").WriteResponse
@@ -0,0 +1,149 @@
+import collections
+import datetime
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+# The max length of a response rendered in log, the whole response may be large
+DEFAULT_MAX_DUMP_LENGTH = 1024
+
+_SUMMARY_INTERVAL = datetime.timedelta(seconds=60)
+
+
+# Render the value only when it's really logged, and cut it to the max length.
+# The "%s" of a protobuf message walks the whole message, which should not
+# be paid by the records dropped by level, sampling or rate limit.
+class Truncated(object):
+
+    def __init__(self, value, max_length: int = DEFAULT_MAX_DUMP_LENGTH):
+        self._value = value
+        self._max_length = max_length
+
+    def __str__(self):
+        text = str(self._value)
+        if len(text) <= self._max_length:
+            return text
+        return "%s...(%d chars)" % (text[:self._max_length], len(text))
+
+
+class _RateLimiter(object):
+
+    def __init__(self, per_second: float):
+        self._per_second = per_second
+        self._tokens = per_second
+        self._refreshed_at = time.monotonic()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self._per_second, self._tokens + (now - self._refreshed_at) * self._per_second)
+        self._refreshed_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+# The logging of helpers on the hot path.
+#   - successes are counted instead of logged one by one, a summary of
+#     counters is logged periodically, and a sampled few are logged at debug;
+#   - failures are logged with rate limit per tag, the responses are
+#     rendered lazily and truncated;
+#   - the recent failures are kept in a ring buffer, which can be dumped on demand.
+class HelperLog(object):
+
+    # @param logger                   the logger of helper
+    # @param success_sample_rate      the fraction of successes logged at debug level
+    # @param failures_per_second      max count of failures logged per second of every tag
+    # @param max_recent_failures      the size of the ring buffer of failures
+    # @param summary_interval         the interval of logging the counters, None to disable
+    def __init__(self, logger: logging.Logger, success_sample_rate: float = 0.001,
+                 failures_per_second: float = 10, max_recent_failures: int = 100,
+                 max_dump_length: int = DEFAULT_MAX_DUMP_LENGTH,
+                 summary_interval: Optional[datetime.timedelta] = _SUMMARY_INTERVAL):
+        self._logger = logger
+        self._success_sample_rate = success_sample_rate
+        self._failures_per_second = failures_per_second
+        self._max_dump_length = max_dump_length
+        self._summary_interval = None if summary_interval is None else summary_interval.total_seconds()
+        self._lock = threading.Lock()
+        # (tag, "success"/"failure") -> count
+        self._counters = collections.Counter()
+        # tag -> _RateLimiter
+        self._limiters = {}
+        self._recent_failures = collections.deque(maxlen=max_recent_failures)
+        self._summarized_at = time.monotonic()
+        self._suppressed = 0
+
+    # @param tag such as "AsyncWrite"
+    def success(self, tag: str, call_name: str = "") -> None:
+        with self._lock:
+            self._counters[(tag, "success")] += 1
+        if self._logger.isEnabledFor(logging.DEBUG) and random.random() < self._success_sample_rate:
+            self._logger.debug("[%s] success, call:%s (sampled)", tag, call_name)
+        self._maybe_summarize()
+
+    # @param detail the response or exception, it's rendered only when logged or dumped
+    def failure(self, tag: str, call_name: str, detail, level: int = logging.ERROR) -> None:
+        with self._lock:
+            self._counters[(tag, "failure")] += 1
+            self._recent_failures.append((time.time(), tag, call_name, detail))
+            limiter = self._limiters.get(tag)
+            if limiter is None:
+                limiter = _RateLimiter(self._failures_per_second)
+                self._limiters[tag] = limiter
+            allowed = limiter.acquire()
+            if not allowed:
+                self._suppressed += 1
+        if allowed:
+            self._logger.log(level, "[%s] fail, call:%s detail:\n%s",
+                             tag, call_name, Truncated(detail, self._max_dump_length))
+        self._maybe_summarize()
+
+    # @return {"AsyncWrite": {"success": 10, "failure": 1}, ...}
+    def counters(self) -> dict:
+        with self._lock:
+            result = {}
+            for (tag, kind), count in self._counters.items():
+                result.setdefault(tag, {})[kind] = count
+            return result
+
+    # @param kind "success" or "failure"
+    # @return the count of all tags, it's exact even when the failure logs are rate limited
+    def total(self, kind: str) -> int:
+        with self._lock:
+            return sum(count for (_, counted_kind), count in self._counters.items() if counted_kind == kind)
+
+    # @return the recent failures, the oldest first, with the details rendered
+    def recent_failures(self) -> list:
+        with self._lock:
+            failures = list(self._recent_failures)
+        return [{
+            "time": datetime.datetime.fromtimestamp(at).isoformat(),
+            "tag": tag,
+            "call": call_name,
+            "detail": str(Truncated(detail, self._max_dump_length)),
+        } for at, tag, call_name, detail in failures]
+
+    # Log all the recent failures, including the ones suppressed by rate limit
+    def dump_failures(self, level: int = logging.WARNING) -> None:
+        for failure in self.recent_failures():
+            self._logger.log(level, "[RecentFailure] %s [%s] call:%s detail:\n%s",
+                             failure["time"], failure["tag"], failure["call"], failure["detail"])
+
+    def log_summary(self) -> None:
+        with self._lock:
+            suppressed = self._suppressed
+            self._suppressed = 0
+        self._logger.info("[HelperLog] counters:%s suppressed_failures:%d", self.counters(), suppressed)
+
+    def _maybe_summarize(self) -> None:
+        if self._summary_interval is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._summarized_at < self._summary_interval:
+                return
+            self._summarized_at = now
+        self.log_summary()
@@ -0,0 +1,200 @@
+import datetime
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Optional
+
+from byteplus.common.client import CommonClient
+from byteplus.common.protocol import GetOperationRequest, ListOperationsRequest
+from byteplus.core import BizException, NetException, Option
+from example.common.status_helper import is_success
+
+log = logging.getLogger(__name__)
+
+DEFAULT_LIST_OPERATIONS_TIMEOUT = datetime.timedelta(milliseconds=800)
+
+DEFAULT_PAGE_SIZE = 100
+
+DEFAULT_GET_OPERATION_TIMEOUT = datetime.timedelta(milliseconds=800)
+
+# The interval base of retry for NetException of "GetOperation"
+_GET_OPERATION_RETRY_INTERVAL = datetime.timedelta(milliseconds=50)
+
+_DATE_FORMAT = "%Y-%m-%d"
+
+# Marks the end of a shard in the page queue
+_SHARD_END = object()
+
+
+# Iterate all the operations matching the filter page by page.
+# The next page is requested in background while the caller
+# is handling the operations of current page.
+#
+# @param filter_query the filter of "ListOperations", such as "date>=2021-06-15 and worksOn=ImportUsers"
+# @param decode       optional, decode(operation) -> value, applied lazily when the operation is yielded
+# @throws BizException when a page still fails after retries
+def iter_operations(common_client: CommonClient, filter_query: str, page_size: int = DEFAULT_PAGE_SIZE,
+                    timeout: datetime.timedelta = DEFAULT_LIST_OPERATIONS_TIMEOUT, retry_times: int = 2,
+                    decode=None):
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        future = prefetcher.submit(_list_page, common_client, filter_query, page_size, "", timeout, retry_times)
+        while future is not None:
+            response = future.result()
+            next_page_token = response.next_page_token
+            # Request the next page before handling current one
+            future = None
+            if len(next_page_token) > 0 and len(response.operations) > 0:
+                future = prefetcher.submit(_list_page, common_client, filter_query, page_size,
+                                           next_page_token, timeout, retry_times)
+            for operation in response.operations:
+                yield operation if decode is None else decode(operation)
+
+
+# Split the date range into shards, and iterate the operations of
+# shards concurrently. The operations of different shards are mixed,
+# the order is not kept.
+#
+# @param start        the first date of range
+# @param end          the last date of range, included
+# @param filter_query optional, the other conditions, such as "worksOn=ImportUsers and done=true"
+# @param shard_days   count of days in one shard
+# @param max_workers  count of shards fetched at the same time
+def iter_operations_by_date(common_client: CommonClient, start: datetime.date, end: datetime.date,
+                            filter_query: str = "", shard_days: int = 1, max_workers: int = 4,
+                            page_size: int = DEFAULT_PAGE_SIZE,
+                            timeout: datetime.timedelta = DEFAULT_LIST_OPERATIONS_TIMEOUT,
+                            retry_times: int = 2, decode=None):
+    filters = shard_filters(start, end, filter_query, shard_days)
+    # Every worker puts pages here, it's bounded so that fast shards
+    # don't pile up pages when the caller handles slowly
+    pages = queue.Queue(maxsize=max_workers * 2)
+    stop = threading.Event()
+
+    def fetch(shard_filter: str):
+        try:
+            page_token = ""
+            while not stop.is_set():
+                response = _list_page(common_client, shard_filter, page_size, page_token, timeout, retry_times)
+                _put(pages, response.operations, stop)
+                page_token = response.next_page_token
+                if len(page_token) == 0 or len(response.operations) == 0:
+                    break
+        except BizException as e:
+            _put(pages, e, stop)
+        finally:
+            _put(pages, _SHARD_END, stop)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    for shard_filter in filters:
+        executor.submit(fetch, shard_filter)
+    try:
+        remaining = len(filters)
+        while remaining > 0:
+            page = pages.get()
+            if page is _SHARD_END:
+                remaining -= 1
+                continue
+            if isinstance(page, BizException):
+                raise page
+            for operation in page:
+                yield operation if decode is None else decode(operation)
+    finally:
+        # The caller may stop iterating early
+        stop.set()
+        executor.shutdown(wait=False)
+
+
+# Get the operations of many names concurrently, at most max_workers
+# requests are in flight. The results are yielded in completion order,
+# not the order of names, as (name, OperationResponse, None), or
+# (name, None, exception) when the request still fails after retries.
+#
+# @param names       the operation names, can be a lazy iterable
+# @param timeout     the timeout of every request
+# @param retry_times the max count of retry for NetException, with random interval
+def get_operations(common_client: CommonClient, names: Iterable[str], max_workers: int = 8,
+                   timeout: datetime.timedelta = DEFAULT_GET_OPERATION_TIMEOUT, retry_times: int = 2):
+    names = iter(names)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # future -> name, bounded so that the names are not consumed all at once
+        pending = {}
+        for name in names:
+            pending[executor.submit(_get_operation, common_client, name, timeout, retry_times)] = name
+            if len(pending) >= max_workers:
+                break
+        while len(pending) > 0:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    yield name, future.result(), None
+                else:
+                    yield name, None, error
+                next_name = next(names, None)
+                if next_name is not None:
+                    pending[executor.submit(_get_operation, common_client, next_name, timeout, retry_times)] = \
+                        next_name
+    finally:
+        # The caller may stop iterating early
+        executor.shutdown(wait=False)
+
+
+def shard_filters(start: datetime.date, end: datetime.date, filter_query: str = "", shard_days: int = 1) -> list:
+    filters = []
+    shard_start = start
+    while shard_start <= end:
+        shard_end = min(shard_start + datetime.timedelta(days=shard_days), end + datetime.timedelta(days=1))
+        conditions = ["date>=" + shard_start.strftime(_DATE_FORMAT), "date<" + shard_end.strftime(_DATE_FORMAT)]
+        if len(filter_query) > 0:
+            conditions.append(filter_query)
+        filters.append(" and ".join(conditions))
+        shard_start = shard_end
+    return filters
+
+
+def _put(pages: queue.Queue, page, stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            pages.put(page, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _get_operation(common_client: CommonClient, name: str, timeout: datetime.timedelta, retry_times: int):
+    request = GetOperationRequest()
+    request.name = name
+    opts = (Option.with_timeout(timeout),)
+    for i in range(retry_times + 1):
+        try:
+            return common_client.get_operation(request, *opts)
+        except NetException:
+            if i == retry_times:
+                raise
+            # Full jitter, so that the retries of workers don't hit server at the same time
+            time.sleep(random.random() * _GET_OPERATION_RETRY_INTERVAL.total_seconds() * (2 ** i))
+
+
+def _list_page(common_client: CommonClient, filter_query: str, page_size: int, page_token: str,
+               timeout: datetime.timedelta, retry_times: int):
+    request = ListOperationsRequest()
+    request.filter = filter_query
+    request.page_size = page_size
+    request.page_token = page_token
+    opts = (Option.with_timeout(timeout),)
+    last_error: Optional[Exception] = None
+    for _ in range(retry_times + 1):
+        try:
+            response = common_client.list_operations(request, *opts)
+        except NetException as e:
+            last_error = e
+            continue
+        if not is_success(response.status):
+            raise BizException("list operations fail, filter:%s msg:%s" % (filter_query, response.status.message))
+        return response
+    raise BizException(str(last_error))
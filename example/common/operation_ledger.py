@@ -0,0 +1,264 @@
+import datetime
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+from google.protobuf.message import Message
+
+from byteplus.common.client import CommonClient
+from byteplus.core import BizException, Option
+from example.common.operation_helper import get_operations, iter_operations
+from example.common.status_helper import is_success, is_loss_operation, is_upload_success
+
+log = logging.getLogger(__name__)
+
+STATE_PENDING = "pending"
+
+STATE_DONE = "done"
+
+STATE_LOST = "lost"
+
+# The lost operation has been submitted again as a new operation
+STATE_RESUBMITTED = "resubmitted"
+
+KIND_PROTO = "proto"
+
+KIND_JSON = "json"
+
+_GET_OPERATION_TIMEOUT = datetime.timedelta(milliseconds=800)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    name TEXT PRIMARY KEY,
+    call TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    request BLOB NOT NULL,
+    request_kind TEXT NOT NULL,
+    state TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    resubmitted_as TEXT,
+    options TEXT
+);
+CREATE INDEX IF NOT EXISTS operations_state ON operations (state, submitted_at);
+"""
+
+# The options which change what is imported, such as the data date of
+# general/byteair, they are given again when the request is resubmitted.
+# The others, such as timeout and request id, are of the submitting only.
+_RECORDED_OPTIONS = ("data_date", "date_end", "stage")
+
+
+class LedgerEntry(object):
+
+    def __init__(self, name: str, call: str, fingerprint: str, request: bytes, request_kind: str, state: str,
+                 submitted_at: float, updated_at: float, resubmitted_as: Optional[str],
+                 options: Optional[str] = None):
+        self.name = name
+        self.call = call
+        self.fingerprint = fingerprint
+        # The serialized request, compressed
+        self.request = request
+        # KIND_PROTO or KIND_JSON
+        self.request_kind = request_kind
+        self.state = state
+        self.submitted_at = submitted_at
+        self.updated_at = updated_at
+        self.resubmitted_as = resubmitted_as
+        # The json of recorded options, see "_RECORDED_OPTIONS"
+        self.options = options
+
+    # @param request_class the request type, not used by the data list of general/byteair
+    def parse_request(self, request_class=None):
+        data = zlib.decompress(self.request)
+        if self.request_kind == KIND_JSON:
+            return json.loads(data)
+        request = request_class()
+        request.ParseFromString(data)
+        return request
+
+    # The recorded options of request, such as the data date of general/byteair
+    def parse_options(self) -> tuple:
+        if not self.options:
+            return ()
+        options = json.loads(self.options)
+        opts = []
+        if options.get("data_date") is not None:
+            opts.append(Option.with_data_date(datetime.datetime.fromisoformat(options["data_date"])))
+        if options.get("date_end") is not None:
+            opts.append(Option.with_data_end(options["date_end"]))
+        if options.get("stage") is not None:
+            opts.append(Option.with_stage(options["stage"]))
+        return tuple(opts)
+
+
+def request_fingerprint(request) -> str:
+    return hashlib.blake2b(_serialize(request)[1], digest_size=16).hexdigest()
+
+
+# @return (kind, bytes), the data list of general/byteair is kept as json
+def _serialize(request) -> tuple:
+    if isinstance(request, Message):
+        return KIND_PROTO, request.SerializeToString(deterministic=True)
+    return KIND_JSON, json.dumps(request, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _serialize_options(opts: tuple) -> Optional[str]:
+    options = Option.conv_to_options(opts)
+    recorded = {}
+    for field in _RECORDED_OPTIONS:
+        value = getattr(options, field)
+        if value is None:
+            continue
+        if isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        recorded[field] = value
+    return json.dumps(recorded, sort_keys=True) if len(recorded) > 0 else None
+
+
+# Record the name of every submitted import operation with its request,
+# in an embedded sqlite database, so that the operations can be
+# recovered after the process crashes or the operation is lost.
+class OperationLedger(object):
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        # Shared by the workers of ConcurrentHelper, guarded by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(operations)")}
+            if "options" not in columns:
+                # Created before the options are recorded
+                self._conn.execute("ALTER TABLE operations ADD COLUMN options TEXT")
+
+    # @param request the request type, or the data list of general/byteair
+    # @param opts    the options of request, the data date, data end and stage are
+    #                recorded, so that they are given again when it's resubmitted
+    def record(self, name: str, call_name: str, request, opts: tuple = ()) -> None:
+        now = time.time()
+        kind, data = _serialize(request)
+        fingerprint = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO operations VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, ?)",
+                (name, call_name, fingerprint, zlib.compress(data), kind, STATE_PENDING, now, now,
+                 _serialize_options(opts)))
+
+    def mark(self, name: str, state: str, resubmitted_as: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE operations SET state = ?, updated_at = ?, resubmitted_as = ? WHERE name = ?",
+                (state, time.time(), resubmitted_as, name))
+
+    def get(self, name: str) -> Optional[LedgerEntry]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM operations WHERE name = ?", (name,)).fetchone()
+        return None if row is None else LedgerEntry(*row)
+
+    # @param states       the states of entries, pending and lost by default
+    # @param submitted_to optional, only the entries submitted before it
+    def entries(self, states: tuple = (STATE_PENDING, STATE_LOST),
+                submitted_to: Optional[datetime.datetime] = None) -> list:
+        sql = "SELECT * FROM operations WHERE state IN (%s)" % ",".join("?" * len(states))
+        args = list(states)
+        if submitted_to is not None:
+            sql += " AND submitted_at < ?"
+            args.append(submitted_to.timestamp())
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY submitted_at", args).fetchall()
+        return [LedgerEntry(*row) for row in rows]
+
+    # Whether a request with the same content has been submitted and not lost
+    def contains_request(self, request) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM operations WHERE fingerprint = ? AND state IN (?, ?) LIMIT 1",
+                (request_fingerprint(request), STATE_PENDING, STATE_DONE)).fetchone()
+        return row is not None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Recover the operations which are not known to be done:
+#   1. the done operations in "list_operations" of filter_query are marked done;
+#   2. the others are polled concurrently, and marked done or lost;
+#   3. the lost ones are submitted again, if their call is given in "calls".
+#
+# @param calls        optional, call name -> (call, request class), such as
+#                     {"import_users": (client.import_users, ImportUsersRequest)},
+#                     the request class is None for the data list of general/byteair
+# @param filter_query optional, the filter of "list_operations" to reconcile,
+#                     such as "date>=2021-06-15 and worksOn=ImportUsers"
+# @param max_workers  count of "GetOperation" requests in flight
+# @return count of entries per state after recovering
+def recover(ledger: OperationLedger, common_client: CommonClient, request_helper, calls: Optional[dict] = None,
+            filter_query: str = "", retry_times: int = 2, max_workers: int = 8) -> dict:
+    if len(filter_query) > 0:
+        _reconcile(ledger, common_client, filter_query)
+    entries = ledger.entries()
+    pending = [entry.name for entry in entries if entry.state == STATE_PENDING]
+    for name, op_rsp, error in get_operations(common_client, pending, max_workers, _GET_OPERATION_TIMEOUT,
+                                              retry_times):
+        if error is not None:
+            log.warning("[OperationLedger] get operation fail, name:%s msg:%s", name, error)
+            continue
+        state = _state_of(op_rsp)
+        if state != STATE_PENDING:
+            ledger.mark(name, state)
+    counts = {}
+    for entry in ledger.entries():
+        state = entry.state
+        if state == STATE_LOST and calls is not None and entry.call in calls:
+            state = _resubmit(ledger, request_helper, entry, calls[entry.call], retry_times)
+        counts[state] = counts.get(state, 0) + 1
+    log.info("[OperationLedger] recover finish, states:%s", counts)
+    return counts
+
+
+def _reconcile(ledger: OperationLedger, common_client: CommonClient, filter_query: str) -> None:
+    unknown = {entry.name for entry in ledger.entries()}
+    if len(unknown) == 0:
+        return
+    try:
+        for operation in iter_operations(common_client, filter_query):
+            if operation.done and operation.name in unknown:
+                ledger.mark(operation.name, STATE_DONE)
+    except BizException as e:
+        # Go on polling one by one
+        log.warning("[OperationLedger] reconcile by list operations fail, msg:%s", e)
+
+
+def _state_of(op_rsp) -> str:
+    if is_loss_operation(op_rsp.status):
+        return STATE_LOST
+    if is_success(op_rsp.status) and op_rsp.operation.done:
+        return STATE_DONE
+    return STATE_PENDING
+
+
+def _resubmit(ledger: OperationLedger, request_helper, entry: LedgerEntry, call_and_class: tuple,
+              retry_times: int) -> str:
+    call, request_class = call_and_class
+    request = entry.parse_request(request_class)
+    opts = entry.parse_options()
+    try:
+        op_rsp = request_helper.do_with_retry_although_overload(call, request, opts, retry_times)
+    except BizException as e:
+        log.error("[OperationLedger] resubmit fail, name:%s msg:%s", entry.name, e)
+        return STATE_LOST
+    if not is_upload_success(op_rsp.status):
+        log.error("[OperationLedger] resubmit fail, name:%s rsp:%s", entry.name, op_rsp.status)
+        return STATE_LOST
+    new_name = op_rsp.operation.name
+    ledger.record(new_name, entry.call, request, opts)
+    ledger.mark(entry.name, STATE_RESUBMITTED, new_name)
+    log.info("[OperationLedger] resubmit lost operation, name:%s new_name:%s", entry.name, new_name)
+    return STATE_RESUBMITTED
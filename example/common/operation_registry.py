@@ -0,0 +1,115 @@
+import importlib
+import logging
+import threading
+from typing import Iterable, Optional
+
+from google.protobuf.message import Message
+
+log = logging.getLogger(__name__)
+
+
+# The response of an operation, which is parsed only when it's accessed.
+# Attributes other than "name", "type_name" and "message" are read from
+# the parsed response, such as "status", "success_count" and "error_samples".
+class LazyResponse(object):
+
+    def __init__(self, name: str, response_class, value: bytes):
+        self._name = name
+        self._response_class = response_class
+        self._value = value
+        self._message = None
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def type_name(self) -> str:
+        return self._response_class.DESCRIPTOR.name
+
+    @property
+    def message(self) -> Message:
+        return self.parse()
+
+    def parse(self) -> Message:
+        if self._message is None:
+            message = self._response_class()
+            message.ParseFromString(self._value)
+            self._message = message
+            # The bytes are no longer needed
+            self._value = None
+        return self._message
+
+    def __getattr__(self, name):
+        return getattr(self.message, name)
+
+    # Rendered only when it's really logged, such as by "Truncated"
+    def __str__(self):
+        return str(self.message)
+
+
+# Map the type url of "operation.response" to the response class,
+# such as "type.googleapis.com/bytedance.byteplus.retail.ImportUsersResponse"
+# to "ImportUsersResponse" of retail.
+class ResponseRegistry(object):
+
+    def __init__(self, response_classes: Iterable = ()):
+        self._lock = threading.Lock()
+        # message full name -> class
+        self._classes = {}
+        # type url -> class, or None if it's unknown
+        self._cache = {}
+        self.register(*response_classes)
+
+    # Register all the response classes of a protocol module, such as "byteplus.retail.protocol"
+    @staticmethod
+    def of_protocol(module_name: str):
+        module = importlib.import_module(module_name)
+        classes = [value for name, value in vars(module).items()
+                   if name.endswith("Response") and isinstance(value, type) and issubclass(value, Message)]
+        return ResponseRegistry(classes)
+
+    def register(self, *response_classes) -> None:
+        with self._lock:
+            for response_class in response_classes:
+                self._classes[response_class.DESCRIPTOR.full_name] = response_class
+            self._cache.clear()
+
+    # @return the response class of type url, or None if it's not registered
+    def resolve(self, type_url: str):
+        try:
+            return self._cache[type_url]
+        except KeyError:
+            pass
+        # The full name follows the last "/" of type url
+        response_class = self._classes.get(type_url[type_url.rfind("/") + 1:])
+        self._cache[type_url] = response_class
+        return response_class
+
+    # @return the lazily parsed response, or None if the type is unknown
+    def decode(self, operation) -> Optional[LazyResponse]:
+        response_any = operation.response
+        response_class = self.resolve(response_any.type_url)
+        if response_class is None:
+            return None
+        return LazyResponse(operation.name, response_class, response_any.value)
+
+    # Decode the responses of done operations, the unknown types and unfinished operations are skipped.
+    #
+    # @param lazy whether to parse when accessed, otherwise all responses are parsed at once
+    def decode_all(self, operations: Iterable, lazy: bool = True) -> list:
+        responses = []
+        unknown = set()
+        for operation in operations:
+            if not operation.done:
+                continue
+            response = self.decode(operation)
+            if response is None:
+                unknown.add(operation.response.type_url)
+                continue
+            if not lazy:
+                response.parse()
+            responses.append(response)
+        if len(unknown) > 0:
+            log.warning("[ResponseRegistry] skip unknown response types:%s", sorted(unknown))
+        return responses
@@ -0,0 +1,41 @@
+import importlib
+from typing import Optional
+
+from byteplus.core import Region
+
+# The sdk package and the calls recorded by the helpers of every industry,
+# the dead letters of other calls are not replayed. They are kept apart from
+# the "main" modules of examples, whose import builds the clients, installs
+# the pooled transport and warms up.
+REPLAY_CALLS = {
+    "retail": ("byteplus.retail", ("write_users", "write_products", "write_user_events", "import_users",
+                                   "import_products", "import_user_events", "ack_server_impressions")),
+    "retailv2": ("byteplus.retailv2", ("write_users", "write_products", "write_user_events",
+                                       "ack_server_impressions")),
+    "media": ("byteplus.media", ("write_users", "write_contents", "write_user_events", "ack_server_impressions")),
+    "rutenad": ("byteplus.rutenad", ("write_users", "write_products", "write_advertisements", "write_user_events")),
+    "general": ("byteplus.general", ("write_data", "import_data", "done", "callback")),
+    "byteair": ("byteplus.byteair", ("write_data", "done", "callback")),
+}
+
+
+# Build the client replaying the dead letters of industry. The protocol module
+# is imported too, so that the recorded messages can be decoded by type name.
+#
+# @param hosts      optional, the hosts of client, default is the hosts of region
+# @param project_id the project id of byteair
+# @param ak         the access key of byteair
+# @param sk         the secret key of byteair
+def build_replay_client(industry: str, tenant: str = "", tenant_id: str = "", token: str = "",
+                        region: Region = Region.SG, hosts: Optional[list] = None, schema: str = "https",
+                        project_id: str = "", ak: str = "", sk: str = ""):
+    package, _ = REPLAY_CALLS[industry]
+    importlib.import_module(package + ".protocol")
+    builder = importlib.import_module(package).ClientBuilder()
+    if industry == "byteair":
+        builder = builder.tenant_id(tenant_id).project_id(project_id).ak(ak).sk(sk).region(Region.AIR)
+    else:
+        builder = builder.tenant(tenant).tenant_id(tenant_id).token(token).region(region)
+    if hosts:
+        builder = builder.hosts(hosts)
+    return builder.schema(schema).build()
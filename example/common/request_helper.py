@@ -1,7 +1,5 @@
 import datetime
 import logging
-import random
-import time
 import uuid
 from typing import Optional
 
@@ -11,7 +9,14 @@ from google.protobuf.message import Message
 from byteplus.common.client import CommonClient
 from byteplus.core import BizException, NetException, Option
 from byteplus.common.protocol import GetOperationRequest, OperationResponse
+from example.common.deadline import Deadline, sleep_within
+from example.common.log_helper import Truncated
+from example.common.operation_ledger import STATE_DONE, STATE_LOST
+from example.common.retry_policy import RetryPolicy, RetryBudget, DecorrelatedJitterPolicy, \
+    CappedExponentialPolicy
 from example.common.status_helper import is_server_overload, is_upload_success, is_loss_operation
+from example.common.tracing import STATUS_ERROR, get_tracer, request_attributes
+from example.common.write_error_helper import classify_errors, rebatch, request_items, log_permanent_failures
 
 log = logging.getLogger(__name__)
 
@@ -24,24 +29,125 @@ _POLLING_INTERVAL = datetime.timedelta(milliseconds=100)
 # The interval base of retry for server overload
 _OVERLOAD_RETRY_INTERVAL = datetime.timedelta(milliseconds=200)
 
+_OVERLOAD_RETRY_MAX_INTERVAL = datetime.timedelta(seconds=3)
+
+# The interval base of retry for network exception
+_NET_RETRY_INTERVAL = datetime.timedelta(milliseconds=20)
+
+_NET_RETRY_MAX_INTERVAL = datetime.timedelta(milliseconds=500)
+
 _GET_OPERATION_TIMEOUT = datetime.timedelta(milliseconds=600)
 
 
 class RequestHelper(object):
 
-    def __init__(self, common_client: CommonClient):
+    # @param ledger                optional, the OperationLedger recording the submitted import operations
+    # @param net_retry_policy      optional, the wait before resending for network exception
+    # @param overload_retry_policy optional, the wait before resending for server overload
+    # @param retry_budget          optional, limit the retries of every call to a fraction of its requests
+    def __init__(self, common_client: CommonClient, ledger=None,
+                 net_retry_policy: Optional[RetryPolicy] = None,
+                 overload_retry_policy: Optional[RetryPolicy] = None,
+                 retry_budget: Optional[RetryBudget] = None):
         self._common_client: CommonClient = common_client
+        self._ledger = ledger
+        if net_retry_policy is None:
+            net_retry_policy = CappedExponentialPolicy(_NET_RETRY_INTERVAL, _NET_RETRY_MAX_INTERVAL)
+        self._net_retry_policy: RetryPolicy = net_retry_policy
+        if overload_retry_policy is None:
+            overload_retry_policy = DecorrelatedJitterPolicy(_OVERLOAD_RETRY_INTERVAL, _OVERLOAD_RETRY_MAX_INTERVAL)
+        self._overload_retry_policy: RetryPolicy = overload_retry_policy
+        self._retry_budget: Optional[RetryBudget] = retry_budget
+
+    # @param deadline optional, the whole import including retries and polling
+    #                 should finish before it, otherwise BizException is raised
+    def do_import(self, call, request, response, opts, retry_times, deadline: Optional[Deadline] = None):
+        # The attempts and polls are the children of the span
+        with get_tracer().start_span("import", {"call": _call_name(call)}):
+            return self._do_import(call, request, response, opts, retry_times, deadline)
 
-    def do_import(self, call, request, response, opts, retry_times):
+    def _do_import(self, call, request, response, opts, retry_times, deadline: Optional[Deadline]):
         # To ensure that the request is successfully received by the server,
         # it should be retried after network or overload exception occurs.
-        op_rsp = self.do_with_retry_although_overload(call, request, opts, retry_times)
+        op_rsp = self.do_with_retry_although_overload(call, request, opts, retry_times, deadline)
         if not is_upload_success(op_rsp.status):
-            log.error("[PollingImportResponse] server return error info, rsp:\n%s", op_rsp)
+            log.error("[PollingImportResponse] server return error info, rsp:\n%s", Truncated(op_rsp))
             raise BizException(op_rsp.status.message)
-        self._polling_response(op_rsp, response)
+        name = op_rsp.operation.name
+        if self._ledger is not None:
+            # Recorded before polling, so the operation can be recovered
+            # by its name if the process exits while polling. The import has
+            # been submitted, so it's polled even if the recording fails.
+            try:
+                self._ledger.record(name, _call_name(call), request, opts)
+            except BaseException as e:
+                log.error("[PollingImportResponse] record operation fail, name:%s msg:%s", name, e)
+        self._polling_response(op_rsp, response, deadline)
+        if self._ledger is not None:
+            # The import is done, a failed marking only leaves it to be recovered
+            try:
+                self._ledger.mark(name, STATE_DONE)
+            except BaseException as e:
+                log.error("[PollingImportResponse] mark operation done fail, name:%s msg:%s", name, e)
         return response
 
+    # Write with retry, and when only part of items fail, resend the
+    # retriable ones instead of the whole request.
+    #
+    # @param call                 the write task need to execute
+    # @param request              the request type of task, or data list of general/byteair
+    # @param opts                 the options need by the task
+    # @param retry_times          the max count of resending the failed items
+    # @param on_permanent_failure receive the call name and list of (item, error message),
+    #                             which still fail after resending or never succeed by resending
+    # @param deadline             optional, the write including resending should finish before it
+    # @return the response of last write when no item is dropped. Otherwise a copy of it, whose
+    #         status is the partial failure and "errors" are all the items given to "on_permanent_failure",
+    #         so that the callers checking the status don't take the dropped items as written,
+    #         see "is_write_finished"
+    def do_write(self, call, request, opts: tuple, retry_times: int, on_permanent_failure=None,
+                 deadline: Optional[Deadline] = None):
+        if on_permanent_failure is None:
+            on_permanent_failure = log_permanent_failures
+        if retry_times < 0:
+            retry_times = 0
+        call_name = _call_name(call)
+        rsp = self.do_with_retry(call, request, opts, retry_times, deadline)
+        failed_status = None
+        dropped_errors = []
+        for i in range(retry_times + 1):
+            if is_upload_success(rsp.status) or len(rsp.errors) == 0:
+                break
+            if failed_status is None:
+                failed_status = rsp.status
+            classified = classify_errors(rsp.errors, request_items(request))
+            retriable = [item for _, item, is_retriable in classified if is_retriable]
+            # The retriable items of last round are given up too
+            give_up = len(retriable) == 0 or i == retry_times
+            dropped = [(error, item) for error, item, is_retriable in classified if give_up or not is_retriable]
+            if len(dropped) > 0:
+                dropped_errors.extend(error for error, _ in dropped)
+                on_permanent_failure(call_name, [(item, error.message) for error, item in dropped])
+            if give_up:
+                break
+            log.warning("[PartialWrite] resend failed items, call:%s retriable:%d permanent:%d",
+                        call_name, len(retriable), len(dropped))
+            request = rebatch(request, retriable)
+            # The resent items are a new request, reusing the
+            # origin requestId will be treated as duplicate by server
+            resend_opts = (opts or ()) + (Option.with_request_id(str(uuid.uuid1())),)
+            rsp = self.do_with_retry(call, request, resend_opts, retry_times, deadline)
+        if len(dropped_errors) == 0 or (not is_upload_success(rsp.status) and len(rsp.errors) == 0):
+            # The resent request failing as a whole is returned as it is, which should be sent again
+            return rsp
+        result = type(rsp)()
+        result.CopyFrom(rsp)
+        if is_upload_success(result.status):
+            result.status.CopyFrom(failed_status)
+        del result.errors[:]
+        result.errors.extend(dropped_errors)
+        return result
+
     # If the task is submitted too fast or the server is overloaded,
     # the server may refuse the request. In order to ensure the accuracy
     # of data transmission, you should wait some time and request again,
@@ -50,23 +156,31 @@ class RequestHelper(object):
     # @param callable the task need to execute
     # @param request  the request type of task
     # @param opts     the options need by the task
+    # @param deadline optional, the retries and waits are stopped at it
     # @return the response of task
     # @throws BizException throw by task or still overload after retry
-    def do_with_retry_although_overload(self, call, request, opts: tuple, retry_times: int):
+    def do_with_retry_although_overload(self, call, request, opts: tuple, retry_times: int,
+                                        deadline: Optional[Deadline] = None):
         if retry_times < 0:
             retry_times = 0
         try_times: int = retry_times + 1
+        call_name = _call_name(call)
+        interval: Optional[datetime.timedelta] = None
         for i in range(try_times):
-            rsp = self.do_with_retry(call, request, opts, retry_times - i)
+            rsp = self.do_with_retry(call, request, opts, retry_times - i, deadline)
             if is_server_overload(rsp.status):
+                if i == try_times - 1 or not self._allow_retry(call_name):
+                    break
                 # Wait some time before request again,
                 # and the wait time will increase by the number of retried
-                time.sleep(self._random_overload_wait_time(i).total_seconds())
+                interval = self._overload_retry_policy.next_interval(i, interval)
+                with get_tracer().start_span("overload_sleep", {"call": call_name, "overload_round": i}):
+                    sleep_within(interval, deadline)
                 continue
             return rsp
         raise BizException("Server overload")
 
-    def do_with_retry(self, call, request, opts: tuple, retry_times: int):
+    def do_with_retry(self, call, request, opts: tuple, retry_times: int, deadline: Optional[Deadline] = None):
         # To ensure the request is successfully received by the server,
         # it should be retried after a network exception occurs.
         # To prevent the retry from causing duplicate uploading same data,
@@ -76,17 +190,44 @@ class RequestHelper(object):
         opts = self._with_request_id(opts)
         if retry_times < 0:
             retry_times = 0
+        call_name = _call_name(call)
+        if self._retry_budget is not None:
+            self._retry_budget.on_request(call_name)
         try_times = retry_times + 1
+        interval: Optional[datetime.timedelta] = None
+        tracer = get_tracer()
+        # Only collected when tracing is enabled
+        attributes = None
+        if tracer.enabled:
+            attributes = request_attributes(request, opts)
+            attributes["call"] = call_name
         for i in range(try_times):
+            attempt_opts = opts
+            if deadline is not None:
+                # Every attempt only waits for the remaining time
+                deadline.check()
+                attempt_opts = deadline.bound_opts(opts)
             try:
-                rsp = call(request, *opts)
+                # The span is ended with error status by any exception
+                with tracer.start_span("attempt", attributes) as span:
+                    span.set_attribute("attempt", i)
+                    rsp = call(request, *attempt_opts)
             except NetException as e:
-                if i == try_times - 1:
+                if i == try_times - 1 or not self._allow_retry(call_name):
                     raise BizException(str(e))
+                interval = self._net_retry_policy.next_interval(i, interval)
+                with tracer.start_span("net_retry_sleep", attributes):
+                    sleep_within(interval, deadline)
                 continue
             return rsp
         return
 
+    def _allow_retry(self, call_name: str) -> bool:
+        if self._retry_budget is None or self._retry_budget.try_retry(call_name):
+            return True
+        log.warning("[RetryBudget] retry budget exhausted, call:%s", call_name)
+        return False
+
     @staticmethod
     def _with_request_id(opts: tuple) -> tuple:
         request_id_opt = Option.with_request_id(str(uuid.uuid1()))
@@ -94,16 +235,8 @@ class RequestHelper(object):
             return request_id_opt,
         return (request_id_opt,) + opts
 
-    @staticmethod
-    def _random_overload_wait_time(retried_times: int) -> datetime.timedelta:
-        increase_speed: int = 3
-        if retried_times < 0:
-            return _OVERLOAD_RETRY_INTERVAL
-        rate: float = 1 + random.random() * (increase_speed ** retried_times)
-        return _OVERLOAD_RETRY_INTERVAL * rate
-
-    def _polling_response(self, op_rsp: OperationResponse, response: Message):
-        rsp_any = self._do_polling_response(op_rsp.operation.name)
+    def _polling_response(self, op_rsp: OperationResponse, response: Message, deadline: Optional[Deadline]):
+        rsp_any = self._do_polling_response(op_rsp.operation.name, deadline)
         try:
             response.ParseFromString(rsp_any.value)
         except BaseException as e:
@@ -111,29 +244,35 @@ class RequestHelper(object):
             raise BizException("parse import response fail")
         return response
 
-    def _do_polling_response(self, name: str) -> Any:
-        end_time = datetime.datetime.now() + _POLLING_TIMEOUT
-        while datetime.datetime.now() < end_time:
-            op_rsp = self._get_polling_operation(name)
+    def _do_polling_response(self, name: str, deadline: Optional[Deadline] = None) -> Any:
+        polling_deadline = Deadline.after(_POLLING_TIMEOUT)
+        if deadline is not None and deadline.remaining() < polling_deadline.remaining():
+            polling_deadline = deadline
+        while not polling_deadline.expired():
+            op_rsp = self._get_polling_operation(name, polling_deadline)
             if op_rsp is None:
                 continue
             if is_loss_operation(op_rsp.status):
-                log.error("[PollingResponse] operation loss, rsp:\n%s", op_rsp)
+                log.error("[PollingResponse] operation loss, rsp:\n%s", Truncated(op_rsp))
+                if self._ledger is not None:
+                    self._ledger.mark(name, STATE_LOST)
                 raise BizException("operation loss, please feedback to bytedance")
             op = op_rsp.operation
             if op.done:
                 return op.response
-            time.sleep(_POLLING_INTERVAL.total_seconds())
+            polling_deadline.sleep(_POLLING_INTERVAL)
         log.error("[PollingResponse] polling(not request) timeout after %s", _POLLING_INTERVAL)
         raise BizException("polling import result timeout")
 
-    def _get_polling_operation(self, name: str) -> Optional[OperationResponse]:
+    def _get_polling_operation(self, name: str, deadline: Deadline) -> Optional[OperationResponse]:
         request = GetOperationRequest()
         request.name = name
-        timeout_opt = Option.with_timeout(_GET_OPERATION_TIMEOUT)
+        timeout_opt = Option.with_timeout(deadline.bound(_GET_OPERATION_TIMEOUT))
+        span = get_tracer().start_span("poll", {"operation": name})
         try:
             return self._common_client.get_operation(request, timeout_opt)
-        except NetException:
+        except NetException as e:
+            span.set_status(STATUS_ERROR, str(e))
             # The NetException should not be thrown.
             # Throwing an exception means the request could not continue,
             # while polling for import results should be continue until the
@@ -141,3 +280,9 @@ class RequestHelper(object):
             # error that should not continue, such as server telling operation lost,
             # parse response body fail, etc.
             return None
+        finally:
+            span.end()
+
+
+def _call_name(call) -> str:
+    return getattr(call, "__name__", str(call))
@@ -0,0 +1,109 @@
+import datetime
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+# Decide how long to wait before the next retry.
+class RetryPolicy(ABC):
+
+    # @param retried_times count of retries already done, 0 before the first retry
+    # @param last_interval the interval waited before last retry, None before the first retry
+    @abstractmethod
+    def next_interval(self, retried_times: int,
+                      last_interval: Optional[datetime.timedelta]) -> datetime.timedelta:
+        raise NotImplementedError
+
+
+# Retry at once, the behavior before retry policies were added
+class NoDelayPolicy(RetryPolicy):
+
+    def next_interval(self, retried_times: int,
+                      last_interval: Optional[datetime.timedelta]) -> datetime.timedelta:
+        return datetime.timedelta(0)
+
+
+# Wait a random interval in [0, min(cap, base * 2^retried_times)),
+# which is also called "full jitter"
+class CappedExponentialPolicy(RetryPolicy):
+
+    def __init__(self, base: datetime.timedelta, cap: datetime.timedelta):
+        self._base = base
+        self._cap = cap
+
+    def next_interval(self, retried_times: int,
+                      last_interval: Optional[datetime.timedelta]) -> datetime.timedelta:
+        # Avoid the large power when retried many times
+        exponential = self._base * (2 ** min(retried_times, 30))
+        return min(self._cap, exponential) * random.random()
+
+
+# Wait a random interval in [base, last_interval * 3), capped.
+# The intervals of workers spread apart from each other instead of
+# growing in the same steps, so their retries are not synchronized.
+class DecorrelatedJitterPolicy(RetryPolicy):
+
+    def __init__(self, base: datetime.timedelta, cap: datetime.timedelta):
+        self._base = base
+        self._cap = cap
+
+    def next_interval(self, retried_times: int,
+                      last_interval: Optional[datetime.timedelta]) -> datetime.timedelta:
+        if last_interval is None or last_interval < self._base:
+            last_interval = self._base
+        upper = last_interval * 3
+        return min(self._cap, self._base + (upper - self._base) * random.random())
+
+
+class _Bucket(object):
+
+    def __init__(self, tokens: float, refreshed_at: float):
+        self.tokens = tokens
+        self.refreshed_at = refreshed_at
+
+
+# Limit the retries of every endpoint to a fraction of its requests.
+# Every request deposits "ratio" tokens, and every retry takes one token.
+# Some retries per second are always allowed, so that the endpoints with
+# little traffic can still retry. When an endpoint is failing, the retries
+# stop at the fraction of traffic, instead of multiplying the requests.
+class RetryBudget(object):
+
+    # @param ratio                   the allowed retries per request, such as 0.1 for 10% more requests
+    # @param min_retries_per_second  the retries allowed regardless of the traffic
+    # @param max_tokens              the max count of retries saved up when the endpoint is healthy
+    def __init__(self, ratio: float = 0.1, min_retries_per_second: float = 10, max_tokens: float = 100):
+        self._ratio = ratio
+        self._min_retries_per_second = min_retries_per_second
+        self._max_tokens = max_tokens
+        self._lock = threading.Lock()
+        # endpoint -> _Bucket
+        self._buckets = {}
+
+    def on_request(self, endpoint: str) -> None:
+        with self._lock:
+            bucket = self._refresh(endpoint)
+            bucket.tokens = min(self._max_tokens, bucket.tokens + self._ratio)
+
+    # @return whether the retry is allowed, the token is taken if so
+    def try_retry(self, endpoint: str) -> bool:
+        with self._lock:
+            bucket = self._refresh(endpoint)
+            if bucket.tokens < 1:
+                return False
+            bucket.tokens -= 1
+            return True
+
+    def _refresh(self, endpoint: str) -> _Bucket:
+        now = time.monotonic()
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            bucket = _Bucket(self._min_retries_per_second, now)
+            self._buckets[endpoint] = bucket
+            return bucket
+        elapsed = now - bucket.refreshed_at
+        bucket.tokens = min(self._max_tokens, bucket.tokens + elapsed * self._min_retries_per_second)
+        bucket.refreshed_at = now
+        return bucket
@@ -23,3 +23,13 @@ def is_server_overload(status: Status) -> bool:
 
 def is_loss_operation(status: Status) -> bool:
     return status.code == STATUS_CODE_OPERATION_LOSS
+
+
+# The codes of failures which may succeed if sent again, such as overload and
+# the transient errors of server. The others, such as invalid argument, fail again.
+def is_retriable_code(code: int) -> bool:
+    return code == STATUS_CODE_TOO_MANY_REQUEST or code in _RETRIABLE_SERVER_CODES
+
+
+# internal error, bad gateway, unavailable and gateway timeout
+_RETRIABLE_SERVER_CODES = (500, 502, 503, 504)
@@ -0,0 +1,229 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from byteplus.core import Option
+
+log = logging.getLogger(__name__)
+
+STATUS_UNSET = "UNSET"
+
+STATUS_OK = "OK"
+
+STATUS_ERROR = "ERROR"
+
+# The span of current thread, the spans started without parent are its children
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+# A timed step of a request, such as an attempt or a poll.
+# The fields follow the span of OpenTelemetry: 128-bit trace id,
+# 64-bit span id as hex, and unix nanoseconds of start and end.
+class Span(object):
+
+    def __init__(self, tracer, name: str, trace_id: str, parent_id: Optional[str], attributes: dict):
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano = 0
+        self._token = None
+
+    @property
+    def is_recording(self) -> bool:
+        return self.end_time_unix_nano == 0
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_time_unix_nano - self.start_time_unix_nano) / 1e6
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def set_status(self, status: str, message: str = "") -> None:
+        self.status = status
+        self.status_message = message
+
+    def end(self) -> None:
+        if not self.is_recording:
+            return
+        self.end_time_unix_nano = time.time_ns()
+        self._tracer.export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id or "",
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "attributes": dict(self.attributes),
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+    # Use as "with tracer.start_span(...) as span", the span is the current
+    # span inside, and its status is set to error by the exception
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.set_status(STATUS_ERROR, str(exc_value))
+        self.end()
+        return False
+
+
+# Returned when tracing is disabled, every method does nothing
+class _NoopSpan(object):
+    is_recording = False
+
+    def set_attribute(self, key: str, value) -> None:
+        return
+
+    def set_status(self, status: str, message: str = "") -> None:
+        return
+
+    def end(self) -> None:
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter(ABC):
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+
+# Keep the ended spans in memory, for tests and debugging
+class InMemoryExporter(SpanExporter):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = []
+
+    @property
+    def spans(self) -> list:
+        with self._lock:
+            return list(self._spans)
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class LoggingExporter(SpanExporter):
+
+    def __init__(self, logger: logging.Logger = log, level: int = logging.INFO):
+        self._logger = logger
+        self._level = level
+
+    def export(self, span: Span) -> None:
+        self._logger.log(self._level, "[Span] %s %.3fms trace:%s status:%s attributes:%s",
+                         span.name, span.duration_ms, span.trace_id, span.status, span.attributes)
+
+
+class Tracer(object):
+
+    # @param exporter   receive the ended spans, tracing is disabled if it's None
+    # @param attributes the attributes of all spans, such as {"tenant": "retail_demo"}
+    def __init__(self, exporter: Optional[SpanExporter] = None, attributes: Optional[dict] = None):
+        self._exporter = exporter
+        self._attributes = attributes or {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._exporter is not None
+
+    # @param parent optional, the current span of thread by default
+    def start_span(self, name: str, attributes: Optional[dict] = None, parent=None):
+        if self._exporter is None:
+            return NOOP_SPAN
+        if parent is None:
+            parent = _current_span.get()
+        span_attributes = dict(self._attributes)
+        if attributes is not None:
+            span_attributes.update(attributes)
+        if isinstance(parent, Span):
+            return Span(self, name, parent.trace_id, parent.span_id, span_attributes)
+        return Span(self, name, "%032x" % random.getrandbits(128), None, span_attributes)
+
+    def export(self, span: Span) -> None:
+        try:
+            self._exporter.export(span)
+        except BaseException as e:
+            log.error("[Tracer] export span occur error, msg:%s", e)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+# Enable tracing for RequestHelper and ConcurrentHelper
+def set_tracer(tracer: Tracer) -> None:
+    global _tracer
+    _tracer = tracer
+
+
+def current_span():
+    return _current_span.get()
+
+
+# Submit the call to executor, with an "enqueue" span ending when it's
+# submitted, and a "dequeue" span covering the execution in worker, whose
+# queue_wait_ms is the time from submitting to running in worker.
+def submit_traced(executor, name: str, call, *args, attributes: Optional[dict] = None):
+    tracer = _tracer
+    if not tracer.enabled:
+        return executor.submit(call, *args)
+    enqueue_span = tracer.start_span(name + ".enqueue", attributes)
+    context = contextvars.copy_context()
+
+    def run():
+        with tracer.start_span(name + ".dequeue", attributes, parent=enqueue_span) as span:
+            span.set_attribute("queue_wait_ms", (span.start_time_unix_nano - enqueue_span.start_time_unix_nano) / 1e6)
+            return call(*args)
+
+    future = executor.submit(context.run, run)
+    enqueue_span.end()
+    return future
+
+
+# The attributes of request, which are only collected when tracing is enabled
+def request_attributes(request, opts: tuple) -> dict:
+    attributes = {}
+    request_id = Option.conv_to_options(opts or ()).request_id
+    if request_id:
+        attributes["request_id"] = request_id
+    scene = getattr(request, "scene", None)
+    scene_name = getattr(scene, "scene_name", None)
+    if scene_name:
+        attributes["scene"] = scene_name
+    return attributes
@@ -0,0 +1,110 @@
+import itertools
+import logging
+import uuid
+
+from byteplus.core import BizException, Option
+
+from example.common.checkpoint import Checkpoint
+from example.common.json_lines import read_lines
+from example.common.request_helper import RequestHelper
+from example.common.write_error_helper import is_write_finished
+
+log = logging.getLogger(__name__)
+
+# The namespace of the request ids generated by sessions
+_REQUEST_ID_NAMESPACE = uuid.UUID("6f1d3c52-8a4e-4f0b-9d2a-3c7e5b1a9f60")
+
+_SOURCE_FILE = "file"
+
+_SOURCE_ROWS = "rows"
+
+
+# A resumable upload of a big source, such as months of "history_sync" data.
+# The offset of source, byte offset of file or index of row, is committed
+# after every acknowledged batch, and a restarted session continues from it.
+#
+# A batch sent but not committed before crash is sent again after restart,
+# with the same request id derived from session id and offset, so that
+# server can treat it as a duplicate.
+class UploadSession(object):
+
+    # @param request_helper  retries the write requests
+    # @param write           write(batch, *opts) -> WriteResponse, such as
+    #                        "lambda lines, *opts: write_json_lines(client, lines, topic, *opts)"
+    # @param write_options   write_options() -> opts, such as the options of "history_sync" stage
+    # @param checkpoint_path the file recording the committed offset
+    # @param session_id      identifies the upload, the checkpoint of another session is rejected
+    def __init__(self, request_helper: RequestHelper, write, write_options, checkpoint_path: str,
+                 session_id: str, retry_times: int = 2):
+        self._request_helper = request_helper
+        self._write = write
+        self._write_options = write_options
+        self._retry_times = retry_times
+        self._session_id = session_id
+        self._checkpoint = Checkpoint(checkpoint_path)
+        self._state = self._checkpoint.load()
+        if self._state is not None and self._state.get("session_id") != session_id:
+            raise ValueError("checkpoint '%s' belongs to session '%s'" % (checkpoint_path, self._state.get("session_id")))
+
+    @property
+    def offset(self) -> int:
+        return 0 if self._state is None else self._state["offset"]
+
+    # The same session and offset always get the same request id
+    def request_id(self, offset: int) -> str:
+        return str(uuid.uuid5(_REQUEST_ID_NAMESPACE, "%s:%d" % (self._session_id, offset)))
+
+    # Upload a json lines file of general/byteair, from the committed byte offset.
+    #
+    # @return count of batches uploaded in this run
+    def upload_file(self, path: str, batch_size: int) -> int:
+        self._check_source(_SOURCE_FILE, path)
+        batches = 0
+        for lines, begin, end in read_lines(path, batch_size, self.offset, with_offsets=True):
+            self._upload(lines, begin)
+            self._commit(_SOURCE_FILE, path, end)
+            batches += 1
+        log.info("[UploadSession] file finish, session:%s batches:%d offset:%d", self._session_id, batches, self.offset)
+        return batches
+
+    # Upload the rows, such as the items of protobuf industries, from the committed row index.
+    # The rows must be produced in the same order every time.
+    #
+    # @param build_batch optional, build the request from a list of rows,
+    #                    such as "lambda users: rebatch(WriteUsersRequest(), users)"
+    # @return count of batches uploaded in this run
+    def upload_rows(self, source: str, rows, batch_size: int, build_batch=None) -> int:
+        self._check_source(_SOURCE_ROWS, source)
+        batches = 0
+        offset = self.offset
+        iterator = itertools.islice(iter(rows), offset, None)
+        while True:
+            batch = list(itertools.islice(iterator, batch_size))
+            if len(batch) == 0:
+                break
+            self._upload(batch if build_batch is None else build_batch(batch), offset)
+            offset += len(batch)
+            self._commit(_SOURCE_ROWS, source, offset)
+            batches += 1
+        log.info("[UploadSession] rows finish, session:%s batches:%d offset:%d", self._session_id, batches, offset)
+        return batches
+
+    def _upload(self, batch, offset: int) -> None:
+        # The request id is put at last, which overrides the one in write_options
+        opts = tuple(self._write_options()) + (Option.with_request_id(self.request_id(offset)),)
+        rsp = self._request_helper.do_write(self._write, batch, opts, self._retry_times)
+        # The dropped items fail again if resent, they are reported by "do_write"
+        if not is_write_finished(rsp):
+            # Stop at the failed batch, the next run starts from it again
+            raise BizException("upload batch fail, offset:%d status:%s" % (offset, rsp.status))
+
+    def _commit(self, kind: str, source: str, offset: int) -> None:
+        self._state = {"session_id": self._session_id, "kind": kind, "source": source, "offset": offset}
+        self._checkpoint.save(self._state)
+
+    def _check_source(self, kind: str, source: str) -> None:
+        if self._state is None:
+            return
+        if self._state["kind"] != kind or self._state["source"] != source:
+            raise ValueError("session '%s' is uploading %s '%s'" %
+                             (self._session_id, self._state["kind"], self._state["source"]))
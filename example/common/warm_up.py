@@ -0,0 +1,90 @@
+import datetime
+import logging
+import socket
+import time
+from typing import Optional
+
+import requests
+
+from example.common.connection_pool import PING_PATH, PooledTransport
+
+log = logging.getLogger(__name__)
+
+# The same as the default "ping_timeout_seconds" of host availabler
+_PING_TIMEOUT = datetime.timedelta(milliseconds=300)
+
+
+# Resolve the hosts once, so that the dns result is cached
+# by system resolver before the first real request.
+#
+# @return the hosts resolved successfully
+def resolve_hosts(hosts: list) -> list:
+    resolved = []
+    for host in hosts:
+        name, _, port = host.partition(":")
+        try:
+            socket.getaddrinfo(name, int(port) if port else None, type=socket.SOCK_STREAM)
+        except (socket.gaierror, ValueError) as e:
+            log.warning("[WarmUp] resolve host fail, host:%s msg:%s", host, e)
+            continue
+        resolved.append(host)
+    return resolved
+
+
+# Ping every host once synchronously like host availabler does,
+# rather than waiting for its first ping interval.
+#
+# @return the hosts sorted by ping latency, the unavailable ones are at the end
+def ping_hosts(hosts: list, scheme: str = "https", transport: Optional[PooledTransport] = None) -> list:
+    get = requests.get if transport is None else transport.get
+    latencies = {}
+    for host in hosts:
+        url = "%s://%s%s" % (scheme, host, PING_PATH)
+        start = time.perf_counter()
+        try:
+            rsp = get(url, timeout=_PING_TIMEOUT.total_seconds())
+        except requests.RequestException as e:
+            log.warning("[WarmUp] ping host fail, host:%s msg:%s", host, e)
+            continue
+        if rsp.status_code == 200:
+            latencies[host] = time.perf_counter() - start
+    available = sorted(latencies, key=latencies.get)
+    return available + [host for host in hosts if host not in latencies]
+
+
+# The hosts and scheme of client, which are the hosts set by "ClientBuilder.hosts",
+# or the default hosts of region when the client is built.
+#
+# @param default_hosts used when the client has no hosts, such as a region without default hosts in sdk
+# @return (hosts, scheme)
+def client_hosts(client, default_hosts: list = ()) -> tuple:
+    context = getattr(client, "_context", None)
+    hosts = list(getattr(context, "hosts", None) or default_hosts)
+    return hosts, getattr(context, "schema", "https")
+
+
+# Pay the cold-start cost before serving:
+#   1. resolve the hosts
+#   2. ping the hosts once and sort them by latency
+#   3. open pooled connections to the hosts
+#   4. send a canary request, such as predict, to prime the server side
+#
+# @param hosts       the hosts of region, or the hosts set by "ClientBuilder.hosts", see "client_hosts"
+# @param transport   the installed pooled transport, connections are opened in it
+# @param scheme      "https" or "http"
+# @param connections count of connections opened per host, default is "prewarm_connections" of pool config
+# @param canary      a callable sending one real request, the exception is logged and ignored
+# @return the hosts sorted by ping latency, which can be passed to "ClientBuilder.hosts"
+def warm_up(hosts: list, transport: Optional[PooledTransport] = None, scheme: str = "https",
+            connections: Optional[int] = None, canary=None) -> list:
+    start = time.perf_counter()
+    sorted_hosts = ping_hosts(resolve_hosts(hosts), scheme, transport)
+    if transport is not None and len(sorted_hosts) > 0:
+        transport.prewarm(sorted_hosts, scheme, connections)
+    if canary is not None:
+        try:
+            canary()
+        except BaseException as e:
+            log.warning("[WarmUp] canary request occur error, msg:%s", e)
+    log.info("[WarmUp] finish, hosts:%s cost:%.3fs", sorted_hosts, time.perf_counter() - start)
+    return sorted_hosts
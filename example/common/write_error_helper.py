@@ -0,0 +1,148 @@
+import json
+import logging
+from typing import Optional
+
+from google.protobuf.message import Message
+
+from example.common.log_helper import Truncated
+from example.common.status_helper import is_retriable_code, is_upload_success
+
+log = logging.getLogger(__name__)
+
+# The per-item error messages which may succeed if resent, only used for the
+# errors without a status code, such as the "XXXError" of current protocols.
+# The others, such as missing required field or wrong format,
+# will fail again no matter how many times they are resent.
+_RETRIABLE_KEYWORDS = (
+    "timeout",
+    "time out",
+    "overload",
+    "too many",
+    "internal",
+    "unavailable",
+    "busy",
+    "try again",
+)
+
+# The fields of per-item error which carry the status rather than the item
+_STATUS_FIELDS = ("message", "code", "status")
+
+# The count of failed items logged by "log_permanent_failures", the others are counted
+_MAX_LOGGED_FAILURES = 3
+
+# request descriptor full name -> name of the repeated item field
+_item_field_cache = {}
+
+
+def is_retriable_item_error(message: str) -> bool:
+    message = message.lower()
+    for keyword in _RETRIABLE_KEYWORDS:
+        if keyword in message:
+            return True
+    return False
+
+
+# Judge every per-item error of "WriteXXXResponse". The error is classified by
+# its status code by "is_retriable_code" when it has one, otherwise by its message.
+# The error whose item can't be found is never retriable, as it can't be resent.
+#
+# @param errors       the "errors" field of write response
+# @param items        the items sent in request, used when error only carries an index
+# @param is_retriable judge whether an error message is retriable, the fallback without status code
+# @return list of (error, item, retriable), the item is the same one sent in request,
+#         which is a protobuf message or a dict of general/byteair
+def classify_errors(errors, items: Optional[list] = None, is_retriable=is_retriable_item_error) -> list:
+    result = []
+    for error in errors:
+        item = _error_item(error, items)
+        code = _error_code(error)
+        retriable = is_retriable(error.message) if code is None else is_retriable_code(code)
+        result.append((error, item, item is not None and retriable))
+    return result
+
+
+# Split the per-item errors of "WriteXXXResponse" into retriable and permanent.
+# Every part is a list of (item, error message), see "classify_errors".
+def partition_errors(errors, items: Optional[list] = None, is_retriable=is_retriable_item_error) -> tuple:
+    retriable = []
+    permanent = []
+    for error, item, is_retriable_error in classify_errors(errors, items, is_retriable):
+        (retriable if is_retriable_error else permanent).append((item, error.message))
+    return retriable, permanent
+
+
+# Whether the items of "RequestHelper.do_write" need no more sending, that is the
+# write succeeded, or only the dropped items failed, which have been given to
+# "on_permanent_failure". A response failing as a whole has no errors.
+def is_write_finished(rsp) -> bool:
+    return is_upload_success(rsp.status) or len(rsp.errors) > 0
+
+
+# Build a request only containing the given items, other fields
+# such as "extra" are kept the same as the origin request.
+def rebatch(request, items: list):
+    if not isinstance(request, Message):
+        # The request of general/byteair is the data list itself
+        return list(items)
+    field_name = _item_field_name(request, items[0])
+    new_request = type(request)()
+    new_request.CopyFrom(request)
+    new_request.ClearField(field_name)
+    getattr(new_request, field_name).extend(items)
+    return new_request
+
+
+def request_items(request) -> list:
+    if not isinstance(request, Message):
+        return request
+    for field in request.DESCRIPTOR.fields:
+        if field.label == field.LABEL_REPEATED and field.message_type is not None:
+            return list(getattr(request, field.name))
+    return []
+
+
+# Log the count of failures with a few samples, truncated like the logs of HelperLog
+def log_permanent_failures(call_name: str, failures: list) -> None:
+    if len(failures) == 0 or not log.isEnabledFor(logging.ERROR):
+        return
+    samples = "; ".join("msg:%s item:%s" % (message, item) for item, message in failures[:_MAX_LOGGED_FAILURES])
+    log.error("[PartialWrite] permanent failure, call:%s count:%d samples:\n%s",
+              call_name, len(failures), Truncated(samples))
+
+
+def _error_code(error) -> Optional[int]:
+    for field, value in error.ListFields():
+        if field.name == "code" and isinstance(value, int):
+            return value
+        if field.name == "status" and isinstance(value, Message):
+            return value.code
+    return None
+
+
+def _error_item(error, items: Optional[list]):
+    for field, value in error.ListFields():
+        if field.name in _STATUS_FIELDS:
+            continue
+        if isinstance(value, Message):
+            return value
+        if field.name == "index" and items is not None and 0 <= value < len(items):
+            return items[value]
+        if isinstance(value, str):
+            # The "data" of general/byteair error is the json of origin item
+            try:
+                return json.loads(value)
+            except ValueError:
+                return None
+    return None
+
+
+def _item_field_name(request: Message, item: Message) -> str:
+    key = request.DESCRIPTOR.full_name
+    field_name = _item_field_cache.get(key)
+    if field_name is not None:
+        return field_name
+    for field in request.DESCRIPTOR.fields:
+        if field.label == field.LABEL_REPEATED and field.message_type is item.DESCRIPTOR:
+            _item_field_cache[key] = field.name
+            return field.name
+    raise ValueError("can't find item field of request:" + key)
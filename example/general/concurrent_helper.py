@@ -1,88 +1,30 @@
-import logging
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future
 
 from byteplus.core.option import Option
-from byteplus.general import Client
-from byteplus.common.protocol import DoneResponse
-from byteplus.general.protocol import CallbackRequest, ImportResponse, WriteResponse
-from example.common.request_helper import RequestHelper
-from example.common.status_helper import is_success, is_success_code
+from byteplus.general.protocol import ImportResponse
+from example.common import concurrent_helper
+from example.common.concurrent_helper import MODE_WRITE, MODE_IMPORT, MODE_DONE, MODE_CALLBACK
 
-log = logging.getLogger(__name__)
+helper_log = concurrent_helper.helper_log
 
-_RETRY_TIMES = 2
 
+class ConcurrentHelper(concurrent_helper.ConcurrentHelper):
 
-class ConcurrentHelper(object):
+    def _register_routes(self) -> None:
+        # The data lists of general are routed by call name
+        self.register("write_data", "write_data", MODE_WRITE)
+        self.register("import_data", "import_data", MODE_IMPORT, ImportResponse)
+        self.register("done", "done", MODE_DONE)
+        self.register("callback", "callback", MODE_CALLBACK)
 
-    def __init__(self, client: Client):
-        self._client = client
-        self._request_helper = RequestHelper(client)
-        self._executor = ThreadPoolExecutor(max_workers=5)
+    def submit_write_request(self, data_list: list, topic: str, *opts: Option) -> Future:
+        return self._submit_call("write_data", data_list, opts, (topic,))
 
-    def submit_write_request(self, data_list: list, topic: str, *opts: Option):
-        self._executor.submit(self._do_write, data_list, topic, *opts)
+    def submit_import_request(self, data_list: list, topic: str, *opts: Option) -> Future:
+        return self._submit_call("import_data", data_list, opts, (topic,))
 
-    def _do_write(self, data_list: list, topic: str, *opts: Option):
-        def call(call_data_list: list, *call_opts: Option) -> WriteResponse:
-            return self._client.write_data(call_data_list, topic, *call_opts)
+    def submit_done_request(self, date_list: list, topic: str, *opts: Option) -> Future:
+        return self._submit_call("done", date_list, opts, (topic,))
 
-        try:
-            rsp = self._request_helper.do_with_retry(call, data_list, opts, _RETRY_TIMES)
-            if is_success(rsp.status):
-                log.info("[AsyncWrite] success")
-                return
-            log.error("[AsyncWrite] fail, rsp:\n%s", rsp)
-        except BaseException as e:
-            log.error("[AsyncWrite] occur error, msg:%s", str(e))
-        return
-
-    def submit_import_request(self, data_list: list, topic: str, *opts: Option):
-        self._executor.submit(self._do_import, data_list, topic, *opts)
-
-    def _do_import(self, data_list: list, topic: str, *opts: Option):
-        response: ImportResponse = ImportResponse()
-
-        def call(call_data_list: list, *call_opts: Option) -> ImportResponse:
-            return self._client.import_data(call_data_list, topic, *call_opts)
-
-        try:
-            self._request_helper.do_import(call, data_list, response, opts, _RETRY_TIMES)
-            if is_success(response.status):
-                log.info("[AsyncImport] success")
-                return
-            log.error("[AsyncImport] fail, rsp:\n%s", response)
-        except BaseException as e:
-            log.error("[AsyncImport] occur error, msg:%s", str(e))
-        return
-
-    def submit_done_request(self, date_list: list, topic: str, *opts: Option):
-        self._executor.submit(self._do_done, date_list, topic, *opts)
-
-    def _do_done(self, date_list: list, topic: str, *opts: Option):
-        def call(call_date_list: list, *call_opts: Option) -> DoneResponse:
-            return self._client.done(call_date_list, topic, *call_opts)
-
-        try:
-            rsp = self._request_helper.do_with_retry(call, date_list, opts, _RETRY_TIMES)
-            if is_success(rsp.status):
-                log.info("[AsyncDone] success")
-                return
-            log.error("[AsyncDone] fail, rsp:\n%s", rsp)
-        except BaseException as e:
-            log.error("[AsyncDone] occur error, msg:%s", str(e))
-        return
-
-    def submit_callback_request(self, request, *opts: tuple):
-        self._executor.submit(self._do_callback, request, *opts)
-
-    def _do_callback(self, request: CallbackRequest, *opts: Option):
-        try:
-            rsp = self._request_helper.do_with_retry(self._client.callback, request, opts, _RETRY_TIMES)
-            if is_success_code(rsp.code):
-                log.info("[AsyncCallback] success")
-                return
-            log.error("[AsyncCallback] fail, rsp:\n%s", rsp)
-        except BaseException as e:
-            log.error("[AsyncCallback] occur error, msg:%s", str(e))
-        return
+    def submit_callback_request(self, request, *opts: Option) -> Future:
+        return self._submit_call("callback", request, opts)
@@ -13,8 +13,14 @@ from byteplus.general import Client, ClientBuilder
 from byteplus.common.protocol import DoneResponse
 from byteplus.general.protocol import ImportResponse, WriteResponse, PredictRequest, PredictUser, \
     CallbackRequest, CallbackItem, PredictResponse
+from example.common.connection_pool import PoolConfig, PooledTransport, install_pooled_transport, \
+    pool_size_for_workers
+from example.common.data_validator import DataValidator
+from example.common.deadline import Deadline
+from example.common.json_lines import encode_lines, write_json_lines
 from example.common.request_helper import RequestHelper
 from example.common.status_helper import is_upload_success, is_success, is_success_code
+from example.common.warm_up import client_hosts, warm_up as do_warm_up
 from example.general.mock_hlper import mock_data_list
 
 log = logging.getLogger(__name__)
@@ -76,6 +82,16 @@ client: Client = ClientBuilder() \
 
 request_helper: RequestHelper = RequestHelper(client)
 
+# Keep the connections alive and reuse them among requests, rather than re-handshaking every time.
+pooled_transport: PooledTransport = install_pooled_transport(
+    PoolConfig(pool_size=pool_size_for_workers(1), prewarm_connections=1))
+
+# Check the data of every topic locally, the schemas can be changed by "DataValidator(schemas)"
+data_validator: DataValidator = DataValidator()
+
+# The rows rejected by data_validator are saved here
+REJECTED_ROWS_PATH = "rejected_rows.jsonl"
+
 DEFAULT_RETRY_TIMES = 2
 
 DEFAULT_WRITE_TIMEOUT = timedelta(milliseconds=800)
@@ -93,8 +109,13 @@ logging.basicConfig(level=logging.NOTSET)
 
 
 def main():
+    # Pay the cold-start cost before the real requests
+    warm_up()
+
     # upload data
     write_data_example()
+    # upload encoded json lines, such as the lines of daily files
+    write_json_lines_example()
 
     # Mark some day's data has been entirely imported
     # Only used when uploading incremental day-level data
@@ -111,6 +132,17 @@ def main():
     os.kill(os.getpid(), SIGKILL)
 
 
+def warm_up():
+    # Resolve and ping the hosts, open pooled connections and send a canary request.
+    # The returned hosts are sorted by latency, which can be set by "ClientBuilder.hosts".
+    hosts, scheme = client_hosts(client)
+    do_warm_up(hosts, pooled_transport, scheme, canary=_predict_canary)
+
+
+def _predict_canary():
+    client.predict(_build_predict_request(), "home", *_default_opts(DEFAULT_PREDICT_TIMEOUT))
+
+
 def write_data_example():
     # The count of items included in one "Write" request
     # is better to less than 10000 when upload data.
@@ -119,12 +151,18 @@ def write_data_example():
     # who according to tenant's situation
     topic: str = "user"
     opts: tuple = _write_options()
+    # Drop the bad rows before sending, rather than failing the whole request
+    data_list, report = data_validator.validate(topic, data_list)
+    if report.rejected_count > 0:
+        report.save(REJECTED_ROWS_PATH)
+    if len(data_list) == 0:
+        return
 
     def call(call_data_list, *call_opts: Option) -> WriteResponse:
         return client.write_data(call_data_list, topic, *call_opts)
 
     try:
-        response = request_helper.do_with_retry(call, data_list, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(call, data_list, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write occur err, msg:%s", e)
         return
@@ -135,6 +173,28 @@ def write_data_example():
     return
 
 
+def write_json_lines_example():
+    # The lines can also be read from a json lines file by "read_lines",
+    # which are sent without being decoded and encoded again.
+    lines: list = encode_lines(mock_data_list(2))
+    topic: str = "user"
+    opts: tuple = _write_options()
+
+    def call(call_lines: list, *call_opts: Option) -> WriteResponse:
+        return write_json_lines(client, call_lines, topic, *call_opts)
+
+    try:
+        response = request_helper.do_write(call, lines, opts, DEFAULT_RETRY_TIMES)
+    except BizException as e:
+        log.error("write json lines occur err, msg:%s", e)
+        return
+    if is_upload_success(response.status):
+        log.info("write json lines success")
+        return
+    log.error("write json lines find failure info, msg:%s errItems:%s", response.status, response.errors)
+    return
+
+
 def _write_options() -> tuple:
     return (
         # Required, uniquely identifies a request
@@ -173,11 +233,13 @@ def done_example():
 
 
 def recommend_example():
+    # The predict including building its request finishes in DEFAULT_PREDICT_TIMEOUT
+    deadline = Deadline.after(DEFAULT_PREDICT_TIMEOUT)
     predict_request: PredictRequest = _build_predict_request()
     # The `scene` is provided by ByteDance, according to tenant's situation
     scene = "home"
-    predict_opts = _default_opts(DEFAULT_PREDICT_TIMEOUT)
     try:
+        predict_opts = deadline.bound_opts(_default_opts(DEFAULT_PREDICT_TIMEOUT))
         predict_response = client.predict(predict_request, scene, *predict_opts)
     except (NetException, BizException) as e:
         log.error("predict occur error, msg:%s", e)
@@ -265,12 +327,13 @@ def conv_to_callback_items(product_items: list) -> list:
 
 
 def search_example():
+    deadline = Deadline.after(DEFAULT_PREDICT_TIMEOUT)
     search_request = build_search_request()
-    opts = _default_opts(DEFAULT_PREDICT_TIMEOUT)
     # The `scene` is provided by ByteDance,
     # that usually is "search" in search request
     scene = "search"
     try:
+        opts = deadline.bound_opts(_default_opts(DEFAULT_PREDICT_TIMEOUT))
         predict_response = client.predict(search_request, scene, *opts)
     except BaseException as e:
         log.error("search occur error, msg:%s", str(e))
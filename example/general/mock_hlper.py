@@ -1,4 +1,4 @@
-import json
+from example.common.json_lines import encode_str
 
 
 def mock_data_list(count: int) -> list:
@@ -39,6 +39,6 @@ def mock_data():
         "rec_info": "CiRiMjYyYjM1YS0xOTk1LTQ5YmMtOGNkNS1mZTVmYTczN2FkNDASJAobcmVjZW50X2hvdF9jbGlja3NfcmV0cmlldmVyFQAAAAAYDxoKCgNjdHIdog58PBoKCgNjdnIdANK2OCIHMjcyNTgwMg==",
         "traffic_source": "self",
         "purchase_count": 20,
-        "extra_info": json.dumps(extra_info_map),
+        "extra_info": encode_str(extra_info_map),
     }
     return result
@@ -14,7 +14,11 @@ from byteplus.core import Option, Region, BizException, NetException
 from byteplus.media import ClientBuilder, Client
 from byteplus.media.protocol import WriteUsersRequest, WriteContentsRequest, WriteUserEventsRequest, \
     WriteUserEventsResponse, WriteContentsResponse, WriteUsersResponse, PredictRequest, AckServerImpressionsRequest
+from example.common.connection_pool import PoolConfig, PooledTransport, install_pooled_transport, \
+    pool_size_for_workers
+from example.common.deadline import Deadline
 from example.common.status_helper import is_upload_success, is_success
+from example.common.warm_up import client_hosts, warm_up as do_warm_up
 from example.media.concurrent_helper import ConcurrentHelper
 from example.media.mock_helper import mock_users, mock_contents, mock_user_events, mock_content
 
@@ -77,6 +81,12 @@ client: Client = ClientBuilder() \
 
 concurrent_helper: ConcurrentHelper = ConcurrentHelper(client)
 
+# Keep the connections alive and reuse them among the workers of concurrent_helper,
+# rather than re-handshaking for every request.
+pooled_transport: PooledTransport = install_pooled_transport(
+    PoolConfig(pool_size=pool_size_for_workers(concurrent_helper.max_workers),
+               prewarm_connections=concurrent_helper.max_workers))
+
 DEFAULT_WRITE_TIMEOUT = timedelta(milliseconds=800)
 
 DEFAULT_DONE_TIMEOUT = timedelta(milliseconds=800)
@@ -90,6 +100,9 @@ logging.basicConfig(level=logging.NOTSET)
 
 
 def main():
+    # Pay the cold-start cost before the real requests
+    warm_up()
+
     # Write real-time user data
     write_users_example()
     # Write real-time user data concurrently
@@ -116,6 +129,17 @@ def main():
     os.kill(os.getpid(), SIGKILL)
 
 
+def warm_up():
+    # Resolve and ping the hosts, open pooled connections and send a canary request.
+    # The returned hosts are sorted by latency, which can be set by "ClientBuilder.hosts".
+    hosts, scheme = client_hosts(client)
+    do_warm_up(hosts, pooled_transport, scheme, canary=_predict_canary)
+
+
+def _predict_canary():
+    client.predict(_build_predict_request(), "home", *_default_opts(DEFAULT_PREDICT_TIMEOUT))
+
+
 def write_users_example():
     # The "WriteXXX" api can transfer max to 2000 items at one request
     request = _build_write_user_request(1)
@@ -233,9 +257,11 @@ def done_example():
 
 
 def recommend_example():
+    # The predict including building its request finishes in DEFAULT_PREDICT_TIMEOUT
+    deadline = Deadline.after(DEFAULT_PREDICT_TIMEOUT)
     predict_request = _build_predict_request()
-    predict_opts = _default_opts(DEFAULT_PREDICT_TIMEOUT)
     try:
+        predict_opts = deadline.bound_opts(_default_opts(DEFAULT_PREDICT_TIMEOUT))
         # The "home" is scene name, which provided by ByteDance, usually is "home"
         predict_response = client.predict(predict_request, "home", *predict_opts)
     except (NetException, BizException) as e:
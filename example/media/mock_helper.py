@@ -1,13 +1,14 @@
 from byteplus.media.protocol import User, Content, UserEvent
 
+from example.common.message_template import MessageTemplate
+
 
 def mock_users(count: int) -> list:
-    users = [None] * count
-    for i in range(count):
-        user: User = mock_user()
-        user.user_id = user.user_id + str(i)
-        users[i] = user
-    return users
+    # Copy the shared fields from one prototype, rather than building
+    # the nested sub-messages of every item field by field
+    prototype: User = mock_user()
+    ids = [prototype.user_id + str(i) for i in range(count)]
+    return MessageTemplate(prototype).build_column("user_id", ids)
 
 
 def mock_user() -> User:
@@ -36,12 +37,9 @@ def mock_user() -> User:
 
 
 def mock_contents(count: int) -> list:
-    contents = [None] * count
-    for i in range(count):
-        content: Content = mock_content()
-        content.content_id = content.content_id + str(i)
-        contents[i] = content
-    return contents
+    prototype: Content = mock_content()
+    ids = [prototype.content_id + str(i) for i in range(count)]
+    return MessageTemplate(prototype).build_column("content_id", ids)
 
 
 def mock_content() -> Content:
@@ -94,11 +92,8 @@ def mock_content() -> Content:
 
 
 def mock_user_events(count: int) -> list:
-    user_events = [None] * count
-    for i in range(count):
-        user_event: UserEvent = mock_user_event()
-        user_events[i] = user_event
-    return user_events
+    template = MessageTemplate(mock_user_event())
+    return [template.build() for _ in range(count)]
 
 
 def mock_user_event() -> UserEvent:
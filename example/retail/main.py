@@ -2,8 +2,9 @@ import logging
 import os
 import time
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 from signal import SIGKILL
+from typing import Optional
 
 from google.protobuf.message import Message
 
@@ -16,12 +17,26 @@ from byteplus.retail.protocol import WriteUsersRequest, WriteProductsRequest, Wr
     PredictRequest, AckServerImpressionsRequest, ImportUsersRequest, ImportProductsRequest, \
     ImportUserEventsRequest, ImportUsersResponse, ImportProductsResponse, ImportUserEventsResponse
 
-from example.retail.concurrent_helper import ConcurrentHelper
+from example.retail.concurrent_helper import ConcurrentHelper, helper_log
 from example.retail.mock_helper import mock_users, mock_products, mock_user_events, mock_product, mock_device
+from example.common.connection_pool import PoolConfig, PooledTransport, install_pooled_transport, \
+    pool_size_for_workers
+from example.common.date_partitioner import PartitionedUpload, partition_by_date
+from example.common.dead_letter import DeadLetterStore
+from example.common.deadline import Deadline
+from example.common.dedup_helper import DedupFilter
 from example.common.request_helper import RequestHelper
+from example.common.retry_policy import RetryBudget
 from example.common.status_helper import is_upload_success, is_success
+from example.common.tracing import LoggingExporter, Tracer, get_tracer, set_tracer
 from example.common.example import get_operation_example as do_get_operation
 from example.common.example import list_operations_example as do_list_operations
+from example.common.import_report import ImportReport
+from example.common.log_helper import Truncated
+from example.common.operation_helper import get_operations, iter_operations_by_date
+from example.common.operation_ledger import OperationLedger, recover as do_recover_operations
+from example.common.operation_registry import ResponseRegistry
+from example.common.warm_up import client_hosts, warm_up as do_warm_up
 
 log = logging.getLogger(__name__)
 
@@ -80,14 +95,42 @@ client: Client = ClientBuilder() \
     .region(Region.SG) \
     .build()
 
-request_helper: RequestHelper = RequestHelper(client)
+# The retries of every call are limited to 10% of its requests, so that the
+# retries don't multiply the traffic when the server is partially unavailable
+request_helper: RequestHelper = RequestHelper(client, retry_budget=RetryBudget(ratio=0.1))
+
+# Record the names of submitted import operations, so that the unfinished
+# or lost ones can be recovered after restarting, see "recover_operations_example".
+# They are built when first used, importing this module doesn't create the sqlite file.
+_operation_ledger: Optional[OperationLedger] = None
+
+_import_request_helper: Optional[RequestHelper] = None
 
 concurrent_helper: ConcurrentHelper = ConcurrentHelper(client)
 
+# Keep the connections alive and reuse them among the workers of concurrent_helper,
+# rather than re-handshaking for every request.
+pooled_transport: PooledTransport = install_pooled_transport(
+    PoolConfig(pool_size=pool_size_for_workers(concurrent_helper.max_workers),
+               prewarm_connections=concurrent_helper.max_workers))
+
+# Drop the products whose content is unchanged since last written in one day.
+# Set "persist_path" to keep the fingerprints across restarts.
+product_dedup_filter: DedupFilter = DedupFilter("product_id", timedelta(days=1))
+
+# Resolve the type url of operation response to the response class of retail
+operation_registry: ResponseRegistry = ResponseRegistry.of_protocol("byteplus.retail.protocol")
+
+# Aggregate the results of imports, keeping the counters and a few error samples
+import_report: ImportReport = ImportReport()
+
 DEFAULT_RETRY_TIMES = 2
 
 DEFAULT_WRITE_TIMEOUT = timedelta(milliseconds=800)
 
+# The max time of a write, including all its retries and waits
+DEFAULT_WRITE_DEADLINE = timedelta(seconds=2)
+
 DEFAULT_IMPORT_TIMEOUT = timedelta(milliseconds=800)
 
 DEFAULT_PREDICT_TIMEOUT = timedelta(milliseconds=800)
@@ -99,10 +142,15 @@ logging.basicConfig(level=logging.NOTSET)
 
 
 def main():
+    # Pay the cold-start cost before the real requests
+    warm_up()
+
     # Write real-time user data
     write_users_example()
     # Write real-time user data concurrently
     concurrent_write_users_example()
+    # Write real-time user data concurrently, keep the permanently failed requests for replaying
+    dead_letter_example()
     # Import daily offline user data
     import_users_example()
     # Import daily offline user data concurrently
@@ -116,6 +164,8 @@ def main():
     import_products_example()
     # Concurrent import daily offline product data
     concurrent_import_products_example()
+    # Write real-time product data, skip the unchanged products
+    dedup_write_products_example()
 
     # Write real-time user event data
     write_user_events_example()
@@ -125,11 +175,15 @@ def main():
     import_user_events_example()
     # Concurrent import daily offline user event data
     concurrent_import_user_events_example()
+    # Import the user events of many days, grouped by event date
+    partitioned_import_user_events_example()
 
     # Obtain Operation information according to operationName,
     # if the corresponding task is executing, the real-time
     # result of task execution will be returned
     get_operation_example()
+    # Obtain the Operations of many names concurrently
+    get_operations_example()
 
     # Lists operations that match the specified filter in the request.
     # It can be used to retrieve the task when losing 'operation.name',
@@ -138,21 +192,47 @@ def main():
     # The result of "listOperations" is not real-time.
     # The real-time info should be obtained through "getOperation"
     list_operations_example()
+    # Iterate all pages of operations in a date range
+    iter_operations_example()
+    # Save the totals and error samples of imports
+    import_report_example()
+    # Poll the recorded operations which are not known to be done, and resubmit the lost ones
+    recover_operations_example()
 
     # Get recommendation results
     recommend_example()
+    # Log the spans of attempts, overload waits and polls
+    tracing_example()
 
     time.sleep(3)
+    # The successes of concurrent_helper are counted rather than logged one by one,
+    # log the counters and the recent failures
+    helper_log.log_summary()
+    helper_log.dump_failures()
     client.release()
     os.kill(os.getpid(), SIGKILL)
 
 
+def warm_up():
+    # Resolve and ping the hosts, open pooled connections and send a canary request.
+    # The returned hosts are sorted by latency, which can be set by "ClientBuilder.hosts".
+    hosts, scheme = client_hosts(client)
+    do_warm_up(hosts, pooled_transport, scheme, canary=_predict_canary)
+
+
+def _predict_canary():
+    client.predict(_build_predict_request(), "home", *_default_opts(DEFAULT_PREDICT_TIMEOUT))
+
+
 def write_users_example():
     # The "WriteXXX" api can transfer max to 2000 items at one request
     request = _build_write_user_request(1)
     opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
     try:
-        response = request_helper.do_with_retry(client.write_users, request, opts, DEFAULT_RETRY_TIMES)
+        # The write including retries finishes in DEFAULT_WRITE_DEADLINE,
+        # every retry only waits for the remaining time
+        response = request_helper.do_write(client.write_users, request, opts, DEFAULT_RETRY_TIMES,
+                                           deadline=Deadline.after(DEFAULT_WRITE_DEADLINE))
     except BizException as e:
         log.error("write user occur err, msg:%s", e)
         return
@@ -171,6 +251,17 @@ def concurrent_write_users_example():
     return
 
 
+def dead_letter_example():
+    # Keep the permanently failed requests in local directory, which can be replayed by
+    # "python3 -m example.common.dead_letter --industry retail --dir ./dead_letter --tenant <TENANT> ..."
+    dead_letter_helper = ConcurrentHelper(client, DeadLetterStore("./dead_letter", TENANT))
+    request = _build_write_user_request(1)
+    opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
+    dead_letter_helper.submit_request(request, *opts)
+    dead_letter_helper.wait_and_shutdown()
+    return
+
+
 def _build_write_user_request(count: int) -> WriteUsersRequest:
     request = WriteUsersRequest()
     request.users.extend(mock_users(count))
@@ -185,7 +276,8 @@ def import_users_example():
     response: ImportUsersResponse = ImportUsersResponse()
     opts: tuple = _default_opts(DEFAULT_IMPORT_TIMEOUT)
     try:
-        request_helper.do_import(client.import_users, request, response, opts, DEFAULT_RETRY_TIMES)
+        import_request_helper().do_import(client.import_users, request, response, opts, DEFAULT_RETRY_TIMES)
+        import_report.add(response)
     except BizException as e:
         log.error("import user occur err, msg:%s", str(e))
         return
@@ -221,7 +313,7 @@ def write_products_example():
     request = _build_write_product_request(1)
     opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
     try:
-        response = request_helper.do_with_retry(client.write_products, request, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(client.write_products, request, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write product occur err, msg:%s", e)
         return
@@ -240,6 +332,28 @@ def concurrent_write_products_example():
     return
 
 
+def dedup_write_products_example():
+    products = product_dedup_filter.filter(mock_products(10))
+    if len(products) == 0:
+        log.info("write product skipped, all products are unchanged")
+        return
+    request = WriteProductsRequest()
+    request.products.extend(products)
+    opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
+    try:
+        response = request_helper.do_write(client.write_products, request, opts, DEFAULT_RETRY_TIMES)
+    except BizException as e:
+        log.error("write product occur err, msg:%s", e)
+        return
+    if is_upload_success(response.status):
+        # Only the written products can be dropped next time
+        product_dedup_filter.mark_written(products)
+        log.info("write product success")
+        return
+    log.error("write product find fail, msg:%s errItems:%s", response.status, response.errors)
+    return
+
+
 def _build_write_product_request(count: int) -> WriteProductsRequest:
     request = WriteProductsRequest()
     request.products.extend(mock_products(count))
@@ -254,7 +368,8 @@ def import_products_example():
     response: ImportProductsResponse = ImportProductsResponse()
     opts: tuple = _default_opts(DEFAULT_IMPORT_TIMEOUT)
     try:
-        request_helper.do_import(client.import_products, request, response, opts, DEFAULT_RETRY_TIMES)
+        import_request_helper().do_import(client.import_products, request, response, opts, DEFAULT_RETRY_TIMES)
+        import_report.add(response)
     except BizException as e:
         log.error("import product occur err, msg:%s", str(e))
         return
@@ -291,7 +406,7 @@ def write_user_events_example():
     request = _build_write_user_event_request(1)
     opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
     try:
-        response = request_helper.do_with_retry(client.write_user_events, request, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(client.write_user_events, request, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write user_event occur err, msg:%s", e)
         return
@@ -325,7 +440,8 @@ def import_user_events_example():
     response: ImportUserEventsResponse = ImportUserEventsResponse()
     opts: tuple = _default_opts(DEFAULT_IMPORT_TIMEOUT)
     try:
-        request_helper.do_import(client.import_user_events, request, response, opts, DEFAULT_RETRY_TIMES)
+        import_request_helper().do_import(client.import_user_events, request, response, opts, DEFAULT_RETRY_TIMES)
+        import_report.add(response)
     except BizException as e:
         log.error("import user_event occur err, msg:%s", str(e))
         return
@@ -345,15 +461,38 @@ def concurrent_import_user_events_example():
     return
 
 
+def partitioned_import_user_events_example():
+    # The events of backfill may belong to many days, so they are
+    # grouped by event date and every day has its own "date_config"
+    partitions = partition_by_date(mock_user_events(30), lambda user_event: user_event.event_timestamp)
+
+    def upload(date: datetime, user_events: list, is_end: bool) -> bool:
+        request = _build_import_user_events_request_of(user_events, date, is_end)
+        response = ImportUserEventsResponse()
+        opts = _default_opts(DEFAULT_IMPORT_TIMEOUT)
+        import_request_helper().do_import(client.import_user_events, request, response, opts, DEFAULT_RETRY_TIMES)
+        import_report.add(response, date=date.strftime("%Y-%m-%d"))
+        return is_success(response.status)
+
+    # The last request of a date carries "is_end", which is sent after the others of the date succeed
+    upload_task = PartitionedUpload(upload, max_workers=concurrent_helper.max_workers)
+    finished_dates, failed_dates = upload_task.run(partitions)
+    log.info("partitioned import user_event finish, finished:%s failed:%s", finished_dates, failed_dates)
+
+
 def _build_import_user_events_request(count: int) -> ImportUserEventsRequest:
+    return _build_import_user_events_request_of(mock_user_events(count), datetime.now(), False)
+
+
+def _build_import_user_events_request_of(user_events: list, date: datetime, is_end: bool) -> ImportUserEventsRequest:
     request: ImportUserEventsRequest = ImportUserEventsRequest()
     input_config = request.input_config
     inline_source = input_config.user_events_inline_source
-    inline_source.user_events.extend(mock_user_events(count))
+    inline_source.user_events.extend(user_events)
     date_config = request.date_config
     # format time by RFC3339
-    date_config.date = rfc3339_format(datetime.now())
-    date_config.is_end = False
+    date_config.date = rfc3339_format(date)
+    date_config.is_end = is_end
     return request
 
 
@@ -362,46 +501,118 @@ def get_operation_example():
     do_get_operation(client, name)
 
 
+def get_operations_example():
+    names = ["750eca88-5165-4aae-851f-a93b75a27b03", "0c5a1145-2c12-4b83-8998-2ae8a5e9a4e6"]
+    # The results are returned as soon as every request finishes
+    for name, response, error in get_operations(client, names):
+        if error is not None:
+            log.error("get operation occur error, name:%s msg:%s", name, error)
+            continue
+        if is_success(response.status):
+            log.info("get operation success rsp:\n%s", response)
+            continue
+        log.error("get operation find failure info, rsp:\n%s", response)
+
+
 def list_operations_example():
     filter_query = "date>=2021-06-15 and worksOn=ImportUsers and done=true"
     operations = do_list_operations(client, filter_query)
     _parse_task_response(operations)
 
 
-def _parse_task_response(operations: list):
-    if operations is None or len(operations) == 0:
+def iter_operations_example():
+    # Iterate the operations of all pages, the days are fetched
+    # concurrently and the next page of every day is prefetched
+    operations = iter_operations_by_date(client, date(2021, 6, 15), date(2021, 6, 21),
+                                         "worksOn=ImportUsers and done=true")
+    try:
+        _parse_task_response(operations)
+    except BizException as e:
+        log.error("[ListOperations] iterate operations occur err, msg:%s", e)
+
+
+def _parse_task_response(operations):
+    if operations is None:
         return
     for operation in operations:
         if not operation.done:
             continue
-        response_any = operation.response
-        type_url = response_any.type_url
+        response = operation_registry.decode(operation)
+        if response is None:
+            log.error("[ListOperations] unexpected task response type:%s", operation.response.type_url)
+            continue
         try:
-            if "ImportUsers" in type_url:
-                response: Message = ImportUsersResponse()
-                response.ParseFromString(response_any.value)
-                log.info("[ListOperations] ImportUsers rsp:\n%s", response)
-            elif "ImportProducts" in type_url:
-                response: Message = ImportProductsResponse()
-                response.ParseFromString(response_any.value)
-                log.info("[ListOperations] ImportProducts rsp:\n%s", response)
-            elif "ImportUserEvents" in type_url:
-                response: Message = ImportUserEventsResponse()
-                response.ParseFromString(response_any.value)
-                log.info("[ListOperations] ImportUserEvents rsp:\n%s", response)
-            else:
-                log.error("[ListOperations] unexpected task response type:%s", type_url)
+            # The response is parsed here, when its status is accessed, the whole
+            # message is rendered only if the debug level is enabled
+            log.info("[ListOperations] %s status:%s", response.type_name, response.status.code)
+            log.debug("[ListOperations] %s rsp:\n%s", response.type_name, Truncated(response))
+            import_report.add(response)
         except BaseException as e:
             log.error("[ListOperations] parse task response fail, msg:%s", e)
     return
 
 
+def import_report_example():
+    # The totals of the imports and listed operations above, per entity type and date
+    import_report.save_json("import_report.json")
+    import_report.save_csv("import_report.csv")
+    log.info("import report totals:%s", import_report.to_dict()["totals"])
+
+
+def operation_ledger() -> OperationLedger:
+    global _operation_ledger
+    if _operation_ledger is None:
+        _operation_ledger = OperationLedger("operations.db")
+    return _operation_ledger
+
+
+# The RequestHelper of imports, which records the operations in the ledger
+def import_request_helper() -> RequestHelper:
+    global _import_request_helper
+    if _import_request_helper is None:
+        _import_request_helper = RequestHelper(client, operation_ledger(), retry_budget=RetryBudget(ratio=0.1))
+    return _import_request_helper
+
+
+def recover_operations_example():
+    # The lost imports are submitted again with the recorded requests
+    calls = {
+        "import_users": (client.import_users, ImportUsersRequest),
+        "import_products": (client.import_products, ImportProductsRequest),
+        "import_user_events": (client.import_user_events, ImportUserEventsRequest),
+    }
+    filter_query = "date>=2021-06-15 and done=true"
+    counts = do_recover_operations(operation_ledger(), client, import_request_helper(), calls, filter_query)
+    log.info("recover operations, states:%s", counts)
+
+
+def tracing_example():
+    # Trace the requests of request_helper and concurrent_helper, the spans
+    # of attempts, overload waits and polls are logged with the tenant
+    previous_tracer = get_tracer()
+    set_tracer(Tracer(LoggingExporter(), {"tenant": TENANT}))
+    try:
+        write_users_example()
+        import_users_example()
+    finally:
+        set_tracer(previous_tracer)
+
+
 def recommend_example():
+    # The predict and the ack submitted to concurrent_helper are in the same trace
+    with get_tracer().start_span("recommend", {"scene": "home"}):
+        _recommend()
+
+
+def _recommend():
+    # The predict including building its request finishes in DEFAULT_PREDICT_TIMEOUT
+    deadline = Deadline.after(DEFAULT_PREDICT_TIMEOUT)
     predict_request = _build_predict_request()
-    predict_opts = _default_opts(DEFAULT_PREDICT_TIMEOUT)
     try:
+        predict_opts = deadline.bound_opts(_default_opts(DEFAULT_PREDICT_TIMEOUT))
         # The "home" is scene name, which provided by ByteDance, usually is "home"
-        predict_response = client.predict(predict_request, "home", *predict_opts)
+        with get_tracer().start_span("predict", {"scene": "home"}):
+            predict_response = client.predict(predict_request, "home", *predict_opts)
     except (NetException, BizException) as e:
         log.error("predict occur error, msg:%s", e)
         return
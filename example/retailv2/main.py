@@ -17,8 +17,12 @@ from byteplus.retailv2.protocol import WriteUsersRequest, WriteProductsRequest,
 
 from example.retailv2.concurrent_helper import ConcurrentHelper
 from example.retailv2.mock_helper import mock_users, mock_products, mock_user_events, mock_product, mock_device
+from example.common.connection_pool import PoolConfig, PooledTransport, install_pooled_transport, \
+    pool_size_for_workers
+from example.common.deadline import Deadline
 from example.common.request_helper import RequestHelper
 from example.common.status_helper import is_upload_success, is_success
+from example.common.warm_up import client_hosts, warm_up as do_warm_up
 
 log = logging.getLogger(__name__)
 
@@ -82,6 +86,12 @@ request_helper: RequestHelper = RequestHelper(client)
 
 concurrent_helper: ConcurrentHelper = ConcurrentHelper(client)
 
+# Keep the connections alive and reuse them among the workers of concurrent_helper,
+# rather than re-handshaking for every request.
+pooled_transport: PooledTransport = install_pooled_transport(
+    PoolConfig(pool_size=pool_size_for_workers(concurrent_helper.max_workers),
+               prewarm_connections=concurrent_helper.max_workers))
+
 DEFAULT_RETRY_TIMES = 2
 
 DEFAULT_WRITE_TIMEOUT = timedelta(milliseconds=800)
@@ -97,6 +107,9 @@ logging.basicConfig(level=logging.NOTSET)
 
 
 def main():
+    # Pay the cold-start cost before the real requests
+    warm_up()
+
     # Write real-time user data
     write_users_example()
     # Write real-time user data concurrently
@@ -123,12 +136,23 @@ def main():
     os.kill(os.getpid(), SIGKILL)
 
 
+def warm_up():
+    # Resolve and ping the hosts, open pooled connections and send a canary request.
+    # The returned hosts are sorted by latency, which can be set by "ClientBuilder.hosts".
+    hosts, scheme = client_hosts(client)
+    do_warm_up(hosts, pooled_transport, scheme, canary=_predict_canary)
+
+
+def _predict_canary():
+    client.predict(_build_predict_request(), "home", *_default_opts(DEFAULT_PREDICT_TIMEOUT))
+
+
 def write_users_example():
     # The "WriteXXX" api can transfer max to 2000 items at one request
     request = _build_write_user_request(1)
     opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
     try:
-        response = request_helper.do_with_retry(client.write_users, request, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(client.write_users, request, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write user occur err, msg:%s", e)
         return
@@ -160,7 +184,7 @@ def write_products_example():
     request = _build_write_product_request(1)
     opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
     try:
-        response = request_helper.do_with_retry(client.write_products, request, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(client.write_products, request, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write product occur err, msg:%s", e)
         return
@@ -192,7 +216,7 @@ def write_user_events_example():
     request = _build_write_user_event_request(1)
     opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
     try:
-        response = request_helper.do_with_retry(client.write_user_events, request, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(client.write_user_events, request, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write user_event occur err, msg:%s", e)
         return
@@ -244,9 +268,11 @@ def done_example():
 
 
 def recommend_example():
+    # The predict including building its request finishes in DEFAULT_PREDICT_TIMEOUT
+    deadline = Deadline.after(DEFAULT_PREDICT_TIMEOUT)
     predict_request = _build_predict_request()
-    predict_opts = _default_opts(DEFAULT_PREDICT_TIMEOUT)
     try:
+        predict_opts = deadline.bound_opts(_default_opts(DEFAULT_PREDICT_TIMEOUT))
         # The "home" is scene name, which provided by ByteDance, usually is "home"
         predict_response = client.predict(predict_request, "home", *predict_opts)
     except (NetException, BizException) as e:
@@ -2,14 +2,15 @@ import time
 
 from byteplus.retailv2.protocol import *
 
+from example.common.message_template import MessageTemplate
+
 
 def mock_users(count: int) -> list:
-    users = [None] * count
-    for i in range(count):
-        user: User = mock_user()
-        user.user_id = user.user_id + str(i)
-        users[i] = user
-    return users
+    # Copy the shared fields from one prototype, rather than building
+    # the nested sub-messages of every item field by field
+    prototype: User = mock_user()
+    ids = [prototype.user_id + str(i) for i in range(count)]
+    return MessageTemplate(prototype).build_column("user_id", ids)
 
 
 def mock_user() -> User:
@@ -35,6 +36,8 @@ def mock_user() -> User:
 
 
 def mock_products(count: int) -> list:
+    # Built field by field, copying a prototype of many repeated and nested
+    # fields is no faster, see "python3 -m example.benchmark.message_build_bench"
     products = [None] * count
     for i in range(count):
         product: Product = mock_product()
@@ -96,11 +99,8 @@ def mock_product() -> Product:
 
 
 def mock_user_events(count: int) -> list:
-    user_events = [None] * count
-    for i in range(count):
-        user_event: UserEvent = mock_user_event()
-        user_events[i] = user_event
-    return user_events
+    template = MessageTemplate(mock_user_event())
+    return [template.build() for _ in range(count)]
 
 
 def mock_user_event() -> UserEvent:
@@ -14,8 +14,11 @@ from byteplus.rutenad.protocol import WriteUsersRequest, WriteProductsRequest, W
 
 from example.rutenad.concurrent_helper import ConcurrentHelper
 from example.rutenad.mock_helper import mock_users, mock_products, mock_user_events, mock_advertisements
+from example.common.connection_pool import PoolConfig, PooledTransport, install_pooled_transport, \
+    pool_size_for_workers
 from example.common.request_helper import RequestHelper
 from example.common.status_helper import is_upload_success
+from example.common.warm_up import client_hosts, warm_up as do_warm_up
 
 log = logging.getLogger(__name__)
 
@@ -78,6 +81,12 @@ request_helper: RequestHelper = RequestHelper(client)
 
 concurrent_helper: ConcurrentHelper = ConcurrentHelper(client)
 
+# Keep the connections alive and reuse them among the workers of concurrent_helper,
+# rather than re-handshaking for every request.
+pooled_transport: PooledTransport = install_pooled_transport(
+    PoolConfig(pool_size=pool_size_for_workers(concurrent_helper.max_workers),
+               prewarm_connections=concurrent_helper.max_workers))
+
 DEFAULT_RETRY_TIMES = 2
 
 DEFAULT_WRITE_TIMEOUT = timedelta(milliseconds=800)
@@ -93,6 +102,9 @@ logging.basicConfig(level=logging.NOTSET)
 
 
 def main():
+    # Pay the cold-start cost before the real requests
+    warm_up()
+
     # Write real-time user data
     write_users_example()
     # Write real-time user data concurrently
@@ -118,12 +130,19 @@ def main():
     os.kill(os.getpid(), SIGKILL)
 
 
+def warm_up():
+    # Resolve and ping the hosts, open pooled connections and send a canary request.
+    # The returned hosts are sorted by latency, which can be set by "ClientBuilder.hosts".
+    hosts, scheme = client_hosts(client)
+    do_warm_up(hosts, pooled_transport, scheme, canary=None)
+
+
 def write_users_example():
     # The "WriteXXX" api can transfer max to 2000 items at one request
     request = _build_write_user_request(1)
     opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
     try:
-        response = request_helper.do_with_retry(client.write_users, request, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(client.write_users, request, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write user occur err, msg:%s", e)
         return
@@ -155,7 +174,7 @@ def write_products_example():
     request = _build_write_product_request(1)
     opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
     try:
-        response = request_helper.do_with_retry(client.write_products, request, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(client.write_products, request, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write product occur err, msg:%s", e)
         return
@@ -187,7 +206,7 @@ def write_user_events_example():
     request = _build_write_user_event_request(1)
     opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
     try:
-        response = request_helper.do_with_retry(client.write_user_events, request, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(client.write_user_events, request, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write user_event occur err, msg:%s", e)
         return
@@ -220,7 +239,7 @@ def write_advertisements_example():
     request = _build_write_advertisements_request(1)
     opts = _default_opts(DEFAULT_WRITE_TIMEOUT)
     try:
-        response = request_helper.do_with_retry(client.write_advertisements, request, opts, DEFAULT_RETRY_TIMES)
+        response = request_helper.do_write(client.write_advertisements, request, opts, DEFAULT_RETRY_TIMES)
     except BizException as e:
         log.error("write advertisements occur err, msg:%s", e)
         return
@@ -0,0 +1,34 @@
+import unittest
+
+import numpy
+
+from byteplus.retail.protocol import Product
+
+from example.common.columnar_converter import to_dict_batches, to_message_batches
+
+
+class ColumnarConverterTest(unittest.TestCase):
+
+    def test_dict_batches_omit_nan(self):
+        table = {
+            "id": ["1", "2", "3"],
+            "price": numpy.array([1.5, numpy.nan, 2.5]),
+            "score": [float("nan"), 0.5, None],
+        }
+        batches = list(to_dict_batches(table, batch_size=2))
+        self.assertEqual([[{"id": "1", "price": 1.5}, {"id": "2", "score": 0.5}], [{"id": "3", "price": 2.5}]],
+                         batches)
+
+    def test_message_batches_skip_nan(self):
+        table = {
+            "product_id": ["p1", "p2"],
+            "quality_score": numpy.array([numpy.nan, 0.5]),
+        }
+        field_map = {"product_id": "product_id", "quality_score": "quality_score"}
+        products = next(to_message_batches(table, Product, field_map))
+        self.assertEqual(0.0, products[0].quality_score)
+        self.assertEqual(0.5, products[1].quality_score)
+
+
+if __name__ == "__main__":
+    unittest.main()
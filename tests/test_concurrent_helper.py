@@ -0,0 +1,148 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from byteplus.core import STATUS_CODE_SUCCESS, BizException
+from byteplus.general.protocol import WriteResponse
+from byteplus.retail.protocol import AckServerImpressionsRequest, AckServerImpressionsResponse, \
+    WriteProductsRequest, WriteProductsResponse, WriteUsersRequest, WriteUsersResponse
+
+from example.common.dead_letter import DeadLetterStore
+from example.general.concurrent_helper import ConcurrentHelper as GeneralConcurrentHelper
+from example.retail.concurrent_helper import ConcurrentHelper as RetailConcurrentHelper
+
+_SERVER_ERROR_CODE = 500
+
+_TIMEOUT_SECONDS = 5
+
+
+# Record the requests of the methods registered by the retail helper,
+# "write_users" waits for "released" before responding
+class _FakeRetailClient(object):
+
+    def __init__(self):
+        self.calls = []
+        self.released = threading.Event()
+        self.released.set()
+
+    def write_users(self, request, *opts):
+        self.released.wait(_TIMEOUT_SECONDS)
+        self.calls.append(("write_users", request))
+        return _response(WriteUsersResponse, STATUS_CODE_SUCCESS)
+
+    def write_products(self, request, *opts):
+        self.calls.append(("write_products", request))
+        return _response(WriteProductsResponse, STATUS_CODE_SUCCESS)
+
+    def write_user_events(self, request, *opts):
+        raise NotImplementedError
+
+    def import_users(self, request, *opts):
+        raise NotImplementedError
+
+    def import_products(self, request, *opts):
+        raise NotImplementedError
+
+    def import_user_events(self, request, *opts):
+        raise NotImplementedError
+
+    def ack_server_impressions(self, request, *opts):
+        self.calls.append(("ack_server_impressions", request))
+        return _response(AckServerImpressionsResponse, _SERVER_ERROR_CODE)
+
+
+class _FakeGeneralClient(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def write_data(self, data_list, topic, *opts):
+        self.calls.append(("write_data", data_list, topic))
+        return _response(WriteResponse, STATUS_CODE_SUCCESS)
+
+    def import_data(self, data_list, topic, *opts):
+        raise NotImplementedError
+
+    def done(self, date_list, topic, *opts):
+        raise NotImplementedError
+
+    def callback(self, request, *opts):
+        raise NotImplementedError
+
+
+def _response(response_class, code: int):
+    response = response_class()
+    response.status.code = code
+    return response
+
+
+class ConcurrentHelperTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.store = DeadLetterStore(os.path.join(self._dir.name, "dead_letter"))
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_route_by_request_type(self):
+        client = _FakeRetailClient()
+        helper = RetailConcurrentHelper(client)
+        users, products = WriteUsersRequest(), WriteProductsRequest()
+        helper.submit_request(users).result(_TIMEOUT_SECONDS)
+        helper.submit_request(products).result(_TIMEOUT_SECONDS)
+        helper.wait_and_shutdown()
+        self.assertEqual([("write_users", users), ("write_products", products)], client.calls)
+        with self.assertRaises(BizException):
+            helper.submit_request(AckServerImpressionsResponse())
+
+    def test_route_by_call_name(self):
+        client = _FakeGeneralClient()
+        helper = GeneralConcurrentHelper(client)
+        helper.submit_write_request([{"id": "1"}], "user").result(_TIMEOUT_SECONDS)
+        helper.wait_and_shutdown()
+        self.assertEqual([("write_data", [{"id": "1"}], "user")], client.calls)
+
+    def test_missing_method_fails_registration(self):
+        client = _FakeGeneralClient()
+        client.import_data = None
+        with self.assertRaises(ValueError):
+            GeneralConcurrentHelper(client)
+
+    def test_max_pending_blocks_submitting(self):
+        client = _FakeRetailClient()
+        client.released.clear()
+        helper = RetailConcurrentHelper(client, max_workers=1, max_pending=1)
+        helper.submit_request(WriteUsersRequest())
+        submitted = threading.Event()
+
+        def submit():
+            helper.submit_request(WriteProductsRequest())
+            submitted.set()
+
+        thread = threading.Thread(target=submit)
+        thread.start()
+        # Blocked until the pending write finishes
+        self.assertFalse(submitted.wait(0.2))
+        client.released.set()
+        self.assertTrue(submitted.wait(_TIMEOUT_SECONDS))
+        thread.join()
+        helper.wait_and_shutdown()
+        self.assertEqual(["write_users", "write_products"], [call for call, _ in client.calls])
+
+    def test_failed_request_dead_lettered(self):
+        client = _FakeRetailClient()
+        helper = RetailConcurrentHelper(client, self.store)
+        request = AckServerImpressionsRequest()
+        request.scene.scene_name = "home"
+        helper.submit_request(request).result(_TIMEOUT_SECONDS)
+        helper.wait_and_shutdown()
+        records = list(self.store.scan())
+        self.assertEqual(1, len(records))
+        self.assertEqual("ack_server_impressions", records[0].call)
+        self.assertEqual(request, records[0].payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import datetime
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from byteplus.core import STATUS_CODE_SUCCESS
+from byteplus.common.protocol import DoneResponse
+from byteplus.general.protocol import WriteResponse
+
+from example.common.checkpoint import Checkpoint
+from example.common.daily_sync import DailySync
+from example.common.request_helper import RequestHelper
+
+_PARTIAL_FAILURE_CODE = 1206
+
+_START = datetime.datetime(2021, 11, 1)
+
+_END = datetime.datetime(2021, 11, 2)
+
+
+class _FakeTopicApi(object):
+
+    # @param invalid_ids the ids of data failing permanently
+    # @param broken_ids  the ids of data raising exception
+    def __init__(self, invalid_ids=(), broken_ids=()):
+        self.invalid_ids = set(invalid_ids)
+        self.broken_ids = set(broken_ids)
+        self.lock = threading.Lock()
+        self.written = []
+        self.done_dates = []
+
+    def write(self, data_list: list, topic: str, *opts) -> WriteResponse:
+        if any(data["id"] in self.broken_ids for data in data_list):
+            raise RuntimeError("broken chunk")
+        with self.lock:
+            self.written.extend(data["id"] for data in data_list)
+        response = WriteResponse()
+        response.status.code = STATUS_CODE_SUCCESS
+        for data in data_list:
+            if data["id"] in self.invalid_ids:
+                response.status.code = _PARTIAL_FAILURE_CODE
+                error = response.errors.add()
+                error.message = "invalid event_timestamp"
+                error.data = json.dumps(data)
+        return response
+
+    def done(self, date_list: list, topic: str, *opts) -> DoneResponse:
+        self.done_dates.extend(date_list)
+        response = DoneResponse()
+        response.status.code = STATUS_CODE_SUCCESS
+        return response
+
+
+def _source(topic: str, date: datetime.datetime):
+    # 2 chunks every date, such as "1101-0" and "1101-1"
+    for index in range(2):
+        yield [{"id": "%s-%d" % (date.strftime("%m%d"), index)}]
+
+
+class DailySyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self._dir.name, "daily_sync.json")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _sync(self, api: _FakeTopicApi, on_permanent_failure=None) -> DailySync:
+        return DailySync(RequestHelper(None), api.write, api.done, lambda date: (), lambda: (),
+                         self.checkpoint_path, max_workers=2, on_permanent_failure=on_permanent_failure)
+
+    def test_resume_without_resending_acked_chunks(self):
+        api = _FakeTopicApi(broken_ids={"1102-1"})
+        done_keys, failed_keys = self._sync(api).run(["user"], _START, _END, _source)
+        self.assertEqual(["user|20211101"], done_keys)
+        self.assertEqual(["user|20211102"], failed_keys)
+
+        api = _FakeTopicApi()
+        done_keys, failed_keys = self._sync(api).run(["user"], _START, _END, _source)
+        self.assertEqual(["user|20211102"], done_keys)
+        self.assertEqual([], failed_keys)
+        self.assertEqual(["1102-1"], api.written)
+        self.assertEqual([_END], api.done_dates)
+
+    def test_permanent_failures_are_acked(self):
+        api = _FakeTopicApi(invalid_ids={"1101-0"})
+        failures = []
+        done_keys, failed_keys = self._sync(api, lambda call, items: failures.extend(items)).run(
+            ["user"], _START, _START, _source)
+        self.assertEqual((["user|20211101"], []), (done_keys, failed_keys))
+        self.assertEqual([{"id": "1101-0"}], [item for item, _ in failures])
+
+
+class CheckpointJournalTest(unittest.TestCase):
+
+    def test_journal_cleared_by_save(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = Checkpoint(os.path.join(directory, "checkpoint.json"))
+            checkpoint.append({"key": "user|20211101", "index": 0})
+            checkpoint.append({"key": "user|20211101", "index": 1})
+            # A line torn by crash
+            with open(checkpoint.path + ".journal", "a", encoding="utf-8") as f:
+                f.write('{"key": "us')
+            self.assertEqual([0, 1], [record["index"] for record in checkpoint.journal()])
+            checkpoint.save({"acked": {"user|20211101": [0, 1]}})
+            self.assertEqual([], checkpoint.journal())
+            self.assertEqual({"acked": {"user|20211101": [0, 1]}}, checkpoint.load())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import unittest
+
+from example.common.data_validator import BOOL, FLOAT, INT, JSON, STRING, STRING_LIST, DataValidator, FieldSpec
+
+
+class DataValidatorTest(unittest.TestCase):
+
+    def test_type_checks(self):
+        validator = DataValidator({"t": {
+            "s": FieldSpec(STRING),
+            "i": FieldSpec(INT),
+            "f": FieldSpec(FLOAT),
+            "b": FieldSpec(BOOL),
+            "j": FieldSpec(JSON),
+            "l": FieldSpec(STRING_LIST),
+        }})
+        good = {"s": "a", "i": 1, "f": 1, "b": False, "j": '{"k": 1}', "l": ["a"]}
+        data_list = [good, {"s": 1}, {"i": True}, {"i": 1.5}, {"f": "1.5"}, {"b": 0}, {"j": "[1]"}, {"j": "{"},
+                     {"l": ["a", 1]}]
+        accepted, report = validator.validate("t", data_list)
+        self.assertEqual([good], accepted)
+        self.assertEqual([1, 2, 3, 4, 5, 6, 7, 8], [index for index, _, _ in report.rejected])
+        self.assertEqual({"s: not string": 1, "i: not int": 2, "f: not float": 1, "b: not bool": 1,
+                          "j: not json": 2, "l: not string_list": 1}, report.summary())
+
+    def test_required_and_range(self):
+        validator = DataValidator({"t": {
+            "id": FieldSpec(STRING, required=True),
+            "count": FieldSpec(INT, min_value=0, max_value=10),
+        }})
+        data_list = [{"id": "1", "count": 10}, {"count": 1}, {"id": None}, {"id": "2", "count": -1},
+                     {"id": "3", "count": None}]
+        accepted, report = validator.validate("t", data_list)
+        self.assertEqual([data_list[0], data_list[4]], accepted)
+        self.assertEqual([(1, data_list[1], [("id", "missing")]), (2, data_list[2], [("id", "missing")]),
+                          (3, data_list[3], [("count", "out of range [0, 10]")])], report.rejected)
+
+    def test_default_schema_rejects_millisecond_timestamp(self):
+        behavior = {"user_id": "u1", "event_type": "click", "event_timestamp": 1623681767}
+        millisecond = dict(behavior, event_timestamp=1623681767000)
+        accepted, report = DataValidator().validate("behavior", [behavior, millisecond])
+        self.assertEqual([behavior], accepted)
+        self.assertEqual(1, report.rejected_count)
+
+    def test_topic_without_schema_accepted(self):
+        data_list = [{"id": 1}]
+        accepted, report = DataValidator({}).validate("t", data_list)
+        self.assertIs(data_list, accepted)
+        self.assertEqual(0, report.rejected_count)
+
+    def test_unknown_type_rejected(self):
+        with self.assertRaises(ValueError):
+            DataValidator({"t": {"id": FieldSpec("uuid")}})
+
+    def test_save_rejected(self):
+        _, report = DataValidator().validate("user", [{"user_id": 1}])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rejected.jsonl")
+            report.save(path)
+            with open(path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual([{"topic": "user", "index": 0, "problems": ["user_id: not string"],
+                           "data": {"user_id": 1}}], lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
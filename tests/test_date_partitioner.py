@@ -0,0 +1,78 @@
+import datetime
+import threading
+import unittest
+import zoneinfo
+
+from example.common.date_partitioner import PartitionedUpload, partition_by_date
+
+_NEW_YORK = zoneinfo.ZoneInfo("America/New_York")
+
+
+def _timestamp(*args) -> int:
+    return int(datetime.datetime(*args, tzinfo=_NEW_YORK).timestamp())
+
+
+class PartitionByDateTest(unittest.TestCase):
+
+    def test_dates_across_daylight_saving(self):
+        # The daylight saving of New York starts at 2021-03-14
+        events = [_timestamp(2021, 3, 10, 23, 30), _timestamp(2021, 3, 20, 23, 30), _timestamp(2021, 3, 21, 0, 10)]
+        partitions = partition_by_date(events, lambda event: event, _NEW_YORK)
+        self.assertEqual([datetime.date(2021, 3, 10), datetime.date(2021, 3, 20), datetime.date(2021, 3, 21)],
+                         [date.date() for date in partitions])
+        self.assertEqual([[events[0]], [events[1]], [events[2]]], list(partitions.values()))
+
+    def test_utc(self):
+        partitions = partition_by_date([86399, 86400, 0], lambda event: event, datetime.timezone.utc)
+        self.assertEqual({datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc): [86399, 0],
+                          datetime.datetime(1970, 1, 2, tzinfo=datetime.timezone.utc): [86400]}, partitions)
+
+
+class PartitionedUploadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        # (date, chunk, is_end) or (date, "done")
+        self.calls = []
+        self.failed_chunks = set()
+
+    def upload(self, date, chunk, is_end) -> bool:
+        with self.lock:
+            self.calls.append((date, tuple(chunk), is_end))
+        return tuple(chunk) not in self.failed_chunks
+
+    def done(self, date) -> bool:
+        with self.lock:
+            self.calls.append((date, "done"))
+        return True
+
+    def test_end_and_done_after_other_chunks(self):
+        day1, day2 = datetime.datetime(2021, 11, 1), datetime.datetime(2021, 11, 2)
+        task = PartitionedUpload(self.upload, self.done, chunk_size=2, max_workers=4)
+        finished, failed = task.run({day1: [1, 2, 3, 4, 5], day2: [6]})
+        self.assertEqual([day1, day2], finished)
+        self.assertEqual([], failed)
+        day1_calls = [call for call in self.calls if call[0] == day1]
+        self.assertEqual({(day1, (1, 2), False), (day1, (3, 4), False)}, set(day1_calls[:2]))
+        self.assertEqual([(day1, (5,), True), (day1, "done")], day1_calls[2:])
+        self.assertEqual([(day2, (6,), True), (day2, "done")], [call for call in self.calls if call[0] == day2])
+
+    def test_failed_chunk_skips_end_and_done(self):
+        day = datetime.datetime(2021, 11, 1)
+        self.failed_chunks.add((1, 2))
+        finished, failed = PartitionedUpload(self.upload, self.done, chunk_size=2).run({day: [1, 2, 3, 4, 5]})
+        self.assertEqual(([], [day]), (finished, failed))
+        self.assertNotIn((day, (5,), True), self.calls)
+        self.assertNotIn((day, "done"), self.calls)
+
+    def test_exception_is_failure(self):
+        day = datetime.datetime(2021, 11, 1)
+
+        def upload(date, chunk, is_end):
+            raise RuntimeError("broken")
+
+        self.assertEqual(([], [day]), PartitionedUpload(upload, self.done).run({day: [1]}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from byteplus.retail.protocol import WriteUsersRequest
+
+from example.common.dead_letter import DeadLetterStore
+
+_UTC = datetime.timezone.utc
+
+
+class DeadLetterStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.store = DeadLetterStore(os.path.join(self._dir.name, "dead_letter"), "retail_demo")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_payloads_decoded(self):
+        request = WriteUsersRequest()
+        request.users.add().user_id = "u1"
+        dates = [datetime.datetime(2021, 11, 1)]
+        self.store.record("write_users", request, "permanent failure")
+        self.store.record("write_data", [{"id": "1"}], "permanent failure", ("user",))
+        self.store.record("done", dates, "server overload", ("user",))
+        records = list(self.store.scan())
+        self.assertEqual([request, [{"id": "1"}], dates], [record.payload for record in records])
+        self.assertEqual([[], ["user"], ["user"]], [record.args for record in records])
+
+    def test_scan_naive_and_aware_times(self):
+        self.store.record("write_users", WriteUsersRequest(), "permanent failure")
+        now = datetime.datetime.now(_UTC)
+        # The naive times are taken as UTC
+        naive_before = (now - datetime.timedelta(minutes=1)).replace(tzinfo=None)
+        aware_after = (now + datetime.timedelta(minutes=1)).astimezone(datetime.timezone(datetime.timedelta(hours=8)))
+        self.assertEqual(1, len(list(self.store.scan(since=naive_before, until=aware_after))))
+        self.assertEqual(0, len(list(self.store.scan(since=aware_after))))
+        self.assertEqual(0, len(list(self.store.scan(until=naive_before))))
+
+    def test_replayed_records_skipped(self):
+        record_id = self.store.record("write_users", WriteUsersRequest(), "permanent failure")
+        self.store.mark_replayed(record_id)
+        self.assertEqual([], list(self.store.scan()))
+        self.assertEqual(1, len(list(self.store.scan(include_replayed=True))))
+
+
+if __name__ == '__main__':
+    unittest.main()
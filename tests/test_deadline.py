@@ -0,0 +1,35 @@
+import datetime
+import unittest
+
+from byteplus.core import BizException, Option
+
+from example.common.deadline import Deadline
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def test_bound_opts(self):
+        deadline = Deadline.after(datetime.timedelta(seconds=1))
+        opts = (Option.with_timeout(datetime.timedelta(seconds=5)),
+                Option.with_server_timeout(datetime.timedelta(seconds=4)))
+        options = Option.conv_to_options(deadline.bound_opts(opts))
+        self.assertLessEqual(options.timeout, datetime.timedelta(seconds=1))
+        self.assertLessEqual(options.server_timeout, options.timeout)
+
+    def test_bound_opts_keep_shorter_timeout(self):
+        deadline = Deadline.after(datetime.timedelta(seconds=10))
+        opts = (Option.with_timeout(datetime.timedelta(milliseconds=800)),)
+        options = Option.conv_to_options(deadline.bound_opts(opts))
+        self.assertEqual(datetime.timedelta(milliseconds=800), options.timeout)
+        self.assertIsNone(options.server_timeout)
+
+    def test_exceeded_before_sending(self):
+        deadline = Deadline.after(datetime.timedelta(milliseconds=1))
+        with self.assertRaises(BizException):
+            deadline.bound_opts((Option.with_timeout(datetime.timedelta(seconds=1)),))
+        # The waits are cut short rather than failing
+        deadline.sleep(datetime.timedelta(seconds=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
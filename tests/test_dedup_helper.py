@@ -0,0 +1,69 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from byteplus.retail.protocol import Product
+
+from example.common.dedup_helper import DedupFilter
+
+_WINDOW = datetime.timedelta(days=1)
+
+
+def _product(product_id: str, title: str) -> Product:
+    product = Product()
+    product.product_id = product_id
+    product.title = title
+    return product
+
+
+class DedupFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "dedup.idx")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_drop_unchanged_after_written(self):
+        dedup = DedupFilter("product_id", _WINDOW)
+        items = [_product("p1", "a"), _product("p2", "b")]
+        self.assertEqual(items, dedup.filter(items))
+        # Not dropped before the write succeeds
+        self.assertEqual(items, dedup.filter(items))
+        dedup.mark_written(items)
+        changed = _product("p2", "c")
+        self.assertEqual([changed], dedup.filter([_product("p1", "a"), changed]))
+
+    def test_drop_duplicates_in_batch(self):
+        dedup = DedupFilter("id", _WINDOW)
+        items = [{"id": "1", "name": "a"}, {"name": "a", "id": "1"}, {"id": "1", "name": "b"}]
+        self.assertEqual([items[0], items[2]], dedup.filter(items))
+
+    def test_reload_saved_index(self):
+        dedup = DedupFilter("product_id", _WINDOW, self.path)
+        dedup.mark_written([_product("p1", "a"), _product("p2", "b")])
+        dedup.save()
+        reloaded = DedupFilter("product_id", _WINDOW, self.path)
+        self.assertEqual(2, len(reloaded))
+        self.assertEqual([], reloaded.filter([_product("p1", "a"), _product("p2", "b")]))
+        self.assertEqual(1, len(reloaded.filter([_product("p1", "changed")])))
+
+    def test_ignore_broken_index(self):
+        with open(self.path, "wb") as f:
+            f.write(b"broken")
+        self.assertEqual(0, len(DedupFilter("product_id", _WINDOW, self.path)))
+
+    def test_expire_out_of_window(self):
+        dedup = DedupFilter("product_id", datetime.timedelta(0), self.path)
+        item = _product("p1", "a")
+        dedup.mark_written([item])
+        # Nothing is dropped out of the window
+        self.assertEqual([item], dedup.filter([item]))
+        self.assertEqual(1, dedup.expire())
+        self.assertEqual(0, len(dedup))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import types
+import unittest
+
+from byteplus.core import STATUS_CODE_SUCCESS
+from byteplus.general.protocol import WriteResponse
+
+from example.common.json_lines import encode_lines, write_json_lines
+from example.common.request_helper import RequestHelper
+
+_PARTIAL_FAILURE_CODE = 1206
+
+
+class _FakeHttpCaller(object):
+
+    # @param failed_ids the ids failing once with a retriable error
+    def __init__(self, failed_ids: set):
+        self.failed_ids = set(failed_ids)
+        self.bodies = []
+
+    def do_request(self, url, req_bytes, response, content_type, options):
+        data_list = json.loads(req_bytes)
+        self.bodies.append(data_list)
+        failed = [data for data in data_list if data["id"] in self.failed_ids]
+        self.failed_ids.clear()
+        if len(failed) == 0:
+            response.status.code = STATUS_CODE_SUCCESS
+            return
+        response.status.code = _PARTIAL_FAILURE_CODE
+        response.status.message = "partial failure"
+        for data in failed:
+            error = response.errors.add()
+            error.message = "server timeout"
+            error.data = json.dumps(data)
+
+
+class _FakeClient(object):
+
+    def __init__(self, http_caller: _FakeHttpCaller):
+        self._general_url = types.SimpleNamespace(write_data_url_format="http://localhost/data/api/#/write")
+        self._http_caller = http_caller
+
+
+# The WriteResponse of general is found by the module of client
+_FakeClient.__module__ = "byteplus.general.client"
+
+
+class WriteJsonLinesTest(unittest.TestCase):
+
+    def test_resend_partial_failure(self):
+        http_caller = _FakeHttpCaller({2})
+        client = _FakeClient(http_caller)
+        lines = encode_lines([{"id": 1}, {"id": 2}, {"id": 3}])
+
+        def call(call_lines, *call_opts):
+            return write_json_lines(client, call_lines, "user", *call_opts)
+
+        rsp = RequestHelper(client).do_write(call, lines, (), 2)
+
+        self.assertIsInstance(rsp, WriteResponse)
+        self.assertEqual(STATUS_CODE_SUCCESS, rsp.status.code)
+        # The failed item parsed from the error is encoded again and resent alone
+        self.assertEqual([[{"id": 1}, {"id": 2}, {"id": 3}], [{"id": 2}]], http_caller.bodies)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from byteplus.core import Option
+from byteplus.retail.protocol import ImportUsersRequest
+
+from example.common.operation_ledger import KIND_JSON, KIND_PROTO, STATE_DONE, STATE_LOST, STATE_RESUBMITTED, \
+    OperationLedger, _resubmit
+
+
+class OperationLedgerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.ledger = OperationLedger(os.path.join(self._dir.name, "operations.db"))
+
+    def tearDown(self):
+        self.ledger.close()
+        self._dir.cleanup()
+
+    def test_record_request(self):
+        request = ImportUsersRequest()
+        request.input_config.users_inline_source.users.add().user_id = "u1"
+        self.ledger.record("op1", "import_users", request)
+        entry = self.ledger.get("op1")
+        self.assertEqual(KIND_PROTO, entry.request_kind)
+        self.assertEqual(request, entry.parse_request(ImportUsersRequest))
+        self.assertTrue(self.ledger.contains_request(request))
+
+    def test_record_data_list(self):
+        data_list = [{"id": "1", "name": "a"}, {"id": "2", "name": "b"}]
+        self.ledger.record("op2", "import_data", data_list)
+        entry = self.ledger.get("op2")
+        self.assertEqual(KIND_JSON, entry.request_kind)
+        self.assertEqual(data_list, entry.parse_request())
+        self.assertTrue(self.ledger.contains_request([{"name": "a", "id": "1"}, {"id": "2", "name": "b"}]))
+        self.ledger.mark("op2", STATE_DONE)
+        self.assertEqual([], self.ledger.entries())
+
+    def test_resubmit_with_recorded_options(self):
+        date = datetime.datetime(2021, 6, 15)
+        opts = (Option.with_timeout(datetime.timedelta(seconds=1)), Option.with_data_date(date),
+                Option.with_stage("incremental_sync_streaming"))
+        self.ledger.record("op3", "import_data", [{"id": "1"}], opts)
+        self.ledger.mark("op3", STATE_LOST)
+        helper = _FakeRequestHelper()
+        state = _resubmit(self.ledger, helper, self.ledger.get("op3"), (None, None), 0)
+        self.assertEqual(STATE_RESUBMITTED, state)
+        options = Option.conv_to_options(helper.opts)
+        self.assertEqual(date, options.data_date)
+        self.assertEqual("incremental_sync_streaming", options.stage)
+        # The timeout is of the submitting only
+        self.assertIsNone(options.timeout)
+        self.assertEqual(self.ledger.get("op3").options, self.ledger.get("op4").options)
+
+    def test_open_ledger_without_options(self):
+        path = os.path.join(self._dir.name, "old.db")
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE operations (name TEXT PRIMARY KEY, call TEXT NOT NULL, fingerprint TEXT NOT NULL,
+                request BLOB NOT NULL, request_kind TEXT NOT NULL, state TEXT NOT NULL,
+                submitted_at REAL NOT NULL, updated_at REAL NOT NULL, resubmitted_as TEXT);
+        """)
+        conn.close()
+        ledger = OperationLedger(path)
+        try:
+            ledger.record("op1", "import_data", [{"id": "1"}])
+            self.assertEqual((), ledger.get("op1").parse_options())
+        finally:
+            ledger.close()
+
+
+class _FakeResponse(object):
+
+    def __init__(self):
+        self.status = _FakeStatus()
+        self.operation = _FakeOperation()
+
+
+class _FakeStatus(object):
+    code = 0
+
+
+class _FakeOperation(object):
+    name = "op4"
+
+
+class _FakeRequestHelper(object):
+
+    def __init__(self):
+        self.opts = None
+
+    def do_with_retry_although_overload(self, call, request, opts, retry_times):
+        self.opts = opts
+        return _FakeResponse()
+
+
+if __name__ == "__main__":
+    unittest.main()
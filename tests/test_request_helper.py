@@ -0,0 +1,73 @@
+import unittest
+
+from byteplus.core import STATUS_CODE_SUCCESS
+from byteplus.retail.protocol import WriteUsersRequest, WriteUsersResponse
+
+from example.common.request_helper import RequestHelper
+from example.common.write_error_helper import partition_errors
+
+_PARTIAL_FAILURE_CODE = 1206
+
+
+# Fail the users of given messages, every message fails once
+class _FakeWriteUsers(object):
+
+    def __init__(self, failures: dict):
+        self.failures = dict(failures)
+        self.requests = []
+
+    def __call__(self, request: WriteUsersRequest, *opts) -> WriteUsersResponse:
+        self.requests.append([user.user_id for user in request.users])
+        response = WriteUsersResponse()
+        response.status.code = STATUS_CODE_SUCCESS
+        for user in request.users:
+            message = self.failures.pop(user.user_id, None)
+            if message is None:
+                continue
+            response.status.code = _PARTIAL_FAILURE_CODE
+            error = response.errors.add()
+            error.message = message
+            error.user.CopyFrom(user)
+        return response
+
+
+def _request(*user_ids) -> WriteUsersRequest:
+    request = WriteUsersRequest()
+    for user_id in user_ids:
+        request.users.add().user_id = user_id
+    return request
+
+
+class DoWriteTest(unittest.TestCase):
+
+    def test_dropped_items_are_reported_in_response(self):
+        call = _FakeWriteUsers({"u2": "server timeout", "u3": "missing user_id"})
+        failures = []
+
+        rsp = RequestHelper(None).do_write(call, _request("u1", "u2", "u3"), (), 2,
+                                           lambda call_name, items: failures.extend(items))
+
+        # The retriable one is resent alone and succeeds, the permanent one is dropped
+        self.assertEqual([["u1", "u2", "u3"], ["u2"]], call.requests)
+        self.assertEqual(_PARTIAL_FAILURE_CODE, rsp.status.code)
+        self.assertEqual(["u3"], [error.user.user_id for error in rsp.errors])
+        self.assertEqual([("u3", "missing user_id")], [(item.user_id, message) for item, message in failures])
+
+    def test_success_without_drop(self):
+        call = _FakeWriteUsers({"u1": "server busy"})
+        rsp = RequestHelper(None).do_write(call, _request("u1", "u2"), (), 2)
+        self.assertEqual(STATUS_CODE_SUCCESS, rsp.status.code)
+        self.assertEqual(0, len(rsp.errors))
+
+
+class PartitionErrorsTest(unittest.TestCase):
+
+    def test_keywords_without_status_code(self):
+        rsp = _FakeWriteUsers({"u1": "Internal error", "u2": "invalid timestamp"})(_request("u1", "u2"))
+        retriable, permanent = partition_errors(rsp.errors)
+        self.assertEqual(["u1"], [item.user_id for item, _ in retriable])
+        self.assertEqual(["u2"], [item.user_id for item, _ in permanent])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import datetime
+import random
+import unittest
+
+from byteplus.core import BizException, NetException
+
+from example.common.request_helper import RequestHelper
+from example.common.retry_policy import CappedExponentialPolicy, DecorrelatedJitterPolicy, NoDelayPolicy, \
+    RetryBudget
+
+_BASE = datetime.timedelta(milliseconds=100)
+
+_CAP = datetime.timedelta(seconds=1)
+
+
+# Raise NetException for every request
+class _FakeTimeoutCall(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, request, *opts):
+        self.calls += 1
+        raise NetException("timeout")
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(20210615)
+
+    def test_capped_exponential_bounds(self):
+        policy = CappedExponentialPolicy(_BASE, _CAP)
+        interval = None
+        for retried_times in range(40):
+            interval = policy.next_interval(retried_times, interval)
+            upper = min(_CAP, _BASE * (2 ** min(retried_times, 30)))
+            self.assertGreaterEqual(interval, datetime.timedelta(0))
+            self.assertLess(interval, upper)
+
+    def test_decorrelated_jitter_bounds(self):
+        policy = DecorrelatedJitterPolicy(_BASE, _CAP)
+        interval = None
+        for retried_times in range(40):
+            last_interval = interval
+            interval = policy.next_interval(retried_times, last_interval)
+            upper = min(_CAP, max(_BASE, last_interval or _BASE) * 3)
+            self.assertGreaterEqual(interval, _BASE)
+            self.assertLessEqual(interval, upper)
+        # The intervals reach the cap after many retries
+        self.assertLessEqual(interval, _CAP)
+
+    def test_no_delay(self):
+        self.assertEqual(datetime.timedelta(0), NoDelayPolicy().next_interval(3, _BASE))
+
+
+class RetryBudgetTest(unittest.TestCase):
+
+    def test_tokens_deposited_by_requests(self):
+        budget = RetryBudget(ratio=0.5, min_retries_per_second=0)
+        self.assertFalse(budget.try_retry("write_users"))
+        budget.on_request("write_users")
+        budget.on_request("write_users")
+        self.assertTrue(budget.try_retry("write_users"))
+        self.assertFalse(budget.try_retry("write_users"))
+        # Every endpoint has its own tokens
+        self.assertFalse(budget.try_retry("write_products"))
+
+    def test_tokens_capped(self):
+        budget = RetryBudget(ratio=1, min_retries_per_second=0, max_tokens=2)
+        for _ in range(10):
+            budget.on_request("write_users")
+        self.assertTrue(budget.try_retry("write_users"))
+        self.assertTrue(budget.try_retry("write_users"))
+        self.assertFalse(budget.try_retry("write_users"))
+
+    def test_exhausted_budget_blocks_retries(self):
+        call = _FakeTimeoutCall()
+        helper = RequestHelper(None, net_retry_policy=NoDelayPolicy(),
+                               retry_budget=RetryBudget(ratio=0, min_retries_per_second=0))
+        with self.assertRaises(BizException):
+            helper.do_with_retry(call, None, (), 3)
+        self.assertEqual(1, call.calls)
+
+    def test_retries_within_budget(self):
+        call = _FakeTimeoutCall()
+        helper = RequestHelper(None, net_retry_policy=NoDelayPolicy(),
+                               retry_budget=RetryBudget(ratio=1, min_retries_per_second=0))
+        with self.assertRaises(BizException):
+            helper.do_with_retry(call, None, (), 3)
+        # The request deposits one token, which is taken by the only retry
+        self.assertEqual(2, call.calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from byteplus.core import BizException, NetException
+
+from example.common.request_helper import RequestHelper
+from example.common.retry_policy import NoDelayPolicy
+from example.common.tracing import NOOP_SPAN, STATUS_ERROR, STATUS_UNSET, InMemoryExporter, Tracer, get_tracer, \
+    set_tracer, submit_traced
+
+
+# Raise NetException for every request
+def write_users(request, *opts):
+    raise NetException("timeout")
+
+
+class TracingTest(unittest.TestCase):
+
+    def setUp(self):
+        self._previous_tracer = get_tracer()
+        self.exporter = InMemoryExporter()
+        set_tracer(Tracer(self.exporter, {"tenant": "retail_demo"}))
+
+    def tearDown(self):
+        set_tracer(self._previous_tracer)
+
+    def _spans(self) -> dict:
+        return {span.name: span for span in self.exporter.spans}
+
+    def test_child_span_parented_by_current_span(self):
+        tracer = get_tracer()
+        with tracer.start_span("recommend") as root:
+            with tracer.start_span("predict", {"scene": "home"}):
+                pass
+        with tracer.start_span("other"):
+            pass
+        spans = self._spans()
+        self.assertEqual(["predict", "recommend", "other"], [span.name for span in self.exporter.spans])
+        self.assertEqual(root.trace_id, spans["predict"].trace_id)
+        self.assertEqual(root.span_id, spans["predict"].parent_id)
+        self.assertIsNone(root.parent_id)
+        self.assertNotEqual(root.trace_id, spans["other"].trace_id)
+        self.assertEqual({"tenant": "retail_demo", "scene": "home"}, spans["predict"].attributes)
+        self.assertEqual(STATUS_UNSET, root.status)
+
+    def test_exception_sets_error_status(self):
+        with self.assertRaises(ValueError):
+            with get_tracer().start_span("attempt"):
+                raise ValueError("bad request")
+        span = self._spans()["attempt"]
+        self.assertEqual(STATUS_ERROR, span.status)
+        self.assertEqual("bad request", span.status_message)
+        self.assertFalse(span.is_recording)
+
+    def test_attempts_of_request_helper(self):
+        helper = RequestHelper(None, net_retry_policy=NoDelayPolicy())
+        with get_tracer().start_span("write") as root:
+            with self.assertRaises(BizException):
+                helper.do_with_retry(write_users, None, (), 1)
+        attempts = [span for span in self.exporter.spans if span.name == "attempt"]
+        self.assertEqual([0, 1], [span.attributes["attempt"] for span in attempts])
+        for span in attempts:
+            self.assertEqual(root.span_id, span.parent_id)
+            self.assertEqual(STATUS_ERROR, span.status)
+            self.assertEqual("write_users", span.attributes["call"])
+        # The request id is the same for all attempts
+        self.assertEqual(1, len({span.attributes["request_id"] for span in attempts}))
+
+    def test_submit_traced_keeps_trace(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with get_tracer().start_span("recommend") as root:
+                future = submit_traced(executor, "concurrent_helper", lambda: get_tracer().start_span("ack").end())
+            future.result()
+        spans = self._spans()
+        self.assertEqual(root.span_id, spans["concurrent_helper.enqueue"].parent_id)
+        self.assertEqual(spans["concurrent_helper.enqueue"].span_id, spans["concurrent_helper.dequeue"].parent_id)
+        self.assertEqual(spans["concurrent_helper.dequeue"].span_id, spans["ack"].parent_id)
+        self.assertEqual({root.trace_id}, {span.trace_id for span in spans.values()})
+        self.assertIn("queue_wait_ms", spans["concurrent_helper.dequeue"].attributes)
+
+    def test_disabled_tracer(self):
+        tracer = Tracer()
+        self.assertFalse(tracer.enabled)
+        self.assertIs(NOOP_SPAN, tracer.start_span("attempt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from byteplus.core import BizException, Option, STATUS_CODE_SUCCESS
+from byteplus.general.protocol import WriteResponse
+
+from example.common.request_helper import RequestHelper
+from example.common.upload_session import UploadSession
+
+_SERVER_ERROR_CODE = 500
+
+
+# Record the batches with their request ids, the batches
+# starting with the items in "failures" fail once
+class _FakeWrite(object):
+
+    def __init__(self, failures=()):
+        self.failures = set(failures)
+        self.batches = []
+
+    def __call__(self, batch, *opts) -> WriteResponse:
+        self.batches.append((list(batch), Option.conv_to_options(opts).request_id))
+        response = WriteResponse()
+        response.status.code = STATUS_CODE_SUCCESS
+        if batch[0] in self.failures:
+            self.failures.discard(batch[0])
+            response.status.code = _SERVER_ERROR_CODE
+        return response
+
+
+class UploadSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self._dir.name, "session.ckpt")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _session(self, write, session_id: str = "history") -> UploadSession:
+        return UploadSession(RequestHelper(None), write, lambda: (), self.checkpoint_path, session_id, retry_times=0)
+
+    def test_resume_rows_from_committed_offset(self):
+        rows = ["r0", "r1", "r2", "r3", "r4"]
+        write = _FakeWrite(failures=["r2"])
+        session = self._session(write)
+        with self.assertRaises(BizException):
+            session.upload_rows("rows", rows, 2)
+        self.assertEqual(2, session.offset)
+        failed_request_id = write.batches[-1][1]
+
+        write = _FakeWrite()
+        session = self._session(write)
+        self.assertEqual(2, session.offset)
+        self.assertEqual(2, session.upload_rows("rows", rows, 2))
+        self.assertEqual([["r2", "r3"], ["r4"]], [batch for batch, _ in write.batches])
+        # The batch failed before is resent with the same request id
+        self.assertEqual(failed_request_id, write.batches[0][1])
+        self.assertEqual(5, session.offset)
+
+    def test_resume_file_from_byte_offset(self):
+        path = os.path.join(self._dir.name, "users.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(5):
+                f.write('{"id": "%d"}\n' % i)
+        write = _FakeWrite(failures=[b'{"id": "2"}'])
+        session = self._session(write)
+        with self.assertRaises(BizException):
+            session.upload_file(path, 2)
+        committed = session.offset
+        self.assertEqual(len('{"id": "0"}\n') * 2, committed)
+
+        write = _FakeWrite()
+        session = self._session(write)
+        self.assertEqual(2, session.upload_file(path, 2))
+        self.assertEqual([[b'{"id": "2"}', b'{"id": "3"}'], [b'{"id": "4"}']], [batch for batch, _ in write.batches])
+        self.assertEqual(session.request_id(committed), write.batches[0][1])
+        self.assertEqual(os.path.getsize(path), session.offset)
+
+    def test_request_id_stable(self):
+        session = self._session(_FakeWrite())
+        self.assertEqual(session.request_id(10), self._session(_FakeWrite()).request_id(10))
+        self.assertNotEqual(session.request_id(10), session.request_id(20))
+        other = UploadSession(RequestHelper(None), _FakeWrite(), lambda: (),
+                              os.path.join(self._dir.name, "other.ckpt"), "other")
+        self.assertNotEqual(session.request_id(10), other.request_id(10))
+
+    def test_reject_checkpoint_of_other_session(self):
+        self._session(_FakeWrite()).upload_rows("rows", ["r0"], 1)
+        with self.assertRaises(ValueError):
+            self._session(_FakeWrite(), "other")
+        with self.assertRaises(ValueError):
+            self._session(_FakeWrite()).upload_rows("other_rows", ["r0"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()